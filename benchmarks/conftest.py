@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures of the benchmark suite.
+
+Run with `make bench` to store a baseline and `make bench-compare` to fail on regressions.
+"""
+import os
+import random
+import sys
+
+import pytest
+
+try:
+    import pytest_benchmark  # noqa: F401
+except ImportError:
+    collect_ignore_glob = ['test_*.py']
+
+# MockServer and LocalServer live with the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+
+KB = 1024
+MB = 1024 * KB
+
+BODY_SIZES = [KB, 64 * KB, MB, 50 * MB]
+PARAM_COUNTS = [0, 10, 100, 500]
+UNICODE_SHARES = [0.0, 0.1, 1.0]
+
+SIGNATURE_KEY = 'my-signature-key'
+BASE_URL = 'https://api.inbenta.io/prod/reporting'
+URL = BASE_URL + '/v1/events/user_questions'
+
+
+def makeBody(size, unicodeShare=0.0, seed=0):
+    '''JSON-like text of about `size` utf8 bytes where `unicodeShare` of the characters are not ascii'''
+    rand = random.Random(seed)
+    ascii = u'abcdefghijklmnopqrstuvwxyz "{}:,0123456789'
+    other = u'àèéíòóúçñ€'
+    chars = []
+    length = 0
+    while length < size:
+        c = rand.choice(other) if rand.random() < unicodeShare else rand.choice(ascii)
+        chars.append(c)
+        length += len(c.encode('utf8'))
+    return u''.join(chars)
+
+
+def makeParams(count):
+    params = {'date_from': '2019-01-01', 'date_to': '2019-01-31'}
+    for i in range(count):
+        params['id_{}'.format(i)] = ['content {}'.format(i), i] if i % 2 else 'user question {}'.format(i)
+    return dict(list(params.items())[:count])
+
+
+def rounds(size):
+    '''Big bodies are slow, run them only a few times'''
+    return 3 if size >= 50 * MB else (10 if size >= MB else 100)
+
+
+@pytest.fixture(params=BODY_SIZES, ids=lambda s: '{}KB'.format(s // KB))
+def bodySize(request):
+    return request.param
+
+
+@pytest.fixture(params=UNICODE_SHARES, ids=lambda s: 'unicode{:.0%}'.format(s))
+def unicodeShare(request):
+    return request.param
+
+
+@pytest.fixture(params=PARAM_COUNTS, ids=lambda c: '{}params'.format(c))
+def paramCount(request):
+    return request.param
@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""End to end load test of signed against unsigned traffic over real sockets.
+
+The server is the `LocalServer` of the tests, a threaded HTTP/1.1 server with
+keep-alive that echoes the request body: for the signed traffic it verifies every
+request and signs every response with `V1`. In the 'unsigned' and 'signed' modes
+every client thread has its own session, with a `SignatureAdapter` for the signed
+traffic, and validates every response. In the 'shared' mode all the threads send
+the signed traffic through one session, so they use the same adapter, connection
+pool, canonical url cache and clock at the same time.
+
+Usage:
+    python -m benchmarks.loadtest [--duration 3] [--concurrency 1,4,16] [--body-sizes 0,1024,65536]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from collections import namedtuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from inbenta_api_signature.adapters import SignatureAdapter
+
+# LocalServer lives with the tests
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'tests'))
+from localServer import LocalServer  # noqa: E402
+
+SIGNATURE_KEY = 'my-signature-key'
+MODES = ['unsigned', 'signed', 'shared']
+
+LoadResult = namedtuple('LoadResult', ['mode', 'bodySize', 'concurrency', 'requests', 'errors', 'connections',
+                                       'seconds', 'requestsPerSecond', 'p50', 'p99'])
+
+
+def run(mode, bodySize, concurrency, duration=3.0):
+    '''Sends requests from `concurrency` threads for `duration` seconds
+
+    Args:
+        mode (str): 'unsigned', 'signed', or 'shared' to sign through one session used by all the threads
+        bodySize (int): bytes of the POST bodies, 0 sends GET requests
+
+    Return:
+        LoadResult: throughput, connections opened and latency percentiles, in milliseconds
+
+    Raises:
+        Exception: the first error raised by a client thread, once all of them have stopped
+    '''
+    signed = mode != 'unsigned'
+    body = b'"' + b'x' * max(bodySize - 2, 0) + b'"' if bodySize else None
+    latencies = []
+    errors = []
+    crashes = []
+    lock = threading.Lock()
+    with LocalServer(SIGNATURE_KEY) as server:
+        server.signed = signed
+        url = server.url + '/v1/events/user_questions'
+        params = {'date_from': '2019-01-01', 'date_to': '2019-01-31'}
+        barrier = threading.Barrier(concurrency + 1)
+
+        def newSession(**kwargs):
+            session = requests.Session()
+            adapter = SignatureAdapter(SIGNATURE_KEY, server.url, **kwargs) if signed else HTTPAdapter(**kwargs)
+            session.mount(server.url, adapter)
+            return session
+
+        # a connection per thread in the pool of the shared adapter
+        shared = newSession(pool_maxsize=concurrency) if mode == 'shared' else None
+
+        def client():
+            try:
+                timings, failed = requestLoop()
+            except Exception as e:
+                with lock:
+                    crashes.append(e)
+                # don't leave the other threads waiting for this one
+                barrier.abort()
+                return
+            with lock:
+                latencies.extend(timings)
+                errors.append(failed)
+
+        def requestLoop():
+            session = shared or newSession()
+            timings = []
+            failed = 0
+            barrier.wait()
+            end = time.time() + duration
+            while time.time() < end:
+                start = time.perf_counter()
+                if body is None:
+                    response = session.get(url, params=params)
+                else:
+                    response = session.post(url, params=params, data=body)
+                ok = response.status_code == 200 and (not signed or response.validSignature is True)
+                timings.append(time.perf_counter() - start)
+                failed += not ok
+            if shared is None:
+                session.close()
+            return timings, failed
+
+        threads = [threading.Thread(target=client) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        try:
+            barrier.wait()
+        except threading.BrokenBarrierError:
+            pass
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        seconds = time.perf_counter() - start
+        if shared is not None:
+            shared.close()
+    if crashes:
+        raise crashes[0]
+    latencies.sort()
+    return LoadResult(mode, bodySize, concurrency, len(latencies), sum(errors), server.connections, seconds,
+                      len(latencies) / seconds, _percentile(latencies, 50) * 1e3, _percentile(latencies, 99) * 1e3)
+
+
+def _percentile(values, percent):
+    '''Nearest rank percentile of sorted values'''
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent / 100.0))]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--duration', type=float, default=3.0, help='seconds of every run (default: 3)')
+    parser.add_argument('--concurrency', default='1,4,16', help='comma separated client threads (default: 1,4,16)')
+    parser.add_argument('--body-sizes', default='0,1024,65536',
+                        help='comma separated body bytes, 0 sends GET requests (default: 0,1024,65536)')
+    args = parser.parse_args(argv)
+    print('{:<9} {:>9} {:>6} {:>9} {:>7} {:>6} {:>10} {:>9} {:>9}'.format(
+        'mode', 'body', 'conc', 'requests', 'errors', 'conns', 'req/s', 'p50 ms', 'p99 ms'))
+    for bodySize in [int(size) for size in args.body_sizes.split(',')]:
+        for concurrency in [int(n) for n in args.concurrency.split(',')]:
+            for mode in MODES:
+                result = run(mode, bodySize, concurrency, duration=args.duration)
+                print('{r.mode:<9} {r.bodySize:>9} {r.concurrency:>6} {r.requests:>9} {r.errors:>7} {r.connections:>6} '
+                      '{r.requestsPerSecond:>10.1f} {r.p50:>9.2f} {r.p99:>9.2f}'.format(r=result))
+
+
+if __name__ == '__main__':
+    main()
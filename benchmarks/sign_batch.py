@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Compare the per-request cost of `signRequests` against signing every request on its own.
+
+The baseline is the signing path before the batches: a new `hmac.new` for every
+request over its whole base string. The script fails if the batch doesn't save time.
+
+Usage:
+    python -m benchmarks.sign_batch [number_of_requests]
+"""
+import hmac
+import sys
+import timeit
+
+from inbenta_api_signature.protocol import V1
+
+TIMESTAMP = 1552647740
+
+
+def main(size=10000):
+    proto = V1('my-signature-key', baseUrl='https://api.inbenta.io/prod/reporting')
+    batch = [
+        ('https://api.inbenta.io/prod/reporting/v1/events/user_questions', 'GET', {'date_from': '2019-01-01', 'offset': i}, None)
+        for i in range(size)
+    ]
+
+    def baseline():
+        for url, method, params, body in batch:
+            baseString = proto._requestBaseString(url, method, params=params, body=body, timestamp=TIMESTAMP)
+            proto.getHeaders(hmac.new(proto._key, baseString, proto.HASH_ALGORITHM).hexdigest(), str(TIMESTAMP))
+
+    def loop():
+        for url, method, params, body in batch:
+            proto.sign(url, method, params=params, body=body, timestamp=TIMESTAMP).headers
+
+    def batched():
+        proto.signRequests(batch, timestamp=TIMESTAMP)
+
+    results = {}
+    for name, func in [('hmac.new per request', baseline), ('sign per request', loop), ('signRequests', batched)]:
+        results[name] = min(timeit.repeat(func, number=1, repeat=5)) / size * 1e6
+        print('{:<24} {:8.2f} us/call'.format(name, results[name]))
+    saving = 1 - results['signRequests'] / results['hmac.new per request']
+    print('{:<24} {:8.1%}'.format('saving', saving))
+    if saving <= 0:
+        sys.exit('signRequests is not faster than signing every request with hmac.new')
+
+
+if __name__ == '__main__':
+    main(*[int(a) for a in sys.argv[1:]])
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the full SignatureAdapter round trip through the MockServer."""
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+from inbenta_api_signature import changeBaseHTTPAdapter
+from mockServer import MockServer
+
+from .conftest import SIGNATURE_KEY, BASE_URL, URL, makeBody, rounds
+
+
+@pytest.fixture
+def AdapterWithMockServer():
+    # the base class is global, the other benchmarks need the real one back
+    yield changeBaseHTTPAdapter(MockServer)
+    changeBaseHTTPAdapter(HTTPAdapter)
+
+
+def test_adapter_round_trip(benchmark, bodySize, unicodeShare, AdapterWithMockServer):
+    session = requests.Session()
+    session.mount('https://', AdapterWithMockServer(SIGNATURE_KEY, BASE_URL, None, SIGNATURE_KEY, BASE_URL))
+    body = makeBody(bodySize, unicodeShare).encode('utf8')
+
+    def roundTrip():
+        return session.post(URL, data=body, headers={'Content-Type': 'application/json; charset=utf-8'})
+
+    response = benchmark.pedantic(roundTrip, rounds=rounds(bodySize), warmup_rounds=1)
+    assert response.validSignature
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Short run of the load test harness, see `benchmarks/loadtest.py` for the full one."""
+import pytest
+
+from . import loadtest
+from .loadtest import MODES, run
+
+
+@pytest.mark.parametrize("bodySize", [0, 1024])
+@pytest.mark.parametrize("mode", MODES)
+def test_loadtest(mode, bodySize):
+    result = run(mode, bodySize, concurrency=2, duration=0.2)
+    assert result.requests > 0
+    assert result.errors == 0
+    # one kept-alive connection per client thread, the shared pool keeps up to one per thread
+    if mode == 'shared':
+        assert 1 <= result.connections <= 2
+    else:
+        assert result.connections == 2
+    assert 0 < result.p50 <= result.p99
+
+
+def test_loadtest_client_errors(monkeypatch):
+    def broken(*args, **kwargs):
+        raise RuntimeError('the adapter could not be built')
+
+    monkeypatch.setattr(loadtest, 'SignatureAdapter', broken)
+    with pytest.raises(RuntimeError):
+        run('signed', 0, concurrency=2, duration=0.2)
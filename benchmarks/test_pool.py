@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Per request overhead of `SignaturePoolManager` against `SignatureAdapter` in a `requests.Session`.
+
+Both send the same small signed GET to a local server over a kept-alive
+connection and validate the response, the difference is the cost of the layers.
+"""
+import pytest
+import requests
+
+from inbenta_api_signature import adapters
+from inbenta_api_signature.pool import SignaturePoolManager
+from localServer import LocalServer
+
+from .conftest import SIGNATURE_KEY
+
+PARAMS = {'date_from': '2019-01-01', 'date_to': '2019-01-31', 'length': 100}
+
+
+@pytest.fixture(scope='module')
+def server():
+    with LocalServer(SIGNATURE_KEY) as server:
+        yield server
+
+
+def test_pool_manager_request(benchmark, server):
+    http = SignaturePoolManager(SIGNATURE_KEY, server.url, maxsize=1)
+    url = server.url + '/v1/events/user_questions'
+
+    def request():
+        return http.request('GET', url, fields=PARAMS).validSignature
+
+    assert benchmark(request)
+
+
+def test_session_adapter_request(benchmark, server):
+    session = requests.Session()
+    session.mount(server.url, adapters.SignatureAdapter(SIGNATURE_KEY, server.url))
+    url = server.url + '/v1/events/user_questions'
+
+    def request():
+        return session.get(url, params=PARAMS).validSignature
+
+    assert benchmark(request)
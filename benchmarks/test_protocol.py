@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks of the V1 signing and validation hot paths."""
+from inbenta_api_signature.protocol import V1
+
+from .conftest import SIGNATURE_KEY, BASE_URL, URL, makeBody, makeParams, rounds
+
+
+def test_sign_request_body(benchmark, bodySize, unicodeShare):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    body = makeBody(bodySize, unicodeShare)
+    benchmark.pedantic(proto.signRequest, args=(URL, 'POST'), kwargs={'body': body, 'timestamp': 1552647740},
+                       rounds=rounds(bodySize), warmup_rounds=1)
+
+
+def test_sign_request_params(benchmark, paramCount):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    params = makeParams(paramCount)
+    benchmark(proto.signRequest, URL, 'GET', params=params, timestamp=1552647740)
+
+
+def test_build_query_string(benchmark, paramCount):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    params = makeParams(paramCount)
+    benchmark(proto._buildQueryString, params)
+
+
+def test_sign_requests_batch(benchmark):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    batch = [(URL, 'GET', {'date_from': '2019-01-01', 'offset': i}, None) for i in range(1000)]
+    benchmark(proto.signRequests, batch, timestamp=1552647740)
+
+
+def test_validate_response(benchmark, bodySize, unicodeShare):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    body = makeBody(bodySize, unicodeShare)
+    signature = proto._sign(proto._responseBaseString(body, 1552647740))
+    result = benchmark.pedantic(proto.validateResponse, args=(signature, body), kwargs={'timestamp': 1552647740},
+                                rounds=rounds(bodySize), warmup_rounds=1)
+    assert result
+
+
+def test_validate_response_content(benchmark, bodySize, unicodeShare):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    body = makeBody(bodySize, unicodeShare)
+    signature = proto._sign(proto._responseBaseString(body, 1552647740))
+    content = body.encode('utf8')
+    result = benchmark.pedantic(proto.validateResponseContent, args=(signature, content), kwargs={'timestamp': 1552647740},
+                                rounds=rounds(bodySize), warmup_rounds=1)
+    assert result
+
+
+def test_prepared_sign(benchmark, paramCount):
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    prepared = proto.prepare(URL, 'GET', params=makeParams(paramCount))
+    timestamps = iter(range(1552647740, 1552647740 + 10 ** 8))
+    # a new second on every call, the worst case
+    benchmark(lambda: prepared.sign(next(timestamps)))
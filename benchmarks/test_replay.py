@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""Throughput of `ReplayGuard.check` with the in-memory store.
+
+Every round checks a batch of new signatures spread over a few seconds, with
+the clock moving forward so the oldest buckets expire on the way.
+"""
+import itertools
+
+from inbenta_api_signature.replay import MemoryReplayStore, ReplayGuard
+
+BATCH = 10000
+NOW = 1552647740
+
+
+def test_replay_guard_check(benchmark):
+    guard = ReplayGuard(window=60, store=MemoryReplayStore(maxsize=1000000))
+    counter = itertools.count()
+
+    def check():
+        start = next(counter) * BATCH
+        now = NOW + start // 20000
+        return all([guard.check('%064x' % i, now - i % 5, now) for i in range(start, start + BATCH)])
+
+    assert benchmark(check)
@@ -1,17 +1,28 @@
 # -*- coding: utf-8 -*-
-try:
-    from requests.adapters import HTTPAdapter
-    BUILD_ADAPTER = True
-except ImportError:
-    BUILD_ADAPTER = False
+import sys
 
 from .protocol import *
+from .exceptions import *
 
 from .__version__ import __title__, __description__, __url__, __version__
 from .__version__ import __author__, __author_email__, __license__
 from .__version__ import __copyright__
 
-__all__ = ['SignatureClient']
+__all__ = ['SignatureClient', 'SignatureError', 'InvalidSignatureError']
+
+# The adapter needs `requests`, it is only imported when one of these names is used
+_ADAPTER_ATTRIBUTES = ['SignatureAdapter', 'changeBaseHTTPAdapter', 'getHTTPAdapter', 'waitAll']
+
+try:
+    from importlib.util import find_spec
+    BUILD_ADAPTER = find_spec('requests') is not None
+except ImportError:
+    # Python 2
+    try:
+        import requests
+        BUILD_ADAPTER = True
+    except ImportError:
+        BUILD_ADAPTER = False
 
 class SignatureClient(object):
     '''Inbenta Signature Client
@@ -23,35 +34,54 @@ class SignatureClient(object):
         signatureKey (str): The Inbenta signature key that will be used
         baseUrl (str, optional): The base endpoint url
         signatureVersion (str, optional): signature protocol version (default: lastest)
+        cacheSize (int, optional): size of the canonical url cache (default: disabled)
+        instrumentation (Instrumentation, optional): hooks to time every phase (default: disabled)
     
     Raises:
         TypeError: if the signature version is not suported
     '''
-    def __init__(self, signatureKey, baseUrl=None, signatureVersion=None):
+    def __init__(self, signatureKey, baseUrl=None, signatureVersion=None, cacheSize=None, instrumentation=None):
         signatureVersion = signatureVersion or "v1"
         if not isinstance(signatureVersion, BaseVersion):
             signatureVersion = {
-                "v1": V1(signatureKey, baseUrl=baseUrl)
+                "v1": V1(signatureKey, baseUrl=baseUrl, cacheSize=cacheSize, instrumentation=instrumentation)
             }.get(str(signatureVersion).lower())
         if not signatureVersion:
             raise ValueError('Signature Version is not correct. Supported versions: [v1]')
         self._signProtocol = signatureVersion
 
+    @property
+    def instrumentation(self):
+        return self._signProtocol.instrumentation
+
+    @property
+    def clockOffset(self):
+        '''Seconds added to the local time to generate the timestamps'''
+        return getattr(self._signProtocol, 'clockOffset', 0.0)
+
     @property
     def SIGNATURE_HEADER(self):
         return self._signProtocol.SIGNATURE_HEADER
 
+    @property
+    def TIMESTAMP_HEADER(self):
+        return self._signProtocol.TIMESTAMP_HEADER
+
     def genTimestamp(self):
         '''Generates a timestamp in string format for the request'''
         return self._signProtocol.genTimestamp()
 
+    def cacheInfo(self):
+        '''Returns the hits, misses and evictions of the canonical url cache (None if disabled)'''
+        return self._signProtocol.cacheInfo()
+
     def signRequest(self, url, params=None, body=None, method=None, timestamp=None):
         '''Build the signature headers
 
         Args:
             url (str): The endpoint url (can contain encoded query parameters)
             params (dict): The query parameters without encoding
-            body (string): The body of the request
+            body (str, bytes, file or iterable): The body of the request, read in chunks
             method (string): The HTTP Method
             timestamp (str, optional): timestamp to be used
 
@@ -59,8 +89,54 @@ class SignatureClient(object):
             dict: The signature headers generated by the requests
 
         '''
-        signature = self._signProtocol.signRequest(url=url, method=method, params=params, body=body, timestamp=timestamp)
-        return self._signProtocol.getHeaders(signature)
+        signed = self.sign(url, params=params, body=body, method=method, timestamp=timestamp)
+        # Remember the last timestamp so `validateResponse` works without passing it
+        self._signProtocol.timestamp = signed.timestamp
+        return signed.headers
+
+    def sign(self, url, params=None, body=None, method=None, timestamp=None):
+        '''Sign the request without sharing any state between calls
+
+        Args:
+            url (str): The endpoint url (can contain encoded query parameters)
+            params (dict): The query parameters without encoding
+            body (str, bytes, file or iterable): The body of the request, read in chunks
+            method (string): The HTTP Method
+            timestamp (str, optional): timestamp to be used
+
+        Return:
+            RequestSignature: The signature, the timestamp used and the signature headers
+
+        '''
+        return self._signProtocol.sign(url=url, method=method, params=params, body=body, timestamp=timestamp)
+
+    def prepare(self, url, params=None, body=None, method=None):
+        '''Prepare a request that is sent many times, only the timestamp is hashed for every call
+
+        Args:
+            url (str): The endpoint url (can contain encoded query parameters)
+            params (dict): The query parameters without encoding
+            body (str, bytes, file or iterable): The body of the request, read once
+            method (string): The HTTP Method
+
+        Return:
+            PreparedSignature: call `signRequest` to get the headers of the current second
+
+        '''
+        return self._signProtocol.prepare(url=url, method=method, params=params, body=body)
+
+    def signRequests(self, batch, timestamp=None):
+        '''Build the signature headers of a batch of requests
+
+        Args:
+            batch (iterable): (url, method, params, body) tuples or dicts with those keys
+            timestamp (str, optional): timestamp to be used for the whole batch
+
+        Return:
+            list: The signature headers of every request, in the same order
+
+        '''
+        return self._signProtocol.signRequests(batch, timestamp=timestamp)
 
     def validateResponse(self, signature, body, timestamp=None):
         '''Validate the signature header of the response
@@ -76,63 +152,77 @@ class SignatureClient(object):
         '''
         return self._signProtocol.validateResponse(signature=signature, body=body, timestamp=timestamp)
 
+    def validateResponseContent(self, signature, content, encoding=None, timestamp=None):
+        '''Validate the signature header of the response from the raw body
+
+        Args:
+            signature (str): The signature header of the response
+            content (bytes): The response body
+            encoding (str, optional): charset of the content (default: utf-8), it is not detected
+            timestamp (str, optional): timestamp to be used
+
+        Return:
+            bool: True or False if signature could be verified or not
+
+        '''
+        return self._signProtocol.validateResponseContent(signature=signature, content=content, encoding=encoding, timestamp=timestamp)
+
+    def responseValidator(self, signature, timestamp=None, encoding=None):
+        '''Build a validator for a response body that is read in chunks
+
+        Args:
+            signature (str): The signature header of the response
+            timestamp (str, optional): timestamp to be used
+            encoding (str, optional): charset of the bytes chunks (default: utf-8)
+
+        Return:
+            ResponseValidator: call `update` with every chunk and `finish` to get the result
+
+        '''
+        return self._signProtocol.responseValidator(signature=signature, timestamp=timestamp, encoding=encoding)
+
+    def iterResults(self, url, params=None, headers=None, session=None, length=None, maxWorkers=4, validate=True):
+        '''Yields the `results` items of a paginated Reporting API endpoint in order
+
+        The pages after the first one are fetched concurrently and their signature is validated.
+
+        Args:
+            url (str): The endpoint url
+            params (dict, optional): The query parameters of every page (`date_from`, `date_to`...)
+            headers (dict, optional): Extra headers (authorization...)
+            session (requests.Session, optional): session with a `SignatureAdapter` mounted
+                (default: a new session signing with this client)
+            length (int, optional): page size (default: the `length` returned by the first page)
+            maxWorkers (int, optional): number of pages requested at the same time
+            validate (bool, optional): raise if a page signature is not valid (default: True)
+
+        Raises:
+            InvalidSignatureError: if a page signature is missing or not valid
+
+        '''
+        from .pagination import iterResults
+        ownSession = session is None
+        if ownSession:
+            import requests
+            session = requests.Session()
+            from .adapters import SignatureAdapter
+            session.mount(url, SignatureAdapter(None, signatureVersion=self._signProtocol, pool_maxsize=maxWorkers))
+        try:
+            for item in iterResults(session, url, params=params, headers=headers, length=length, maxWorkers=maxWorkers, validate=validate):
+                yield item
+        finally:
+            if ownSession:
+                session.close()
+
 
 if BUILD_ADAPTER:
-    __all__ += ['SignatureAdapter', 'changeBaseHTTPAdapter', 'getHTTPAdapter']
-
-    def __createAdapter(cls):
-        class SignatureAdapter(cls):
-            '''Requests HTTP Adapter to sign the request
-
-            The adapter will sign the request and add the headers before making the request
-            Also will validate the signature on the response.
-
-            On the response a new attribute is added `validSignature` this attribute will be
-                None:  If the signature wasn't provided
-                True:  The response signature is valid
-                False:  The response signature doesn't match
-
-            Args:
-                signatureKey (str): Inbenta signature key
-                signatureVersion (str, optional): signature protocol version (default: lastest)
-                *args: list args that will be passed to the parent HTTPAdapter
-                **kwargs: list of kwargs that will be passed to the parent HTTPAdapter
-
-            Example:
-                import requests
-                s = requests.Session()
-                s.mount(INBNETA_ENDPOINT_URL, SignatureAdapter(INBENTA_SIGNATURE_KEY))
-                ...
-                r = s.get(url)
-                ...
-                r.validSignature
-
-            '''
-            def __init__(self, signatureKey, baseUrl=None, signatureVersion=None, *args, **kwargs):
-                super(SignatureAdapter, self).__init__(*args, **kwargs)
-                self._client = SignatureClient(signatureKey, signatureVersion=signatureVersion, baseUrl=baseUrl)
-                self._timestamp = None
-
-            def add_headers(self, request, **kwargs):
-                self._timestamp = self._client.genTimestamp()
-                headers = self._client.signRequest(url=request.url, method=request.method, body=request.body, timestamp=self._timestamp)
-                request.headers.update(headers)
-
-            def build_response(self, req, resp):
-                response = super(SignatureAdapter, self).build_response(req, resp)
-                signature = response.headers.get(self._client.SIGNATURE_HEADER)
-                response.validSignature = None
-                if signature:
-                    response.validSignature = self._client.validateResponse(signature, response.text, timestamp=self._timestamp)
-                return response
-        return SignatureAdapter
-
-    def changeBaseHTTPAdapter(cls):
-        '''Allows to change the base class of the Adapter to use a custom HTTPAdapter'''
-        if not isinstance(cls, type) or not issubclass(cls, HTTPAdapter):
-            raise TypeError("The adapter class should be an class of type HTTPAdapter")
-        global SignatureAdapter
-        SignatureAdapter = __createAdapter(cls)
-        return SignatureAdapter
-
-    SignatureAdapter = __createAdapter(HTTPAdapter)
+    __all__ += _ADAPTER_ATTRIBUTES
+
+    if sys.version_info >= (3, 7):
+        def __getattr__(name):
+            if name in _ADAPTER_ATTRIBUTES:
+                from . import adapters
+                return getattr(adapters, name)
+            raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    else:
+        from .adapters import *
@@ -0,0 +1,408 @@
+# -*- coding: utf-8 -*-
+"""Requests HTTP Adapter that signs the requests and validates the responses.
+
+This module is loaded lazily by the package, so `requests` is only imported
+when the adapter is used.
+"""
+import functools
+import os
+import socket
+import time
+
+from requests import Request, Response
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, ReadTimeout, RetryError
+from requests.structures import CaseInsensitiveDict
+from requests.utils import stream_decode_response_unicode
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import HTTPError as _HTTPError
+from urllib3.util.retry import Retry
+
+from . import SignatureClient
+from . import instrumentation as metrics
+from .bodies import SPOOL_MAX_SIZE, _iterable, _seekable, _spool  # noqa: F401
+from .clock import ClockSkew
+from .lazy import LazySignature, _lazySignature
+
+
+__all__ = ['SignatureAdapter', 'changeBaseHTTPAdapter', 'getHTTPAdapter', 'waitAll', 'LazySignature']
+
+# Responses retried by the adapters built with `getHTTPAdapter`
+RETRY_STATUSES = (429, 502, 503, 504)
+# Responses of a rejected signature, the timestamp may be the cause
+REJECTION_STATUSES = (401, 403)
+# Difference in seconds with the server clock from which a rejected request is signed again
+CLOCK_TOLERANCE = 2
+
+
+def __createAdapter(cls):
+    class SignatureAdapter(cls):
+        '''Requests HTTP Adapter to sign the request
+
+        The adapter will sign the request and add the headers before making the request
+        Also will validate the signature on the response.
+
+        On the response a new attribute is added `validSignature` this attribute will be
+            None:  If the signature wasn't provided
+            True:  The response signature is valid
+            False:  The response signature doesn't match
+
+        The signature is only validated the first time `validSignature` is read.
+
+        When the request is sent with `stream=True` the body is not read up front,
+        the signature is validated chunk by chunk while the content is consumed
+        (`iter_content`, `iter_lines`, `content`...). In that case `validSignature`
+        stays None until the stream is exhausted.
+
+        Failed attempts are retried with the `retries` policy, the request is signed
+        again with a new timestamp on every attempt. Don't use the `max_retries` of
+        the parent HTTPAdapter, its retries would send the first signature again.
+
+        With `clockSkew` the offset of the server clock is estimated from the `Date`
+        header of the responses and added to the timestamps. A request rejected
+        because of its timestamp is signed again once with the corrected clock.
+
+        With a `responseCache` the successful responses of the cacheable requests
+        (GET by default, not streamed) are validated right away and stored if their
+        signature is valid. The identical requests are served from the cache, without
+        network nor validation, until the entry expires.
+
+        A `validationPolicy` decides which signed responses are validated, see
+        `inbenta_api_signature.policy`. The skipped ones keep `validSignature = None`
+        and get `validationSkipped = True`.
+
+        With a `validationExecutor` the body of the responses is read by `send`
+        and validated in the executor, while the caller parses it. The response gets
+        the `signatureFuture` of the validation, and reading `validSignature` waits
+        for it. Use `waitAll` to wait for a batch of responses.
+
+        Args:
+            signatureKey (str): Inbenta signature key
+            signatureVersion (str, optional): signature protocol version (default: lastest)
+            instrumentation (Instrumentation, optional): hooks to time every phase (default: disabled)
+            clockSkew (bool or ClockSkew, optional): estimate the server clock offset (default: False)
+            retries (int or urllib3.util.Retry, optional): retry policy (default: no retries)
+            responseCache (ResponseCache, optional): cache of the validated responses (default: disabled)
+            validationPolicy (ValidationPolicy, optional): which responses are validated (default: all)
+            validationExecutor (concurrent.futures.Executor, optional): executor that validates the
+                responses in the background (default: validated by the thread that reads `validSignature`)
+            socketOptions (list, optional): socket options of the connections (default: urllib3 ones)
+            *args: list args that will be passed to the parent HTTPAdapter
+            **kwargs: list of kwargs that will be passed to the parent HTTPAdapter
+
+        Example:
+            import requests
+            s = requests.Session()
+            s.mount(INBNETA_ENDPOINT_URL, SignatureAdapter(INBENTA_SIGNATURE_KEY))
+            ...
+            r = s.get(url)
+            ...
+            r.validSignature
+
+        '''
+        def __init__(self, signatureKey, baseUrl=None, signatureVersion=None, *args, **kwargs):
+            instrumentation = kwargs.pop('instrumentation', None)
+            self._retries = Retry.from_int(kwargs.pop('retries', 0))
+            clockSkew = kwargs.pop('clockSkew', None)
+            self._clockSkew = ClockSkew() if clockSkew is True else clockSkew or None
+            self.responseCache = kwargs.pop('responseCache', None)
+            self.validationPolicy = kwargs.pop('validationPolicy', None)
+            self.validationExecutor = kwargs.pop('validationExecutor', None)
+            # used by `init_poolmanager`, which is called by the parent constructor
+            self._socketOptions = kwargs.pop('socketOptions', None)
+            super(SignatureAdapter, self).__init__(*args, **kwargs)
+            self._client = SignatureClient(signatureKey, signatureVersion=signatureVersion, baseUrl=baseUrl,
+                                           instrumentation=instrumentation)
+
+        @property
+        def clockOffset(self):
+            '''Seconds added to the local time to sign the requests'''
+            return self._client.clockOffset
+
+        def init_poolmanager(self, *args, **kwargs):
+            if self._socketOptions is not None:
+                kwargs.setdefault('socket_options', self._socketOptions)
+            super(SignatureAdapter, self).init_poolmanager(*args, **kwargs)
+
+        def prewarm(self, url, connections=1, verify=True, cert=None):
+            '''Opens connections to the host of the url before the first request
+
+            It is done on a best effort basis, it stops at the first connection that fails.
+
+            Args:
+                url (str): url of the host
+                connections (int, optional): number of connections, up to `pool_maxsize`
+                verify (bool or str, optional): TLS verification, as the session `verify`
+                    (default: the CA bundle of the environment, as the sessions do)
+                cert (str or tuple, optional): client certificate, as the session `cert`
+
+            Return:
+                int: The number of connections opened
+            '''
+            if verify is True:
+                # same pool key as the requests of a session that trusts the environment
+                verify = os.environ.get('REQUESTS_CA_BUNDLE') or os.environ.get('CURL_CA_BUNDLE') or True
+            request = Request('GET', url).prepare()
+            if hasattr(self, 'get_connection_with_tls_context'):
+                pool = self.get_connection_with_tls_context(request, verify, cert=cert)
+            else:
+                pool = self.get_connection(url)
+                self.cert_verify(pool, url, verify, cert)
+            # take the free slots of the pool and connect them
+            conns = [pool._get_conn() for _ in range(min(connections, self._pool_maxsize))]
+            opened = 0
+            try:
+                for conn in conns:
+                    if conn.sock is None:
+                        conn.connect()
+                    opened += 1
+            except (OSError, _HTTPError):
+                pass
+            for conn in conns:
+                pool._put_conn(conn)
+            return opened
+
+        def add_headers(self, request, **kwargs):
+            body = request.body
+            if _seekable(body):
+                # files are hashed in chunks and rewinded to be sent
+                position = body.tell()
+                signed = self._client.sign(url=request.url, method=request.method, body=body)
+                body.seek(position)
+            elif hasattr(body, 'read') or _iterable(body):
+                # pipes and generators can only be read once, spool them to be able to send them after signing
+                request.body = _spool(body)
+                signed = self._client.sign(url=request.url, method=request.method, body=request.body)
+                request.body.seek(0)
+            else:
+                signed = self._client.sign(url=request.url, method=request.method, body=body)
+            request.headers.update(signed.headers)
+
+        def send(self, request, stream=False, *args, **kwargs):
+            cacheKey = self._cacheKey(request, stream)
+            if cacheKey is not None:
+                entry = self.responseCache.get(cacheKey)
+                if entry is not None:
+                    return self._cachedResponse(request, entry)
+            response = self._sendWithRetries(request, stream, *args, **kwargs)
+            # The signing context travels with the request, the adapter is stateless
+            timestamp = request.headers.get(self._client.TIMESTAMP_HEADER)
+            signature = response.headers.get(self._client.SIGNATURE_HEADER)
+            response = _lazySignature(response)
+            hooks = self._client.instrumentation
+            if not signature:
+                if hooks is not None:
+                    hooks.count(metrics.MISSING_SIGNATURES)
+            elif self.validationPolicy is not None and not self.validationPolicy.shouldValidate(request, response):
+                response.validationSkipped = True
+                if hooks is not None:
+                    hooks.count(metrics.SKIPPED_VALIDATIONS)
+            elif stream:
+                self._validateStream(response, signature, timestamp)
+            else:
+                check = functools.partial(self._validateResponse, signature=signature, timestamp=timestamp)
+                if self.validationExecutor is not None:
+                    # the body is read here, the executor and the caller share it
+                    response.content
+                    response.signatureFuture = self.validationExecutor.submit(check, response)
+                    check = functools.partial(_signatureResult, response.signatureFuture)
+                # validated on the first access to `validSignature`
+                response._signatureCheck = check
+                if cacheKey is not None and response.ok and response.validSignature:
+                    self.responseCache.set(cacheKey, {
+                        'status': response.status_code,
+                        'reason': response.reason,
+                        'headers': list(response.headers.items()),
+                        'content': response.content,
+                        'encoding': response.encoding,
+                    })
+            return response
+
+        def _cacheKey(self, request, stream):
+            '''Key of the request in the response cache, None if it can't be cached'''
+            cache = self.responseCache
+            if cache is None or stream or request.method not in cache.methods:
+                return None
+            if request.body is not None and not isinstance(request.body, (bytes, str)):
+                # files and generators would be consumed to compute the key
+                return None
+            # the responses of other users or environments are not shared
+            headers = dict((name, value) for name, value in request.headers.items() if name.lower() in cache.vary)
+            return self._client._signProtocol.requestDigest(request.url, request.method, body=request.body,
+                                                            headers=headers)
+
+        def _cachedResponse(self, request, entry):
+            '''Builds the response of a cache hit, its signature was validated when it was stored'''
+            response = _lazySignature(Response())
+            response.status_code = entry['status']
+            response.reason = entry['reason']
+            response.headers = CaseInsensitiveDict(entry['headers'])
+            response._content = entry['content']
+            response._content_consumed = True
+            response.encoding = entry['encoding']
+            response.url = request.url
+            response.request = request
+            response.connection = self
+            response.validSignature = True
+            return response
+
+        def _sendWithRetries(self, request, stream, *args, **kwargs):
+            '''Sends the request until it succeeds or the retries are exhausted'''
+            retries = self._retries
+            body = request.body
+            start = body.tell() if _seekable(body) else 0
+            attempt = 0
+            resigned = False
+            while True:
+                if attempt and hasattr(request.body, 'seek'):
+                    # files are read when they are sent, generators were spooled by `add_headers`
+                    request.body.seek(start)
+                attempt += 1
+                sent = time.time()
+                try:
+                    # `add_headers` signs every attempt with a new timestamp
+                    response = super(SignatureAdapter, self).send(request, stream, *args, **kwargs)
+                except (ConnectionError, ReadTimeout) as e:
+                    # the urllib3 error tells whether it failed connecting or reading
+                    error = e.args[0] if e.args else e
+                    error = getattr(error, 'reason', error)
+                    try:
+                        retries = retries.increment(request.method, request.url, error=error)
+                    except Exception:
+                        raise e
+                    retries.sleep()
+                    continue
+                if self._clockSkew is not None and self._updateClock(request, response, sent, time.time()) and not resigned:
+                    # the timestamp was rejected, sign it again with the corrected clock
+                    resigned = True
+                    response.content
+                    response.close()
+                    continue
+                if not retries.is_retry(request.method, response.status_code, 'Retry-After' in response.headers):
+                    return response
+                try:
+                    retries = retries.increment(request.method, request.url, response=response.raw)
+                except Exception as e:
+                    if retries.raise_on_status:
+                        raise RetryError(e, request=request)
+                    return response
+                retries.sleep(response.raw)
+                # read the body to release the connection to the pool
+                response.content
+                response.close()
+
+        def _updateClock(self, request, response, sent, received):
+            '''Updates the clock offset, returns True if the timestamp was rejected because of the clock'''
+            rejected = response.status_code in REJECTION_STATUSES
+            offset = self._clockSkew.update(response.headers.get('Date'), sent, received, reset=rejected)
+            self._client._signProtocol.clockOffset = offset
+            hooks = self._client.instrumentation
+            if hooks is not None:
+                hooks.gauge(metrics.CLOCK_OFFSET, offset)
+            if not rejected:
+                return False
+            try:
+                return abs(int(request.headers.get(self._client.TIMESTAMP_HEADER)) - (sent + offset)) >= CLOCK_TOLERANCE
+            except (TypeError, ValueError):
+                return False
+
+        def _validateResponse(self, response, signature, timestamp):
+            hooks = self._client.instrumentation
+            if hooks is not None:
+                hooks.count(metrics.VALIDATED_RESPONSES)
+            # the raw content is validated, without the charset detection of `response.text`
+            return self._client.validateResponseContent(signature, response.content, encoding=response.encoding,
+                                                        timestamp=timestamp)
+
+        def _validateStream(self, response, signature, timestamp):
+            validator = self._client.responseValidator(signature, timestamp=timestamp, encoding=response.encoding)
+            iterContent = response.iter_content
+
+            def validatedContent(chunk_size=1, decode_unicode=False):
+                def generate():
+                    for chunk in iterContent(chunk_size):
+                        validator.update(chunk)
+                        yield chunk
+                    response.validSignature = validator.finish()
+                    if self._client.instrumentation is not None:
+                        self._client.instrumentation.count(metrics.VALIDATED_RESPONSES)
+                    # the body has been consumed, stop validating
+                    response.__dict__.pop('iter_content', None)
+                chunks = generate()
+                if decode_unicode:
+                    chunks = stream_decode_response_unicode(chunks, response)
+                return chunks
+            response.iter_content = validatedContent
+    return SignatureAdapter
+
+def _signatureResult(future, response):
+    return future.result()
+
+def waitAll(responses, timeout=None):
+    '''Waits for the validation of a batch of responses
+
+    Args:
+        responses (iterable): responses of the `SignatureAdapter`
+        timeout (float, optional): maximum seconds to wait (default: no limit)
+
+    Return:
+        list: The `validSignature` of every response, in the same order
+
+    Raises:
+        concurrent.futures.TimeoutError: if the validations didn't finish in time
+    '''
+    from concurrent.futures import TimeoutError, wait
+    responses = list(responses)
+    futures = [r.signatureFuture for r in responses if getattr(r, 'signatureFuture', None) is not None]
+    if futures and wait(futures, timeout=timeout).not_done:
+        raise TimeoutError('The signature of some responses is still being validated')
+    return [getattr(r, 'validSignature', None) for r in responses]
+
+def getHTTPAdapter(signatureKey, baseUrl=None, signatureVersion=None, poolConnections=10, poolMaxsize=10,
+                   retries=3, backoffFactor=0.5, keepAlive=True, prewarm=0, clockSkew=True, **kwargs):
+    '''Builds a `SignatureAdapter` with a connection pool and a retry policy
+
+    Connection errors and the 429, 502, 503 and 504 responses of idempotent
+    requests are retried with an exponential backoff, signing every attempt again.
+
+    Args:
+        signatureKey (str): Inbenta signature key
+        baseUrl (str, optional): The base endpoint url
+        signatureVersion (str, optional): signature protocol version (default: lastest)
+        poolConnections (int, optional): number of hosts with a connection pool
+        poolMaxsize (int, optional): connections kept in each pool, as many as threads sharing it
+        retries (int or urllib3.util.Retry, optional): number of retries or retry policy (default: 3)
+        backoffFactor (float, optional): backoff factor of the retries, ignored with a `Retry`
+        keepAlive (bool, optional): enable the TCP keep-alive of the idle connections (default: True)
+        prewarm (int, optional): connections opened to the `baseUrl` host right away (default: 0)
+        clockSkew (bool or ClockSkew, optional): correct the timestamps with the server clock (default: True)
+        **kwargs: kwargs of the `SignatureAdapter` (instrumentation...)
+
+    Return:
+        SignatureAdapter: the adapter, mount it on the `baseUrl`
+
+    Example:
+        s = requests.Session()
+        s.mount(INBENTA_ENDPOINT_URL, getHTTPAdapter(INBENTA_SIGNATURE_KEY, INBENTA_ENDPOINT_URL, prewarm=4))
+    '''
+    if not isinstance(retries, Retry):
+        retries = Retry(total=retries, backoff_factor=backoffFactor, status_forcelist=RETRY_STATUSES,
+                        raise_on_status=False)
+    if keepAlive:
+        kwargs.setdefault('socketOptions', HTTPConnection.default_socket_options +
+                          [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)])
+    adapter = SignatureAdapter(signatureKey, baseUrl, signatureVersion, pool_connections=poolConnections,
+                               pool_maxsize=poolMaxsize, retries=retries, clockSkew=clockSkew, **kwargs)
+    if prewarm and baseUrl:
+        adapter.prewarm(baseUrl, prewarm)
+    return adapter
+
+def changeBaseHTTPAdapter(cls):
+    '''Allows to change the base class of the Adapter to use a custom HTTPAdapter'''
+    if not isinstance(cls, type) or not issubclass(cls, HTTPAdapter):
+        raise TypeError("The adapter class should be an class of type HTTPAdapter")
+    global SignatureAdapter
+    SignatureAdapter = __createAdapter(cls)
+    return SignatureAdapter
+
+SignatureAdapter = __createAdapter(HTTPAdapter)
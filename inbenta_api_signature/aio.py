@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""asyncio integrations of the signature protocol (Python 3 only).
+
+The `httpx` and `aiohttp` integrations are only built if the libraries are installed.
+"""
+import asyncio
+import functools
+
+from . import SignatureClient
+
+try:
+    import httpx
+    BUILD_HTTPX = True
+except ImportError:
+    BUILD_HTTPX = False
+
+try:
+    import aiohttp
+    BUILD_AIOHTTP = True
+except ImportError:
+    BUILD_AIOHTTP = False
+
+
+__all__ = ['AsyncSignatureClient']
+
+
+class AsyncSignatureClient(object):
+    '''Inbenta Signature Client for asyncio applications
+
+    Same as `SignatureClient` but with awaitable methods. Every call signs with its
+    own timestamp, so one instance can be shared by all the tasks of the loop.
+    Bodies bigger than `offloadSize`, files and generators are signed and validated
+    in an executor to avoid blocking the event loop.
+
+    Args:
+        signatureKey (str): The Inbenta signature key that will be used
+        baseUrl (str, optional): The base endpoint url
+        signatureVersion (str, optional): signature protocol version (default: lastest)
+        executor (concurrent.futures.Executor, optional): executor for big bodies (default: loop executor)
+        offloadSize (int, optional): body size from which the work is done in the executor
+    '''
+    OFFLOAD_SIZE = 64 * 1024
+
+    def __init__(self, signatureKey, baseUrl=None, signatureVersion=None, executor=None, offloadSize=None):
+        self._client = SignatureClient(signatureKey, baseUrl=baseUrl, signatureVersion=signatureVersion)
+        self._executor = executor
+        self._offloadSize = self.OFFLOAD_SIZE if offloadSize is None else offloadSize
+
+    @property
+    def client(self):
+        '''The synchronous `SignatureClient` behind this client'''
+        return self._client
+
+    @property
+    def SIGNATURE_HEADER(self):
+        return self._client.SIGNATURE_HEADER
+
+    @property
+    def TIMESTAMP_HEADER(self):
+        return self._client.TIMESTAMP_HEADER
+
+    def genTimestamp(self):
+        '''Generates a timestamp in string format for the request'''
+        return self._client.genTimestamp()
+
+    async def sign(self, url, params=None, body=None, method=None, timestamp=None):
+        '''Sign the request
+
+        Return:
+            RequestSignature: The signature, the timestamp used and the signature headers
+        '''
+        return await self._run(body, self._client.sign, url, params=params, body=body, method=method, timestamp=timestamp)
+
+    async def signRequest(self, url, params=None, body=None, method=None, timestamp=None):
+        '''Build the signature headers
+
+        Return:
+            dict: The signature headers generated by the requests
+        '''
+        signed = await self.sign(url, params=params, body=body, method=method, timestamp=timestamp)
+        return signed.headers
+
+    async def validateResponse(self, signature, body, timestamp):
+        '''Validate the signature header of the response
+
+        Args:
+            signature (str): The signature header of the response
+            body (str): The response body
+            timestamp (str): timestamp used to sign the request
+
+        Return:
+            bool: True or False if signature could be verified or not
+        '''
+        return await self._run(body, self._client.validateResponse, signature, body, timestamp=timestamp)
+
+    async def validateResponseContent(self, signature, content, encoding=None, timestamp=None):
+        '''Validate the signature header of the response from the raw body
+
+        Args:
+            signature (str): The signature header of the response
+            content (bytes): The response body
+            encoding (str, optional): charset of the content (default: utf-8), it is not detected
+            timestamp (str): timestamp used to sign the request
+
+        Return:
+            bool: True or False if signature could be verified or not
+        '''
+        return await self._run(content, self._client.validateResponseContent, signature, content,
+                               encoding=encoding, timestamp=timestamp)
+
+    async def _run(self, payload, func, *args, **kwargs):
+        # files and generators have no size, they are read in the executor
+        if payload is None or (isinstance(payload, (bytes, bytearray, memoryview, str)) and
+                               len(payload) <= self._offloadSize):
+            return func(*args, **kwargs)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+
+if BUILD_AIOHTTP:
+    __all__ += ['signatureMiddleware']
+
+    def signatureMiddleware(client):
+        '''aiohttp client middleware that signs the requests and validates the responses
+
+        The response gets the `validSignature` attribute, with the same values as
+        the one set by `SignatureAdapter`.
+
+        Args:
+            client (AsyncSignatureClient): client used to sign and validate
+
+        Example:
+            client = AsyncSignatureClient(INBENTA_SIGNATURE_KEY, INBENTA_ENDPOINT_URL)
+            async with aiohttp.ClientSession(middlewares=[signatureMiddleware(client)]) as s:
+                async with s.get(url) as r:
+                    r.validSignature
+        '''
+        async def middleware(request, handler):
+            body = request.body
+            if hasattr(body, 'as_bytes'):
+                body = await body.as_bytes()
+            signed = await client.sign(str(request.url), body=body, method=request.method)
+            request.headers.update(signed.headers)
+            response = await handler(request)
+            response.validSignature = None
+            signature = response.headers.get(client.SIGNATURE_HEADER)
+            if signature:
+                content = await response.read()
+                response.validSignature = await client.validateResponseContent(
+                    signature, content, encoding=response.charset, timestamp=signed.timestamp)
+            return response
+        return middleware
+
+
+if BUILD_HTTPX:
+    __all__ += ['SignatureAuth']
+
+    class SignatureAuth(httpx.Auth):
+        '''httpx authentication flow that signs the requests and validates the responses
+
+        Works with both `httpx.Client` and `httpx.AsyncClient`. The response gets the
+        `validSignature` attribute, with the same values as the one set by `SignatureAdapter`.
+
+        Args:
+            client (AsyncSignatureClient): client used to sign and validate
+
+        Example:
+            auth = SignatureAuth(AsyncSignatureClient(INBENTA_SIGNATURE_KEY, INBENTA_ENDPOINT_URL))
+            async with httpx.AsyncClient(auth=auth) as c:
+                r = await c.get(url)
+                r.validSignature
+        '''
+        requires_request_body = True
+        requires_response_body = True
+
+        def __init__(self, client):
+            self._client = client
+
+        def auth_flow(self, request):
+            signed = self._client.client.sign(str(request.url), body=request.content, method=request.method)
+            request.headers.update(signed.headers)
+            response = yield request
+            response.validSignature = None
+            signature = response.headers.get(self._client.SIGNATURE_HEADER)
+            if signature:
+                response.validSignature = self._client.client.validateResponseContent(
+                    signature, response.content, encoding=response.charset_encoding, timestamp=signed.timestamp)
+
+        async def async_auth_flow(self, request):
+            await request.aread()
+            signed = await self._client.sign(str(request.url), body=request.content, method=request.method)
+            request.headers.update(signed.headers)
+            response = yield request
+            await response.aread()
+            response.validSignature = None
+            signature = response.headers.get(self._client.SIGNATURE_HEADER)
+            if signature:
+                response.validSignature = await self._client.validateResponseContent(
+                    signature, response.content, encoding=response.charset_encoding, timestamp=signed.timestamp)
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""ASGI middleware that verifies the signed requests and signs the responses (Python 3 only).
+
+The ASGI version of `middleware.SignatureMiddleware`, it only needs the standard library.
+"""
+from . import SignatureClient
+from .middleware import _charset, _checkReplay, _rejectionBody
+
+
+__all__ = ['ASGISignatureMiddleware']
+
+
+class ASGISignatureMiddleware(object):
+    '''ASGI middleware that verifies the signature of the requests and signs the responses
+
+    Same as the WSGI `SignatureMiddleware`: the requests without the signature
+    headers are rejected before their body is received, the body messages are
+    hashed as they arrive and replayed to the application, and the requests with
+    a wrong signature get a 403. The response body is collected to sign it.
+    Only the `http` scopes are verified.
+
+    Args:
+        app: The ASGI application
+        signatureKey (str): Inbenta signature key
+        baseUrl (str, optional): The base endpoint url, its path is not signed
+        signatureVersion (str, optional): signature protocol version (default: lastest)
+        instrumentation (Instrumentation, optional): counters of the rejections (default: disabled)
+        replayGuard (ReplayGuard, optional): rejects the stale and replayed requests (default: disabled)
+
+    Example:
+        app = ASGISignatureMiddleware(app, INBENTA_SIGNATURE_KEY, INBENTA_ENDPOINT_URL)
+    '''
+    def __init__(self, app, signatureKey, baseUrl=None, signatureVersion=None, instrumentation=None,
+                 replayGuard=None):
+        self.app = app
+        self.replayGuard = replayGuard
+        self._client = SignatureClient(signatureKey, baseUrl=baseUrl, signatureVersion=signatureVersion,
+                                       instrumentation=instrumentation)
+
+    @property
+    def client(self):
+        '''The `SignatureClient` used to verify and sign'''
+        return self._client
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+        protocol = self._client._signProtocol
+        headers = dict((name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers'])
+        verifier = protocol.requestVerifier(_requestUrl(scope, headers), scope['method'], headers)
+        if verifier is None:
+            return await self._reject(send, 'The signature headers are missing')
+        messages = []
+        while True:
+            message = await receive()
+            if message['type'] != 'http.request':
+                # the client is gone
+                return
+            verifier.update(message.get('body', b''))
+            messages.append(message)
+            if not message.get('more_body'):
+                break
+        if not verifier.finish():
+            return await self._reject(send, 'The signature is not valid')
+        if not _checkReplay(self.replayGuard, verifier):
+            return await self._reject(send, 'The request has expired or was already received')
+
+        async def replay():
+            if messages:
+                return messages.pop(0)
+            return await receive()
+
+        started = []
+        chunks = []
+
+        async def signResponse(message):
+            if message['type'] == 'http.response.start':
+                started.append(message)
+                return
+            if message['type'] != 'http.response.body':
+                return await send(message)
+            chunks.append(message.get('body', b''))
+            if message.get('more_body'):
+                return
+            start = started[0]
+            content = b''.join(chunks)
+            responseHeaders = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in start['headers']]
+            signed = protocol.signResponseContent(content, verifier.timestamp, encoding=_charset(responseHeaders))
+            responseHeaders = [(name.encode('latin-1'), value.encode('latin-1'))
+                               for name, value in responseHeaders if name.lower() not in signed]
+            responseHeaders += [(name.encode('latin-1'), value.encode('latin-1')) for name, value in signed.items()]
+            await send(dict(start, headers=responseHeaders))
+            await send({'type': 'http.response.body', 'body': content})
+
+        await self.app(scope, replay, signResponse)
+
+    @staticmethod
+    async def _reject(send, message):
+        content = _rejectionBody(403, message)
+        await send({'type': 'http.response.start', 'status': 403,
+                    'headers': [(b'content-type', b'application/json'),
+                                (b'content-length', str(len(content)).encode('latin-1'))]})
+        await send({'type': 'http.response.body', 'body': content})
+
+
+def _requestUrl(scope, headers):
+    '''The url of the request as it was sent, the raw path if the server provides it'''
+    path = scope.get('raw_path')
+    path = path.decode('latin-1') if path else scope.get('root_path', '') + scope['path']
+    query = scope.get('query_string')
+    if query:
+        path += '?' + query.decode('latin-1')
+    return '{}://{}{}'.format(scope.get('scheme', 'http'), headers.get('host', ''), path)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Request bodies that are read while they are signed and read again to be sent.
+
+Files are rewound after signing. The pipes, sockets and generators can only be
+read once, they are copied to a temporary file first.
+"""
+import tempfile
+
+
+# Bodies bigger than this are spooled to disk while they are signed
+SPOOL_MAX_SIZE = 1024 * 1024
+# Size of the pieces read from the files that can't be rewound
+CHUNK_SIZE = 64 * 1024
+
+
+def _seekable(body):
+    '''Whether a file body can be rewound, the pipes and sockets have `seek` and `tell` but raise'''
+    if not (hasattr(body, 'seek') and hasattr(body, 'tell')):
+        return False
+    seekable = getattr(body, 'seekable', None)
+    return seekable is None or seekable()
+
+def _iterable(body):
+    '''Whether the body is an iterable of chunks, like a generator, that can only be read once'''
+    return hasattr(body, '__iter__') and not hasattr(body, 'read') and \
+        not isinstance(body, (str, bytes, bytearray, memoryview, list, tuple, dict))
+
+def _spool(body):
+    '''Copy a file that can't be rewound or an iterable body to a temporary file
+
+    Only the big bodies are written to disk.
+
+    Return:
+        SpooledTemporaryFile: the body, at its start
+    '''
+    chunks = iter(lambda: body.read(CHUNK_SIZE), body.read(0)) if hasattr(body, 'read') else body
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    for chunk in chunks:
+        spool.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf8'))
+    spool.seek(0)
+    return spool
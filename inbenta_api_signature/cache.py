@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""Bounded caches used by the signature client."""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+
+__all__ = ['LRUCache', 'CacheInfo']
+
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])
+
+timer = getattr(time, 'monotonic', time.time)
+
+
+class LRUCache(object):
+    '''Thread safe least recently used cache
+
+    Args:
+        maxsize (int): Maximum number of entries kept in the cache
+        ttl (float, optional): Seconds an entry can stay unused before it expires (default: never)
+        onEvict (callable, optional): Called with (key, value) of every entry evicted, expired
+            or cleared, out of the cache lock
+    '''
+    def __init__(self, maxsize, ttl=None, onEvict=None):
+        if maxsize <= 0:
+            raise ValueError('The cache size should be greater than 0')
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._onEvict = onEvict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def get(self, key, default=None):
+        evicted = []
+        with self._lock:
+            now = self._now()
+            self._expire(now, evicted)
+            try:
+                value, _ = self._data.pop(key)
+            except KeyError:
+                self._misses += 1
+                value = default
+            else:
+                self._data[key] = (value, now)
+                self._hits += 1
+        self._evicted(evicted)
+        return value
+
+    def set(self, key, value):
+        evicted = []
+        with self._lock:
+            now = self._now()
+            previous = self._data.pop(key, None)
+            if previous is not None and previous[0] is not value:
+                evicted.append((key, previous[0]))
+            self._data[key] = (value, now)
+            self._expire(now, evicted)
+            while len(self._data) > self._maxsize:
+                evicted.append(self._popOldest())
+        self._evicted(evicted)
+
+    def pop(self, key, default=None):
+        '''Removes an entry without calling `onEvict`, returns its value'''
+        with self._lock:
+            entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def expire(self):
+        '''Removes the entries unused for longer than the ttl'''
+        evicted = []
+        with self._lock:
+            self._expire(self._now(), evicted)
+        self._evicted(evicted)
+
+    def clear(self):
+        with self._lock:
+            evicted = [(key, value) for key, (value, _) in self._data.items()]
+            self._data.clear()
+        self._evicted(evicted)
+
+    def info(self):
+        '''Returns the hits, misses and evictions counters'''
+        with self._lock:
+            return CacheInfo(self._hits, self._misses, self._evictions, self._maxsize, len(self._data))
+
+    def _now(self):
+        # the last use is only tracked when the entries can expire
+        return timer() if self._ttl is not None else None
+
+    def _expire(self, now, evicted):
+        # the entries are sorted by last use, the expired ones are the first
+        if self._ttl is None:
+            return
+        while self._data:
+            _, (_, used) = next(iter(self._data.items()))
+            if now - used <= self._ttl:
+                break
+            evicted.append(self._popOldest())
+
+    def _popOldest(self):
+        key, (value, _) = self._data.popitem(last=False)
+        self._evictions += 1
+        return key, value
+
+    def _evicted(self, evicted):
+        if self._onEvict is not None:
+            for key, value in evicted:
+                self._onEvict(key, value)
+
+    def __len__(self):
+        return len(self._data)
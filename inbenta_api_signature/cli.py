@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""Command line interface to sign and verify batches of JSON lines.
+
+    python -m inbenta_api_signature sign --key KEY requests.jsonl > signatures.jsonl
+    python -m inbenta_api_signature verify --key KEY responses.jsonl > results.jsonl
+
+`sign` reads records with `url`, `method` and the optional `params`, `body` and
+`timestamp`, and writes their `signature`, `timestamp` and `headers`.
+`verify` reads records with `body`, `signature` and `timestamp` and writes `valid`.
+A record that can't be processed gets an `error` instead. The results are written
+in the same order as the input, the work is spread over a pool of processes.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+
+from . import SignatureClient
+
+
+__all__ = ['main']
+
+# SignatureClient of the worker processes, see `_initWorker`
+_client = None
+
+
+def _initWorker(signatureKey, baseUrl, signatureVersion):
+    global _client
+    _client = SignatureClient(signatureKey, baseUrl=baseUrl, signatureVersion=signatureVersion)
+
+
+def _sign(line):
+    try:
+        record = json.loads(line)
+        signed = _client.sign(record['url'], params=record.get('params'), body=record.get('body'),
+                              method=record['method'], timestamp=record.get('timestamp'))
+        result = {'signature': signed.signature, 'timestamp': signed.timestamp, 'headers': signed.headers}
+    except Exception as e:
+        return json.dumps({'error': '{}: {}'.format(type(e).__name__, e)}), False
+    return json.dumps(result, sort_keys=True), True
+
+
+def _verify(line):
+    try:
+        record = json.loads(line)
+        valid = _client.validateResponse(record['signature'], record['body'], timestamp=record['timestamp'])
+    except Exception as e:
+        return json.dumps({'error': '{}: {}'.format(type(e).__name__, e)}), False
+    return json.dumps({'valid': valid}), valid
+
+
+COMMANDS = {'sign': _sign, 'verify': _verify}
+
+
+def _lines(files, stdin):
+    '''Yields the non blank lines of the files ('-' is stdin)'''
+    for name in files or ['-']:
+        stream = stdin if name == '-' else io.open(name, encoding='utf-8')
+        try:
+            for line in stream:
+                if line.strip():
+                    yield line
+        finally:
+            if stream is not stdin:
+                stream.close()
+
+
+def _parser():
+    parser = argparse.ArgumentParser(prog='python -m inbenta_api_signature',
+                                     description='Sign requests and verify responses of the Inbenta APIs in batch')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+    for command, help in [('sign', 'sign JSON lines requests (url, method, params, body, timestamp)'),
+                          ('verify', 'verify JSON lines responses (body, signature, timestamp)')]:
+        subparser = subparsers.add_parser(command, help=help)
+        subparser.add_argument('files', nargs='*', metavar='FILE', help='JSON lines files (default: stdin)')
+        subparser.add_argument('--key', default=os.environ.get('INBENTA_API_SIGNATURE_KEY'),
+                               help='signature key (default: $INBENTA_API_SIGNATURE_KEY)')
+        subparser.add_argument('--base-url', help='base endpoint url of the requests')
+        subparser.add_argument('--signature-version', default='v1', help='signature protocol version (default: v1)')
+        subparser.add_argument('--processes', type=int, default=None,
+                               help='number of worker processes (default: number of cpus)')
+        subparser.add_argument('--chunksize', type=int, default=256,
+                               help='records sent to a worker at a time (default: 256)')
+    return parser
+
+
+def main(argv=None, stdin=None, stdout=None):
+    '''Runs the command line interface
+
+    Args:
+        argv (list, optional): command line arguments (default: sys.argv)
+        stdin (file, optional): input when no files are given (default: sys.stdin)
+        stdout (file, optional): output of the results (default: sys.stdout)
+
+    Return:
+        int: 0 if all the records were processed and valid, 1 otherwise
+    '''
+    parser = _parser()
+    args = parser.parse_args(argv)
+    if not args.key:
+        parser.error('the signature key is required, use --key or $INBENTA_API_SIGNATURE_KEY')
+    stdin = stdin or sys.stdin
+    stdout = stdout or sys.stdout
+    func = COMMANDS[args.command]
+    initargs = (args.key, args.base_url, args.signature_version)
+    lines = _lines(args.files, stdin)
+    processes = args.processes or multiprocessing.cpu_count()
+
+    pool = None
+    if processes > 1:
+        pool = multiprocessing.Pool(processes, initializer=_initWorker, initargs=initargs)
+        # imap keeps the input order while the chunks are processed in parallel
+        results = pool.imap(func, lines, chunksize=max(args.chunksize, 1))
+    else:
+        _initWorker(*initargs)
+        results = (func(line) for line in lines)
+    status = 0
+    try:
+        for output, ok in results:
+            stdout.write(output + '\n')
+            if not ok:
+                status = 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return status
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Estimation of the offset between the local clock and the server clock."""
+import threading
+from email.utils import mktime_tz, parsedate_tz
+
+
+__all__ = ['ClockSkew']
+
+
+class ClockSkew(object):
+    '''Smoothed offset of the server clock from the `Date` header of its responses
+
+    The `Date` header has a resolution of one second, every sample is smoothed
+    with an exponentially weighted moving average. A sample taken from a rejected
+    request replaces the estimation, as the timestamp was probably the cause.
+
+    Args:
+        smoothing (float, optional): weight of every new sample (default: 0.2)
+
+    Attributes:
+        offset (float): seconds to add to the local time to get the server time
+        samples (int): number of samples taken
+    '''
+    SMOOTHING = 0.2
+
+    def __init__(self, smoothing=None):
+        self._smoothing = self.SMOOTHING if smoothing is None else smoothing
+        self._lock = threading.Lock()
+        self.offset = 0.0
+        self.samples = 0
+
+    @staticmethod
+    def sample(date, sent, received):
+        '''Offset of the server clock measured by one response
+
+        Args:
+            date (str): `Date` header of the response
+            sent (float): local time when the request was sent
+            received (float): local time when the response was received
+
+        Return:
+            float: the offset, None if the date can't be parsed
+        '''
+        parsed = parsedate_tz(date) if date else None
+        if parsed is None:
+            return None
+        # the date is truncated to the second and taken half way through the round trip
+        return mktime_tz(parsed) + 0.5 - (sent + received) / 2.0
+
+    def update(self, date, sent, received, reset=False):
+        '''Adds the sample of a response to the estimation
+
+        Args:
+            reset (bool, optional): replace the estimation instead of smoothing it
+
+        Return:
+            float: the new offset
+        '''
+        sample = self.sample(date, sent, received)
+        with self._lock:
+            if sample is not None:
+                if reset or not self.samples:
+                    self.offset = sample
+                else:
+                    self.offset += self._smoothing * (sample - self.offset)
+                self.samples += 1
+            return self.offset
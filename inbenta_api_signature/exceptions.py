@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+"""Exceptions raised by the signature client."""
+
+__all__ = ['SignatureError', 'InvalidSignatureError']
+
+
+class SignatureError(ValueError):
+    '''Base class of the signature errors'''
+
+
+class InvalidSignatureError(SignatureError):
+    '''The signature of a response is missing or doesn't match
+
+    Args:
+        message (str): Description of the error
+        response (optional): The response that could not be validated
+    '''
+    def __init__(self, message, response=None):
+        super(InvalidSignatureError, self).__init__(message)
+        self.response = response
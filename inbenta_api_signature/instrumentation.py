@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""Instrumentation hooks of the signing and validation phases.
+
+An `Instrumentation` can be given to `V1`, `SignatureClient` or `SignatureAdapter`.
+When none is given the hot paths only pay an `is None` check.
+"""
+import threading
+import time
+
+
+__all__ = ['Instrumentation', 'StatsInstrumentation', 'OpenTelemetryInstrumentation', 'PHASES', 'COUNTERS', 'GAUGES']
+
+timer = getattr(time, 'perf_counter', time.time)
+
+# Timed phases
+CANONICALIZE = 'canonicalize'
+BODY_ENCODING = 'body_encoding'
+HMAC = 'hmac'
+RESPONSE_DECODE = 'response_decode'
+RESPONSE_BASE_STRING = 'response_base_string'
+PHASES = [CANONICALIZE, BODY_ENCODING, HMAC, RESPONSE_DECODE, RESPONSE_BASE_STRING]
+
+# Counters
+BODY_BYTES = 'body_bytes'
+SIGNATURE_FAILURES = 'signature_failures'
+MISSING_SIGNATURES = 'missing_signatures'
+STALE_REQUESTS = 'stale_requests'
+REPLAYED_REQUESTS = 'replayed_requests'
+VALIDATED_RESPONSES = 'validated_responses'
+SKIPPED_VALIDATIONS = 'skipped_validations'
+COUNTERS = [BODY_BYTES, SIGNATURE_FAILURES, MISSING_SIGNATURES, STALE_REQUESTS, REPLAYED_REQUESTS,
+            VALIDATED_RESPONSES, SKIPPED_VALIDATIONS]
+
+# Gauges
+CLOCK_OFFSET = 'clock_offset'
+GAUGES = [CLOCK_OFFSET]
+
+
+class Instrumentation(object):
+    '''Base class of the instrumentation hooks, override the methods you need'''
+    def phase(self, name, seconds):
+        '''Called with the time spent in one of the `PHASES`'''
+
+    def count(self, name, value=1):
+        '''Called to increase one of the `COUNTERS`'''
+
+    def gauge(self, name, value):
+        '''Called with the current value of one of the `GAUGES`'''
+
+
+class StatsInstrumentation(Instrumentation):
+    '''Aggregates the phase timings and the counters in memory
+
+    `timings` maps every phase to (calls, total seconds), `counters` every counter
+    to its value and `gauges` every gauge to its last value.
+    '''
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.timings = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def phase(self, name, seconds):
+        with self._lock:
+            calls, total = self.timings.get(name, (0, 0.0))
+            self.timings[name] = (calls + 1, total + seconds)
+
+    def count(self, name, value=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        self.gauges[name] = value
+
+
+class OpenTelemetryInstrumentation(Instrumentation):
+    '''Records the phases and counters with an OpenTelemetry meter
+
+    The phases are recorded in the `inbenta.signature.duration` histogram with a `phase`
+    attribute, the counters as `inbenta.signature.<counter>` counters and the gauges as
+    `inbenta.signature.<gauge>` gauges (if the meter supports synchronous gauges).
+
+    Args:
+        meter (opentelemetry.metrics.Meter): meter used to create the instruments
+    '''
+    def __init__(self, meter):
+        self._duration = meter.create_histogram('inbenta.signature.duration', unit='s',
+                                                description='Time spent in each signature phase')
+        self._counters = dict((name, meter.create_counter('inbenta.signature.' + name)) for name in COUNTERS)
+        createGauge = getattr(meter, 'create_gauge', None)
+        self._gauges = dict((name, createGauge('inbenta.signature.' + name)) for name in GAUGES) if createGauge else {}
+
+    def phase(self, name, seconds):
+        self._duration.record(seconds, {'phase': name})
+
+    def count(self, name, value=1):
+        self._counters[name].add(value)
+
+    def gauge(self, name, value):
+        if name in self._gauges:
+            self._gauges[name].set(value)
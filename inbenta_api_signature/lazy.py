@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Responses that validate their signature the first time it is read."""
+
+
+__all__ = ['LazySignature']
+
+# not picklable, the signature is validated before pickling the response
+_LAZY_ATTRIBUTES = ('_signatureCheck', '_validSignature', 'signatureFuture')
+
+
+class LazySignature(object):
+    '''Mixin of the responses built by the `SignatureAdapter` and the `SignaturePoolManager`
+
+    `validSignature` is computed and cached the first time it is read, so
+    the responses that are never checked don't decode nor hash the body.
+
+    `validationSkipped` is True when a validation policy decided not to validate it.
+    `signatureFuture` is the future of the validation when it runs in an executor,
+    reading `validSignature` waits for it.
+    '''
+    _signatureCheck = None
+    _validSignature = None
+    validationSkipped = False
+    signatureFuture = None
+
+    @property
+    def validSignature(self):
+        check = self._signatureCheck
+        if check is not None:
+            self._validSignature = check(self)
+            self._signatureCheck = None
+        return self._validSignature
+
+    @validSignature.setter
+    def validSignature(self, value):
+        self._signatureCheck = None
+        self._validSignature = value
+
+    def __reduce__(self):
+        # the generated class can't be imported, it is pickled as the class of
+        # the response with the signature validated
+        cls = type(self).__bases__[-1]
+        getstate = getattr(self, '__getstate__', None)
+        state = getstate() if getstate is not None else self.__dict__
+        state = dict((name, value) for name, value in state.items() if name not in _LAZY_ATTRIBUTES)
+        return _unpickle, (cls, state, self.validSignature, self.validationSkipped)
+
+_lazyClasses = {}
+
+def _lazySignature(response):
+    '''Turns the response into a `LazySignature` version of its class'''
+    cls = type(response)
+    if cls not in _lazyClasses:
+        _lazyClasses[cls] = type(cls.__name__, (LazySignature, cls), {})
+    response.__class__ = _lazyClasses[cls]
+    return response
+
+def _unpickle(cls, state, validSignature, validationSkipped):
+    '''Rebuilds a pickled `LazySignature` response'''
+    response = cls.__new__(cls)
+    if hasattr(response, '__setstate__'):
+        response.__setstate__(state)
+    else:
+        response.__dict__.update(state)
+    response = _lazySignature(response)
+    response.validSignature = validSignature
+    response.validationSkipped = validationSkipped
+    return response
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""WSGI middleware that verifies the signed requests and signs the responses.
+
+It is the server side of the protocol, for the services that receive the
+requests signed by `SignatureClient`. The ASGI version is `asgi.ASGISignatureMiddleware`.
+"""
+import json
+import re
+import tempfile
+from wsgiref.util import request_uri
+
+from . import SignatureClient
+
+
+__all__ = ['SignatureMiddleware']
+
+# Request bodies bigger than this are spooled to disk while they are verified
+SPOOL_MAX_SIZE = 1024 * 1024
+
+_CHARSET = re.compile(r'charset=["\']?([^"\';\s]+)', re.I)
+
+
+class SignatureMiddleware(object):
+    '''WSGI middleware that verifies the signature of the requests and signs the responses
+
+    The requests without the signature headers are rejected before their body
+    is read. The body of the others is hashed while it is read, once, and kept
+    in a spooled file that replaces `wsgi.input` for the application. The
+    requests with a wrong signature get a 403 and never reach the application.
+
+    The response body of the application is collected to sign it, the signature
+    headers have to be sent before it.
+
+    Args:
+        app: The WSGI application
+        signatureKey (str): Inbenta signature key
+        baseUrl (str, optional): The base endpoint url, its path is not signed
+        signatureVersion (str, optional): signature protocol version (default: lastest)
+        instrumentation (Instrumentation, optional): counters of the rejections (default: disabled)
+        replayGuard (ReplayGuard, optional): rejects the stale and replayed requests (default: disabled)
+
+    Example:
+        app = SignatureMiddleware(app, INBENTA_SIGNATURE_KEY, INBENTA_ENDPOINT_URL)
+    '''
+    REJECTION_STATUS = '403 Forbidden'
+
+    def __init__(self, app, signatureKey, baseUrl=None, signatureVersion=None, instrumentation=None,
+                 replayGuard=None):
+        self.app = app
+        self.replayGuard = replayGuard
+        self._client = SignatureClient(signatureKey, baseUrl=baseUrl, signatureVersion=signatureVersion,
+                                       instrumentation=instrumentation)
+
+    @property
+    def client(self):
+        '''The `SignatureClient` used to verify and sign'''
+        return self._client
+
+    def __call__(self, environ, start_response):
+        protocol = self._client._signProtocol
+        headers = dict((name, environ.get('HTTP_' + name.upper().replace('-', '_'), '')) for name in protocol.HEADERS)
+        verifier = protocol.requestVerifier(_requestUrl(environ), environ['REQUEST_METHOD'], headers)
+        if verifier is None:
+            return self._reject(start_response, 'The signature headers are missing')
+        body = self._readBody(environ, verifier)
+        if not verifier.finish():
+            return self._reject(start_response, 'The signature is not valid')
+        if not _checkReplay(self.replayGuard, verifier):
+            return self._reject(start_response, 'The request has expired or was already received')
+        if body is not None:
+            environ['wsgi.input'] = body
+        return self._signedResponse(environ, start_response, verifier.timestamp)
+
+    def _readBody(self, environ, verifier):
+        '''Hashes the request body while it is spooled, returns the spool (None without body)'''
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        # servers that de-chunk the body mark the input as terminated
+        if not length and not environ.get('wsgi.input_terminated'):
+            return None
+        stream = environ['wsgi.input']
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        size = self._client._signProtocol.CHUNK_SIZE
+        remaining = length or None
+        while remaining is None or remaining > 0:
+            chunk = stream.read(size if remaining is None else min(size, remaining))
+            if not chunk:
+                break
+            verifier.update(chunk)
+            spool.write(chunk)
+            if remaining is not None:
+                remaining -= len(chunk)
+        spool.seek(0)
+        return spool
+
+    def _signedResponse(self, environ, start_response, timestamp):
+        chunks = []
+        started = []
+
+        def startResponse(status, headers, exc_info=None):
+            started[:] = [status, headers, exc_info]
+            # the `write` callable of the legacy applications
+            return chunks.append
+
+        result = self.app(environ, startResponse)
+        try:
+            for chunk in result:
+                chunks.append(chunk)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        status, headers, excInfo = started
+        content = b''.join(chunks)
+        signed = self._client._signProtocol.signResponseContent(content, timestamp,
+                                                                encoding=_charset(headers))
+        headers = [(name, value) for name, value in headers if name.lower() not in signed]
+        start_response(status, headers + list(signed.items()), excInfo)
+        return [content]
+
+    def _reject(self, start_response, message):
+        content = _rejectionBody(403, message)
+        start_response(self.REJECTION_STATUS, [('Content-Type', 'application/json'),
+                                               ('Content-Length', str(len(content)))])
+        return [content]
+
+
+def _requestUrl(environ):
+    '''The url of the request as it was sent, the raw one if the server provides it'''
+    raw = environ.get('RAW_URI') or environ.get('REQUEST_URI')
+    if not raw:
+        return request_uri(environ)
+    return '{}://{}{}'.format(environ.get('wsgi.url_scheme', 'http'),
+                              environ.get('HTTP_HOST') or environ.get('SERVER_NAME', ''), raw)
+
+
+def _charset(headers):
+    '''Charset of the Content-Type in a list of headers, None if missing'''
+    for name, value in headers:
+        if name.lower() == 'content-type':
+            charset = _CHARSET.search(value)
+            return charset and charset.group(1)
+    return None
+
+
+def _checkReplay(guard, verifier):
+    '''Whether a verified request passes the replay guard, if any'''
+    return guard is None or guard.check(verifier.signature, verifier.timestamp)
+
+
+def _rejectionBody(status, message):
+    return json.dumps({'error': {'code': status, 'message': message}}).encode('utf8')
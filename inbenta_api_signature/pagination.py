@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""Concurrent iteration over paginated Reporting API endpoints."""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from .exceptions import InvalidSignatureError
+
+
+__all__ = ['iterResults']
+
+
+def iterResults(session, url, params=None, headers=None, length=None, maxWorkers=4, validate=True):
+    '''Yields the `results` items of a paginated endpoint in order
+
+    The first page is requested to read `total_count`, then the remaining pages
+    are fetched concurrently with `offset`/`length` while the items are consumed.
+    At most `maxWorkers * 2` pages are kept in memory.
+
+    Args:
+        session (requests.Session): session with a `SignatureAdapter` mounted for the url
+        url (str): The endpoint url
+        params (dict, optional): The query parameters of every page (`date_from`, `date_to`...)
+        headers (dict, optional): Extra headers (authorization...)
+        length (int, optional): page size (default: the `length` returned by the first page)
+        maxWorkers (int, optional): number of pages requested at the same time
+        validate (bool, optional): raise if a page signature is not valid (default: True)
+
+    Raises:
+        InvalidSignatureError: if a page signature is missing or not valid
+        requests.HTTPError: if a page request fails
+    '''
+    def fetch(offset):
+        pageParams = dict(params or {}, offset=offset)
+        if length:
+            pageParams['length'] = length
+        response = session.get(url, params=pageParams, headers=headers)
+        response.raise_for_status()
+        if validate and response.validSignature is not True:
+            raise InvalidSignatureError('The signature of the page at offset {} is not valid'.format(offset), response)
+        return response.json()
+
+    page = fetch(0)
+    for item in page['results']:
+        yield item
+    pageSize = length or page.get('length') or len(page['results'])
+    if not pageSize:
+        return
+    offsets = iter(range(pageSize, page['total_count'], pageSize))
+
+    executor = ThreadPoolExecutor(max_workers=maxWorkers)
+    pending = deque()
+    try:
+        for offset in islice(offsets, maxWorkers * 2):
+            pending.append(executor.submit(fetch, offset))
+        while pending:
+            page = pending.popleft().result()
+            offset = next(offsets, None)
+            if offset is not None:
+                pending.append(executor.submit(fetch, offset))
+            for item in page['results']:
+                yield item
+    finally:
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=True)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Policies that decide which responses the `SignatureAdapter` validates.
+
+A policy is asked once per signed response, before its body is read, with
+the prepared request and the response. The skipped responses keep
+`validSignature = None` and get `validationSkipped = True`.
+"""
+import random
+
+from .url import urlparse
+
+
+__all__ = ['ValidationPolicy', 'AlwaysValidate', 'NeverValidate', 'SampledValidation', 'PrefixPolicy',
+           'SizePolicy']
+
+
+class ValidationPolicy(object):
+    '''Base class of the validation policies, it validates every response, the subclasses narrow `shouldValidate`'''
+    def shouldValidate(self, request, response):
+        '''Whether the signature of the response is validated
+
+        Args:
+            request: The prepared request sent
+            response: The response, its body has not been read
+
+        Return:
+            bool: True to validate the signature, False to skip it
+        '''
+        return True
+
+
+class AlwaysValidate(ValidationPolicy):
+    '''Validates every response, as the adapter does without a policy'''
+    def shouldValidate(self, request, response):
+        return True
+
+
+class NeverValidate(ValidationPolicy):
+    '''Skips the validation of every response'''
+    def shouldValidate(self, request, response):
+        return False
+
+
+class SampledValidation(ValidationPolicy):
+    '''Validates a random share of the responses
+
+    Args:
+        rate (float): share of the responses validated, from 0 to 1
+        seed (optional): seed of the random generator, for repeatable samples
+    '''
+    def __init__(self, rate, seed=None):
+        if not 0 <= rate <= 1:
+            raise ValueError('The sample rate should be between 0 and 1')
+        self.rate = rate
+        self._random = random.Random(seed).random
+
+    def shouldValidate(self, request, response):
+        return self._random() < self.rate
+
+
+class PrefixPolicy(ValidationPolicy):
+    '''Applies a different policy to the urls under every prefix
+
+    The longest prefix that matches the url, or its path, decides.
+
+    Args:
+        rules (dict): policy of every url or path prefix
+        default (ValidationPolicy, optional): policy of the urls without a rule (default: AlwaysValidate)
+
+    Example:
+        PrefixPolicy({'/v1/exports/': SampledValidation(0.01), '/v1/events/': SizePolicy(1024 * 1024)})
+    '''
+    def __init__(self, rules, default=None):
+        self._rules = sorted(rules.items(), key=lambda rule: len(rule[0]), reverse=True)
+        self.default = AlwaysValidate() if default is None else default
+
+    def shouldValidate(self, request, response):
+        return self.policyFor(request.url).shouldValidate(request, response)
+
+    def policyFor(self, url):
+        '''The policy that applies to the url'''
+        path = urlparse(url)[2]
+        for prefix, policy in self._rules:
+            if url.startswith(prefix) or path.startswith(prefix):
+                return policy
+        return self.default
+
+
+class SizePolicy(ValidationPolicy):
+    '''Validates the responses up to a size, from their `Content-Length`
+
+    Args:
+        maxSize (int): biggest body validated, in bytes
+        unknownSize (bool, optional): whether the responses without `Content-Length`
+            (chunked) are validated (default: True)
+    '''
+    def __init__(self, maxSize, unknownSize=True):
+        self.maxSize = maxSize
+        self.unknownSize = unknownSize
+
+    def shouldValidate(self, request, response):
+        try:
+            return int(response.headers['Content-Length']) <= self.maxSize
+        except (KeyError, TypeError, ValueError):
+            return self.unknownSize
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""urllib3 pool manager that signs the requests, without the `requests` layers.
+
+The connection pools sign every attempt right before it is sent, so the
+retries of urllib3 get a new timestamp and signature.
+"""
+import functools
+import re
+
+from urllib3 import PoolManager
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from . import SignatureClient
+from . import instrumentation as metrics
+from .bodies import _iterable, _seekable, _spool
+from .lazy import LazySignature, _lazySignature
+
+
+__all__ = ['SignaturePoolManager', 'SignatureHTTPConnectionPool', 'SignatureHTTPSConnectionPool']
+
+_CHARSET = re.compile(r'charset=["\']?([^"\';\s]+)', re.I)
+
+
+class _SigningPool(object):
+    '''Mixin of the connection pools that sign the requests with `client`'''
+    client = None
+
+    def urlopen(self, method, url, body=None, *args, **kwargs):
+        if self.client is not None:
+            if _iterable(body):
+                raise TypeError('The iterable bodies are consumed when they are signed, send bytes or a file')
+            if hasattr(body, 'read') and not _seekable(body):
+                # pipes can only be read once, spool them to be able to send them (and retry) after signing
+                body = _spool(body)
+        return super(_SigningPool, self).urlopen(method, url, body, *args, **kwargs)
+
+    def _make_request(self, conn, method, url, *args, **kwargs):
+        if self.client is None:
+            return super(_SigningPool, self)._make_request(conn, method, url, *args, **kwargs)
+        headers = kwargs.get('headers')
+        headers = kwargs['headers'] = dict(self.headers if headers is None else headers)
+        body = kwargs.get('body')
+        if _seekable(body):
+            position = body.tell()
+            signed = self.client.sign(url, body=body, method=method)
+            body.seek(position)
+        else:
+            signed = self.client.sign(url, body=body, method=method)
+        headers.update(signed.headers)
+        response = super(_SigningPool, self)._make_request(conn, method, url, *args, **kwargs)
+        # the timestamp travels with the response (the `httplib` one with urllib3 < 2)
+        response._signatureTimestamp = signed.timestamp
+        return response
+
+
+class SignatureHTTPConnectionPool(_SigningPool, HTTPConnectionPool):
+    pass
+
+
+class SignatureHTTPSConnectionPool(_SigningPool, HTTPSConnectionPool):
+    pass
+
+
+class SignaturePoolManager(PoolManager):
+    '''urllib3 PoolManager that signs the requests and validates the responses
+
+    The responses are the urllib3 `HTTPResponse` objects with a `validSignature`
+    attribute, with the same values as the one set by `SignatureAdapter`. It is
+    computed the first time it is read. The body that is not preloaded is hashed
+    while it is read with `read()` or `stream()`, and the rest of it is read then.
+
+    The request bodies must be bytes, strings or files, the files that can't be
+    rewound (pipes) are spooled. Iterables can't be signed before they are sent,
+    they raise a TypeError.
+
+    Args:
+        signatureKey (str): Inbenta signature key
+        baseUrl (str, optional): The base endpoint url
+        signatureVersion (str, optional): signature protocol version (default: lastest)
+        instrumentation (Instrumentation, optional): hooks to time every phase (default: disabled)
+        **kwargs: kwargs of the urllib3 `PoolManager` (num_pools, maxsize, retries...)
+
+    Example:
+        http = SignaturePoolManager(INBENTA_SIGNATURE_KEY, INBENTA_ENDPOINT_URL, maxsize=8)
+        r = http.request('GET', url, fields={'date_from': '2019-01-01'}, headers=headers)
+        r.validSignature
+    '''
+    def __init__(self, signatureKey, baseUrl=None, signatureVersion=None, instrumentation=None, **kwargs):
+        super(SignaturePoolManager, self).__init__(**kwargs)
+        self.pool_classes_by_scheme = {'http': SignatureHTTPConnectionPool, 'https': SignatureHTTPSConnectionPool}
+        self._client = SignatureClient(signatureKey, baseUrl=baseUrl, signatureVersion=signatureVersion,
+                                       instrumentation=instrumentation)
+
+    @property
+    def client(self):
+        '''The `SignatureClient` used to sign and validate'''
+        return self._client
+
+    def _new_pool(self, scheme, host, port, request_context=None):
+        pool = super(SignaturePoolManager, self)._new_pool(scheme, host, port, request_context=request_context)
+        pool.client = self._client
+        return pool
+
+    def urlopen(self, method, url, redirect=True, **kw):
+        response = super(SignaturePoolManager, self).urlopen(method, url, redirect=redirect, **kw)
+        if isinstance(response, LazySignature):
+            # the response of a redirect, validated by the nested call
+            return response
+        response = _lazySignature(response)
+        signature = response.headers.get(self._client.SIGNATURE_HEADER)
+        if not signature:
+            hooks = self._client.instrumentation
+            if hooks is not None:
+                hooks.count(metrics.MISSING_SIGNATURES)
+        else:
+            timestamp = getattr(response, '_signatureTimestamp', None) or \
+                getattr(getattr(response, '_original_response', None), '_signatureTimestamp', None)
+            if kw.get('preload_content', True):
+                response._signatureCheck = functools.partial(self._validateResponse, signature=signature,
+                                                             timestamp=timestamp)
+            else:
+                self._validateStream(response, signature, timestamp)
+        return response
+
+    def _validateResponse(self, response, signature, timestamp):
+        return self._client.validateResponseContent(signature, response.data, encoding=_charset(response),
+                                                    timestamp=timestamp)
+
+    def _validateStream(self, response, signature, timestamp):
+        '''Hashes the body while the caller reads it, `response.data` is empty once it was read'''
+        validator = self._client.responseValidator(signature, timestamp=timestamp, encoding=_charset(response))
+        # `stream()`, `data` and the io wrappers read the body with these methods
+        readers = [name for name in ('read', 'read1') if hasattr(response, name)]
+
+        def validatedReader(read):
+            def validatedRead(*args, **kwargs):
+                data = read(*args, **kwargs)
+                if data:
+                    validator.update(data)
+                return data
+            return validatedRead
+
+        def validatedChunks(readChunked):
+            def validatedRead(*args, **kwargs):
+                for chunk in readChunked(*args, **kwargs):
+                    validator.update(chunk)
+                    yield chunk
+            return validatedRead
+
+        def check(response):
+            # the part of the body not read yet
+            response.data
+            for name in readers + ['read_chunked']:
+                response.__dict__.pop(name, None)
+            return validator.finish()
+
+        for name in readers:
+            setattr(response, name, validatedReader(getattr(response, name)))
+        response.read_chunked = validatedChunks(response.read_chunked)
+        response._signatureCheck = check
+
+
+def _charset(response):
+    '''The charset of the response body, None if the Content-Type doesn't have it'''
+    charset = _CHARSET.search(response.headers.get('Content-Type', ''))
+    return charset and charset.group(1)
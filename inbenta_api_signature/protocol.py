@@ -1,85 +1,427 @@
 # -*- coding: utf-8 -*-
 import time
-import json
-import six
+import codecs
 import hmac
+import re
+from collections import namedtuple
 from hashlib import sha256
 
 
 from .url import *
+from .cache import LRUCache
+from . import instrumentation as metrics
 
-if six.PY3:
+try:
+    unicode
+except NameError:
+    # Python 3
     unicode = str
+    unichr = chr
 
-__all__ = ['V1', 'BaseVersion']
+# json is imported the first time it is needed to keep the import time low, see `_json`
+json = None
+
+
+def _json():
+    global json
+    if json is None:
+        import json
+    return json
+
+__all__ = ['V1', 'BaseVersion', 'RequestSignature', 'PreparedSignature', 'ResponseValidator', 'RequestVerifier']
 
 class BaseVersion(object):
     pass
 
 
+RequestSignature = namedtuple('RequestSignature', ['signature', 'timestamp', 'headers'])
+RequestSignature.__doc__ = '''Immutable result of signing a request
+
+It carries its own timestamp and headers, so it can travel with the request
+instead of being read back from the protocol instance.
+'''
+
+
 class V1(BaseVersion):
+    '''Inbenta Signature Protocol v1
+
+    Args:
+        key (str): The Inbenta signature key
+        baseUrl (str, optional): The base endpoint url
+        cacheSize (int, optional): Enables an LRU cache of the canonical url path and
+            query string with that many entries, only timestamp and body are computed per call
+        instrumentation (Instrumentation, optional): hooks that receive the time spent in
+            every phase and the counters (default: disabled)
+
+    Attributes:
+        clockOffset (float): seconds added to the local time by `genTimestamp`, set
+            by the adapters that estimate the clock skew of the server
+    '''
     VERSION = 'v1'
     HASH_ALGORITHM = sha256
     SIGNATURE_HEADER = 'x-inbenta-signature'
     SIGNATURE_VERSION_HEADER = 'x-inbenta-signature-version'
     TIMESTAMP_HEADER = 'x-inbenta-timestamp'
     HEADERS = [SIGNATURE_HEADER, TIMESTAMP_HEADER, SIGNATURE_VERSION_HEADER]
+    # Size of the pieces in which big bodies are encoded and hashed
+    CHUNK_SIZE = 64 * 1024
 
-    def __init__(self, key, baseUrl=None):
+    def __init__(self, key, baseUrl=None, cacheSize=None, instrumentation=None):
         self._key = key.encode('utf8')
+        # Keyed HMAC state, cloned for every signature instead of re-deriving the padded keys
+        self._hmac = hmac.new(self._key, digestmod=self.HASH_ALGORITHM)
         self._urlPrefix = ""
         if baseUrl:
             self._urlPrefix = list(urlparse(baseUrl))[2]
+        self._urlCache = LRUCache(cacheSize) if cacheSize else None
+        self.instrumentation = instrumentation
+        self.clockOffset = 0.0
         self.timestamp = None
 
-    def getHeaders(self, signature):
-        return dict(zip(self.HEADERS, [signature, self.timestamp, self.VERSION]))
+    def cacheInfo(self):
+        '''Returns the hits, misses and evictions of the url cache (None if disabled)'''
+        return self._urlCache.info() if self._urlCache else None
+
+    def getHeaders(self, signature, timestamp=None):
+        timestamp = timestamp or self.timestamp
+        return dict(zip(self.HEADERS, [signature, timestamp, self.VERSION]))
 
     def genTimestamp(self):
-        return str(int(time.time()))
+        return str(int(time.time() + self.clockOffset))
+
+    def sign(self, url, method, params=None, body=None, timestamp=None):
+        '''Sign a request without touching the state of the instance
+
+        The body can be a string, bytes-like, a file-like object or an iterable of
+        bytes/str chunks, it is encoded and hashed chunk by chunk. Any other
+        object (dict, list...) is signed as its JSON representation.
+
+        Return:
+            RequestSignature: the signature with its timestamp and headers
+        '''
+        timestamp = self._formatTimestamp(timestamp)
+        digest = self._hmac.copy()
+        parts = self._requestParts(url, method, params=params, body=body, timestamp=timestamp)
+        if self.instrumentation is None:
+            for part in parts:
+                digest.update(part)
+        else:
+            self._timedDigest(digest, parts)
+        signature = digest.hexdigest()
+        return RequestSignature(signature, timestamp, self.getHeaders(signature, timestamp))
+
+    def prepare(self, url, method, params=None, body=None):
+        '''Hash the canonical request once to sign it again with new timestamps
+
+        The body is read when the request is prepared.
+
+        Return:
+            PreparedSignature: call `sign` or `signRequest` for every timestamp
+        '''
+        digest = self._hmac.copy()
+        for part in self._canonicalParts(url, method, params=params, body=body):
+            digest.update(part)
+        return PreparedSignature(self, digest)
+
+    def requestDigest(self, url, method, params=None, body=None, headers=None):
+        '''Keyed digest of the host, the headers and the canonical request, without the timestamp
+
+        Identical requests to the same host get the same digest, it is used as
+        the key of the response caches. The body is read.
+
+        Args:
+            headers (dict, optional): headers that change the response, like the credentials
+
+        Return:
+            str: hexadecimal digest
+        '''
+        digest = self._hmac.copy()
+        digest.update(urlparse(url)[1].lower().encode('utf8') + b'&')
+        if headers:
+            headers = sorted((name.lower(), value) for name, value in headers.items())
+            digest.update(_json().dumps(headers).encode('utf8') + b'&')
+        for part in self._canonicalParts(url, method, params=params, body=body):
+            digest.update(part)
+        return digest.hexdigest()
+
+    def signRequests(self, batch, timestamp=None):
+        '''Sign a batch of requests sharing the key state and the timestamp
+
+        Args:
+            batch (iterable): (url, method, params, body) tuples or dicts with those keys
+            timestamp (str, optional): timestamp to be used for the whole batch
+
+        Return:
+            list: The signature headers of every request, in the same order
+        '''
+        timestamp = self._formatTimestamp(timestamp)
+        if self.instrumentation is not None:
+            # the phases are timed request by request
+            return [self.sign(*_batchRequest(request), timestamp=timestamp).headers for request in batch]
+        # encoded once for the whole batch
+        timestampPart = self._timestampPart(timestamp)
+        newDigest = self._hmac.copy
+        signatureHeader, timestampHeader = self.SIGNATURE_HEADER, self.TIMESTAMP_HEADER
+        versionHeader, version = self.SIGNATURE_VERSION_HEADER, self.VERSION
+        # the encoded path and the parsed query of every url of the batch
+        urls = {}
+        headers = []
+        for request in batch:
+            url, method, params, body = _batchRequest(request)
+            if self._urlCache is not None:
+                urlPath, queryString = self._canonicalURL(url, params)
+            else:
+                parsed = urls.get(url)
+                if parsed is None:
+                    urlParts = urlparse(url)
+                    parsed = urls[url] = (self._buildURLPath(urlParts[2]), parse_queryparams(urlParts[4]))
+                urlPath, qs = parsed
+                if params:
+                    qs = dict(qs)
+                    qs.update(params)
+                queryString = self._buildQueryString(qs)
+            digest = newDigest()
+            digest.update('&'.join([e for e in [method.upper(), urlPath, queryString] if e]).encode('utf8'))
+            if body is not None:
+                for part in self._bodyParts(body):
+                    digest.update(part)
+            digest.update(timestampPart)
+            headers.append({signatureHeader: digest.hexdigest(), timestampHeader: timestamp, versionHeader: version})
+        return headers
 
     def signRequest(self, url, method, params=None, body=None, timestamp=None):
-        raw_sig = self._requestBaseString(url, method, params=params, body=body, timestamp=timestamp)
-        return self._sign(raw_sig)
+        signed = self.sign(url, method, params=params, body=body, timestamp=timestamp)
+        # Kept for backwards compatibility with `getHeaders(signature)`
+        self.timestamp = signed.timestamp
+        return signed.signature
 
     def validateResponse(self, signature, body, timestamp=None):
         '''Verify that the signature and signature match'''
+        hooks = self.instrumentation
+        if hooks is None:
+            return signature == self._sign(self._responseBaseString(body, timestamp))
+        start = metrics.timer()
         baseString = self._responseBaseString(body, timestamp)
+        hashing = metrics.timer()
         expected = self._sign(baseString)
-        return signature == expected
+        end = metrics.timer()
+        hooks.phase(metrics.RESPONSE_BASE_STRING, hashing - start)
+        hooks.phase(metrics.HMAC, end - hashing)
+        if signature != expected:
+            hooks.count(metrics.SIGNATURE_FAILURES)
+            return False
+        return True
+
+    def responseValidator(self, signature, timestamp=None, encoding=None):
+        '''Incremental validator for response bodies that arrive in chunks
+
+        Args:
+            signature (str): The signature header of the response
+            timestamp (str, optional): timestamp to be used
+            encoding (str, optional): charset of the bytes chunks (default: utf-8)
+
+        Return:
+            ResponseValidator: feed it with `update` and call `finish` at the end
+        '''
+        timestamp = self._formatTimestamp(timestamp or self.timestamp)
+        return ResponseValidator(self, signature, timestamp, encoding=encoding)
+
+    def validateResponseContent(self, signature, content, encoding=None, timestamp=None):
+        '''Verify the signature of a response from its raw bytes
+
+        The content is decoded, JSON escaped, percent encoded and hashed in pieces of
+        `CHUNK_SIZE`, the decoded text and the base string are never built. It gives
+        the same result as `validateResponse` with the decoded text.
+
+        Args:
+            signature (str): The signature header of the response
+            content (bytes): The response body
+            encoding (str, optional): charset of the content (default: utf-8), it is not detected
+            timestamp (str, optional): timestamp to be used
+
+        Return:
+            bool: True or False if signature could be verified or not
+        '''
+        hooks = self.instrumentation
+        if hooks is not None:
+            start = metrics.timer()
+        validator = self.responseValidator(signature, timestamp=timestamp, encoding=encoding)
+        content = memoryview(content)
+        size = self.CHUNK_SIZE
+        for i in range(0, len(content), size):
+            validator.update(content[i:i + size])
+        valid = validator.finish()
+        if hooks is not None:
+            # decoding, escaping and hashing are done in the same pass
+            hooks.phase(metrics.RESPONSE_DECODE, metrics.timer() - start)
+        return valid
+
+    def requestVerifier(self, url, method, headers, params=None):
+        '''Incremental verifier of a received request, for bodies that arrive in chunks
+
+        Args:
+            url (str): The full url of the request, with the query string
+            method (str): The request method
+            headers (dict): The request headers, the names are case insensitive
+
+        Return:
+            RequestVerifier: feed it with `update` and call `finish` at the end,
+                None if the signature headers are missing or of another version (counted as missing)
+        '''
+        headers = dict((name.lower(), value) for name, value in headers.items())
+        signature = headers.get(self.SIGNATURE_HEADER)
+        timestamp = headers.get(self.TIMESTAMP_HEADER)
+        if not signature or not timestamp or headers.get(self.SIGNATURE_VERSION_HEADER, '').lower() != self.VERSION:
+            if self.instrumentation is not None:
+                self.instrumentation.count(metrics.MISSING_SIGNATURES)
+            return None
+        return RequestVerifier(self, url, method, signature, timestamp, params=params)
+
+    def verifyRequest(self, url, method, body=None, headers=None, params=None):
+        '''Verify the signature of a received request
+
+        The body is hashed chunk by chunk as in `sign`, files and iterables are read once.
+
+        Args:
+            url (str): The full url of the request, with the query string
+            method (str): The request method
+            body (optional): The request body
+            headers (dict): The request headers, the names are case insensitive
+
+        Return:
+            bool: True if the signature headers are present and the signature matches
+        '''
+        verifier = self.requestVerifier(url, method, headers or {}, params=params)
+        if verifier is None:
+            return False
+        for chunk in self._bodyChunks(body):
+            verifier.update(chunk)
+        return verifier.finish()
+
+    def signResponseContent(self, content, timestamp, encoding=None):
+        '''Sign a response from its raw bytes, as the Inbenta APIs do
+
+        Args:
+            content (bytes): The response body
+            timestamp (str): timestamp of the request
+            encoding (str, optional): charset of the content (default: utf-8)
+
+        Return:
+            dict: The signature headers of the response
+        '''
+        timestamp = self._formatTimestamp(timestamp)
+        signer = ResponseValidator(self, None, timestamp, encoding=encoding)
+        content = memoryview(content)
+        size = self.CHUNK_SIZE
+        for i in range(0, len(content), size):
+            signer.update(content[i:i + size])
+        return self.getHeaders(signer.expectedSignature(), timestamp)
 
     def _requestBaseString(self, url, method, params=None, body=None, timestamp=None):
         '''Builds the base string of the signature hash'''
-        self.timestamp = timestamp or self.genTimestamp()
-        self.timestamp = self.timestamp if isinstance(self.timestamp, (str, unicode)) else str(self.timestamp)
+        timestamp = self._formatTimestamp(timestamp)
+        return b''.join(self._requestParts(url, method, params=params, body=body, timestamp=timestamp))
+
+    def _timedDigest(self, digest, parts):
+        '''Feeds the base string parts into the digest timing every phase'''
+        hooks = self.instrumentation
+        start = metrics.timer()
+        part = next(parts)
+        encodingStart = metrics.timer()
+        hooks.phase(metrics.CANONICALIZE, encodingStart - start)
+        hashing = 0.0
+        while part is not None:
+            start = metrics.timer()
+            digest.update(part)
+            hashing += metrics.timer() - start
+            part = next(parts, None)
+        hooks.phase(metrics.BODY_ENCODING, metrics.timer() - encodingStart - hashing)
+        hooks.phase(metrics.HMAC, hashing)
+
+    def _requestParts(self, url, method, params=None, body=None, timestamp=None):
+        '''Yields the base string of the signature in pieces, the body is encoded chunk by chunk'''
+        for part in self._canonicalParts(url, method, params=params, body=body):
+            yield part
+        yield self._timestampPart(timestamp)
+
+    def _canonicalParts(self, url, method, params=None, body=None):
+        '''Yields the base string without the timestamp part'''
+        urlPath, queryString = self._canonicalURL(url, params)
+        yield '&'.join([e for e in [method.upper(), urlPath, queryString] if e]).encode('utf8')
+        for part in self._bodyParts(body):
+            yield part
+
+    def _bodyParts(self, body):
+        '''Yields the url encoded body after its `&` separator, nothing for an empty body'''
+        separator = b'&'
+        hooks = self.instrumentation
+        for chunk in self._bodyChunks(body):
+            if hooks is not None:
+                hooks.count(metrics.BODY_BYTES, len(chunk))
+            encoded = quote_plus(chunk)
+            if encoded:
+                yield separator
+                yield encoded.encode('utf8')
+                separator = b''
+
+    def _timestampPart(self, timestamp):
+        return '&'.join(['', timestamp, self.VERSION]).encode('utf8')
+
+    def _bodyChunks(self, body):
+        '''Yields the body as utf8 bytes in pieces of `CHUNK_SIZE`'''
+        size = self.CHUNK_SIZE
+        if body is None:
+            return
+        if isinstance(body, (str, unicode, bytes, bytearray, memoryview)):
+            chunks = (body[i:i + size] for i in range(0, len(body), size))
+        elif hasattr(body, 'read'):
+            chunks = iter(lambda: body.read(size), body.read(0))
+        elif isinstance(body, (dict, list, tuple, int, float)) or not hasattr(body, '__iter__'):
+            chunks = [_json().dumps(body)]
+        else:
+            chunks = body
+        for chunk in chunks:
+            if isinstance(chunk, unicode):
+                chunk = chunk.encode('utf8')
+            elif not isinstance(chunk, bytes):
+                chunk = bytes(chunk)
+            yield chunk
+
+    def _canonicalURL(self, url, params=None):
+        '''Returns the encoded path and query string, from the cache when enabled'''
+        if self._urlCache is None:
+            return self._buildCanonicalURL(url, params)
+        try:
+            key = (url, tuple(sorted((k, _cacheValue(v)) for k, v in (params or {}).items())))
+            hash(key)
+        except TypeError:
+            # unhashable or unsortable params are not cached
+            return self._buildCanonicalURL(url, params)
+        canonical = self._urlCache.get(key)
+        if canonical is None:
+            canonical = self._buildCanonicalURL(url, params)
+            self._urlCache.set(key, canonical)
+        return canonical
+
+    def _buildCanonicalURL(self, url, params=None):
         urlParts = list(urlparse(url))
-        urlPath = self._buildURLPath(urlParts[2])
         qs = parse_queryparams(urlParts[4])
         qs.update(params or {})
-        encodedBody = None
-        if body is not None:
-            body = body if isinstance(body, (str, unicode)) else json.dumps(body)
-            encodedBody = quote_plus(body.encode('utf8'))
-        elements = [
-            method.upper(),
-            urlPath,
-            self._buildQueryString(qs),
-            encodedBody,
-            self.timestamp,
-            self.VERSION
-        ]
-        return '&'.join([e for e in elements if e]).encode('utf8')
+        return self._buildURLPath(urlParts[2]), self._buildQueryString(qs)
+
+    def _formatTimestamp(self, timestamp=None):
+        timestamp = timestamp or self.genTimestamp()
+        return timestamp if isinstance(timestamp, (str, unicode)) else str(timestamp)
 
     def _responseBaseString(self, body, timestamp=None):
-        timestamp = timestamp or self.timestamp or self.genTimestamp()
-        timestamp = timestamp if isinstance(timestamp, (str, unicode)) else str(timestamp)
-        body = json.dumps(body)
+        timestamp = self._formatTimestamp(timestamp or self.timestamp)
+        body = _json().dumps(body)
         res = [
-            self.VERSION,
-            timestamp,
-            quote_plus(body.encode('utf8'))
+            self.VERSION.encode('utf8'),
+            timestamp.encode('utf8'),
+            _quotePlusJSON(body)
         ]
-        return "&".join(res).encode('utf8')
+        return b"&".join(res)
 
     def _buildURLPath(self, url):
         if url.startswith(self._urlPrefix):
@@ -90,13 +432,328 @@ class V1(BaseVersion):
 
     def _buildQueryString(self, queryString):
         '''Returns the encoded query string
-        
+
+        Every value is JSON encoded, url decoded (`unquote_plus`) and the `k=v&...`
+        string percent encoded. It is done in a single pass per value with
+        precomputed escape tables, see `_encodeQueryValue`.
+
         Args:
             queryString: a parsed query string in a dictionary form
         '''
-        query = {k: unquote_plus(json.dumps(v)) for k, v in queryString.items()}
-        query = ["{}={}".format(k, query[k]) for k in sorted(query)]
-        return quote("&".join(query), safe='')
+        if not queryString:
+            return ''
+        tables = _queryTables()
+        return '%26'.join([
+            _encodeQueryKey(k, tables) + '%3D' + _encodeQueryValue(queryString[k], tables)
+            for k in sorted(queryString)
+        ])
 
     def _sign(self, baseString):
-        return hmac.new(self._key, baseString, self.HASH_ALGORITHM).hexdigest()
+        digest = self._hmac.copy()
+        digest.update(baseString)
+        return digest.hexdigest()
+
+
+def _batchRequest(request):
+    '''The (url, method, params, body) of a request of `signRequests`, a tuple or a dict'''
+    if isinstance(request, dict):
+        return request['url'], request['method'], request.get('params'), request.get('body')
+    if len(request) == 4:
+        return request
+    return tuple(request) + (None,) * (4 - len(request))
+
+
+def _cacheValue(value):
+    '''Hashable version of a query param value, the type is kept as `1`, `1.0`
+    and `True` are encoded differently, and the floats by their repr as `0.0`
+    and `-0.0` are equal but encoded differently (and `nan` is not equal to itself)'''
+    if isinstance(value, (list, tuple)):
+        return (type(value), tuple(_cacheValue(v) for v in value))
+    if isinstance(value, float):
+        return (type(value), repr(value))
+    return (type(value), value)
+
+
+class _QuoteTable(dict):
+    '''Escape table of `quote(c, safe='')`'''
+    def __missing__(self, code):
+        escaped = self[code] = quote(unichr(code), safe='')
+        return escaped
+
+
+class _StringTable(dict):
+    '''Escape table of string characters: JSON escaping + percent encoding
+
+    Non ascii characters are JSON escaped as `\\uXXXX` (surrogate pairs out of the BMP).
+    '''
+    def __missing__(self, code):
+        if code > 0xFFFF:
+            code -= 0x10000
+            escaped = '%5Cu{:04x}%5Cu{:04x}'.format(0xD800 | (code >> 10) & 0x3FF, 0xDC00 | code & 0x3FF)
+        else:
+            escaped = '%5Cu{:04x}'.format(code)
+        self[code] = escaped
+        return escaped
+
+
+# (string table, JSON text table, quote table), built on first use, see `_queryTables`
+_QUERY_TABLES = None
+# url encoded bytes that `unquote_plus` decodes
+_PERCENT_RUN = re.compile('((?:%[0-9A-Fa-f]{2})+)')
+# characters that are never escaped
+_SAFE_TEXT = re.compile(r'[A-Za-z0-9_.~-]*\Z')
+
+
+def _queryTables():
+    global _QUERY_TABLES
+    if _QUERY_TABLES is None:
+        dumps = _json().dumps
+        strings = _StringTable()
+        texts = {}
+        quotes = _QuoteTable()
+        for code in range(128):
+            c = chr(code)
+            # what the reference encoding does with every ascii character
+            strings[code] = quote(unquote_plus(dumps(c)[1:-1]), safe='')
+            texts[code] = quote(unquote_plus(c), safe='')
+            quotes[code] = quote(c, safe='')
+        _QUERY_TABLES = (strings, texts, quotes)
+    return _QUERY_TABLES
+
+
+def _translate(text, table):
+    '''Applies the escape table, url encoded bytes are decoded and percent encoded again'''
+    if '%' not in text:
+        return text.translate(table)
+    pieces = _PERCENT_RUN.split(text)
+    for i in range(0, len(pieces), 2):
+        pieces[i] = pieces[i].translate(table)
+    for i in range(1, len(pieces), 2):
+        pieces[i] = quote(unquote_plus(pieces[i]), safe='')
+    return ''.join(pieces)
+
+
+def _encodeQueryKey(key, tables):
+    '''Encodes a query key as `quote(key, safe='')`'''
+    if not isinstance(key, unicode):
+        key = '{}'.format(key)
+    if _SAFE_TEXT.match(key):
+        return key
+    return key.translate(tables[2])
+
+
+def _encodeQueryValue(value, tables):
+    '''Encodes a query value as `quote(unquote_plus(json.dumps(value)), safe='')`
+
+    Strings, scalars and lists are encoded in a single pass with the escape tables,
+    any other value is JSON encoded first.
+    '''
+    if isinstance(value, unicode):
+        if _SAFE_TEXT.match(value):
+            return '%22' + value + '%22'
+        return '%22' + _translate(value, tables[0]) + '%22'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if value is None:
+        return 'null'
+    if type(value) is int:
+        return str(value)
+    if isinstance(value, (list, tuple)):
+        return '%5B' + '%2C%20'.join([_encodeQueryValue(v, tables) for v in value]) + '%5D'
+    text = _json().dumps(value)
+    if not isinstance(text, unicode):
+        # Python 2, JSON is ascii
+        text = text.decode('ascii')
+    return _translate(text, tables[1])
+
+
+class PreparedSignature(object):
+    '''A request hashed once and signed again for every timestamp
+
+    The HMAC state after the canonical method, path, query string and body is
+    kept, so signing only hashes the timestamp. The last signature is reused
+    by the calls within the same second. It can be shared between threads.
+
+    Args:
+        protocol (V1): The signature protocol
+        digest: HMAC state of the canonical request
+    '''
+    def __init__(self, protocol, digest):
+        self._protocol = protocol
+        self._digest = digest
+        self._last = None
+
+    def sign(self, timestamp=None):
+        '''Sign the request with a timestamp
+
+        Args:
+            timestamp (str, optional): timestamp to be used (default: now)
+
+        Return:
+            RequestSignature: The signature, the timestamp used and the signature headers,
+                shared by the calls with the same timestamp
+        '''
+        timestamp = self._protocol._formatTimestamp(timestamp)
+        last = self._last
+        if last is not None and last.timestamp == timestamp:
+            return last
+        digest = self._digest.copy()
+        digest.update(self._protocol._timestampPart(timestamp))
+        signature = digest.hexdigest()
+        # replaced in a single assignment, the threads see the old or the new signature
+        last = self._last = RequestSignature(signature, timestamp, self._protocol.getHeaders(signature, timestamp))
+        return last
+
+    def signRequest(self, timestamp=None):
+        '''Build the signature headers
+
+        Return:
+            dict: The signature headers, a copy the caller can modify
+        '''
+        return dict(self.sign(timestamp).headers)
+
+
+# (escape of every ascii byte changed by `quote_plus`, ascii bytes kept), see `_plusTable`
+_PLUS_TABLE = None
+
+
+def _plusTable():
+    global _PLUS_TABLE
+    if _PLUS_TABLE is None:
+        escapes = {}
+        for code in range(128):
+            escaped = quote_plus(chr(code))
+            if escaped != chr(code):
+                escapes[code] = escaped.encode('ascii')
+        safe = bytes(bytearray(code for code in range(128) if code not in escapes))
+        _PLUS_TABLE = (escapes, safe)
+    return _PLUS_TABLE
+
+
+def _replaceOrder(code):
+    # '%' and '+' go first, the escapes of the other bytes contain them
+    return (code != 0x25, code != 0x2B)
+
+
+def _quotePlusJSON(text):
+    '''`quote_plus` of a JSON text as bytes
+
+    JSON is ascii, so instead of escaping byte by byte every distinct unsafe
+    byte is replaced in a single `bytes.replace` over the whole text.
+    '''
+    data = text.encode('ascii')
+    escapes, safe = _plusTable()
+    for code in sorted(set(bytearray(data.translate(None, safe))), key=_replaceOrder):
+        data = data.replace(bytes(bytearray([code])), escapes[code])
+    return data
+
+
+def _incrementalDecoder(encoding):
+    '''Decoder of the charset, utf-8 for an unknown one as `requests` does for `response.text`'''
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or 'utf-8')
+    except LookupError:
+        decoder = codecs.getincrementaldecoder('utf-8')
+    return decoder(errors='replace')
+
+
+class ResponseValidator(object):
+    '''Validates a response signature while the body is being read
+
+    Every chunk is JSON string escaped, `quote_plus` encoded and fed into the
+    HMAC as it arrives, following the framing of `V1._responseBaseString`,
+    so only one chunk is kept in memory at a time.
+
+    Args:
+        protocol (V1): The signature protocol
+        signature (str): The signature header of the response
+        timestamp (str): timestamp used to sign the request
+        encoding (str, optional): charset of the bytes chunks (default: utf-8)
+    '''
+    def __init__(self, protocol, signature, timestamp, encoding=None):
+        self._signature = signature
+        self._instrumentation = protocol.instrumentation
+        self._decoder = _incrementalDecoder(encoding)
+        self._hmac = protocol._hmac.copy()
+        self._hmac.update('&'.join([protocol.VERSION, timestamp, '']).encode('utf8'))
+        self._hmac.update(quote_plus('"').encode('utf8'))
+        self._expected = None
+        self.valid = None
+
+    def update(self, chunk):
+        '''Feed a piece of the body, either bytes-like or already decoded text'''
+        if not isinstance(chunk, unicode):
+            chunk = self._decoder.decode(chunk)
+        if chunk:
+            self._hmac.update(_quotePlusJSON(_json().dumps(chunk)[1:-1]))
+
+    def expectedSignature(self):
+        '''Close the body and return the signature of the response'''
+        if self._expected is None:
+            self.update(self._decoder.decode(b'', True))
+            self._hmac.update(quote_plus('"').encode('utf8'))
+            self._expected = self._hmac.hexdigest()
+        return self._expected
+
+    def finish(self):
+        '''Close the body and compare the signatures
+
+        Return:
+            bool: True or False if signature could be verified or not
+        '''
+        if self.valid is None:
+            self.valid = self._signature == self.expectedSignature()
+            if not self.valid and self._instrumentation is not None:
+                self._instrumentation.count(metrics.SIGNATURE_FAILURES)
+        return self.valid
+
+
+class RequestVerifier(object):
+    '''Verifies a request signature while the body is being received
+
+    The canonical method, path and query string are hashed up front, every body
+    chunk is `quote_plus` encoded and fed into the HMAC as it arrives, following
+    the framing of `V1._requestBaseString`.
+
+    Args:
+        protocol (V1): The signature protocol
+        url (str): The full url of the request
+        method (str): The request method
+        signature (str): The signature header of the request
+        timestamp (str): The timestamp header of the request
+    '''
+    def __init__(self, protocol, url, method, signature, timestamp, params=None):
+        self.signature = signature
+        self._protocol = protocol
+        self._hmac = protocol._hmac.copy()
+        for part in protocol._canonicalParts(url, method, params=params):
+            self._hmac.update(part)
+        self._separator = b'&'
+        self.timestamp = timestamp
+        self.valid = None
+
+    def update(self, chunk):
+        '''Feed a piece of the body, bytes-like or text'''
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf8')
+        encoded = quote_plus(bytes(chunk))
+        if encoded:
+            self._hmac.update(self._separator + encoded.encode('utf8'))
+            self._separator = b''
+
+    def finish(self):
+        '''Close the body and compare the signatures
+
+        Return:
+            bool: True or False if signature could be verified or not
+        '''
+        if self.valid is None:
+            self._hmac.update(self._protocol._timestampPart(self.timestamp))
+            # compared as bytes, `compare_digest` rejects the non ascii strings of any header
+            signature = self.signature.encode('utf8') if isinstance(self.signature, unicode) else self.signature
+            self.valid = hmac.compare_digest(signature, self._hmac.hexdigest().encode('ascii'))
+            if not self.valid and self._protocol.instrumentation is not None:
+                self._protocol.instrumentation.count(metrics.SIGNATURE_FAILURES)
+        return self.valid
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""Registry of the signature clients and sessions of many Inbenta instances."""
+import threading
+
+from . import SignatureClient
+from .cache import LRUCache
+
+
+__all__ = ['ClientRegistry']
+
+
+class _Entry(object):
+    __slots__ = ('client', 'session')
+
+    def __init__(self, client):
+        self.client = client
+        self.session = None
+
+
+class ClientRegistry(object):
+    '''Shared signature clients and sessions keyed by (signatureKey, baseUrl, signatureVersion)
+
+    The clients are stateless and thread safe, so a single one per instance is
+    shared by all the threads, and so is its session with its connection pool.
+    The least recently used instances are dropped when there are more than
+    `maxsize`, or when they have been unused for `ttl` seconds, and their sessions closed.
+
+    Args:
+        maxsize (int, optional): Maximum number of instances kept (default: 128)
+        ttl (float, optional): Seconds an instance can stay unused before it is dropped (default: never)
+        cacheSize (int, optional): size of the canonical url cache of every client (default: disabled)
+        instrumentation (Instrumentation, optional): hooks shared by all the clients (default: disabled)
+        **adapterKwargs: kwargs of every `SignatureAdapter` (pool_connections, pool_maxsize, max_retries...)
+
+    Example:
+        registry = ClientRegistry(maxsize=1000, ttl=300)
+        ...
+        session = registry.session(instance.signatureKey, instance.reportingUrl)
+        r = session.get(instance.reportingUrl + '/v1/events/user_questions', headers=headers)
+    '''
+    MAXSIZE = 128
+
+    def __init__(self, maxsize=None, ttl=None, cacheSize=None, instrumentation=None, **adapterKwargs):
+        self._entries = LRUCache(maxsize or self.MAXSIZE, ttl=ttl, onEvict=self._evict)
+        # the entries are evicted under the lock and their sessions closed after releasing it
+        self._lock = threading.Lock()
+        self._evicted = []
+        self._cacheSize = cacheSize
+        self._instrumentation = instrumentation
+        self._adapterKwargs = adapterKwargs
+
+    def client(self, signatureKey, baseUrl=None, signatureVersion=None):
+        '''Returns the shared `SignatureClient` of an instance
+
+        Return:
+            SignatureClient: client built the first time the instance is requested
+        '''
+        with self._lock:
+            client = self._entry(signatureKey, baseUrl, signatureVersion).client
+            evicted = self._takeEvicted()
+        self._close(evicted)
+        return client
+
+    def session(self, signatureKey, baseUrl, signatureVersion=None):
+        '''Returns the shared session of an instance, with a `SignatureAdapter` mounted on `baseUrl`
+
+        A session dropped from the registry is closed, but it still works for
+        the threads that hold it, it just opens new connections.
+
+        Return:
+            requests.Session: session built the first time it is requested
+        '''
+        if not baseUrl:
+            raise ValueError('The base url is needed to mount the adapter')
+        with self._lock:
+            entry = self._entry(signatureKey, baseUrl, signatureVersion)
+            # attached before the entry can be evicted, so that its eviction closes it
+            if entry.session is None:
+                entry.session = self._buildSession(entry.client, baseUrl)
+            session = entry.session
+            evicted = self._takeEvicted()
+        self._close(evicted)
+        return session
+
+    def info(self):
+        '''Returns the hits, misses, evictions (LRU and ttl) and size of the registry'''
+        return self._entries.info()
+
+    def expire(self):
+        '''Drops the instances unused for longer than the ttl and closes their sessions'''
+        with self._lock:
+            self._entries.expire()
+            evicted = self._takeEvicted()
+        self._close(evicted)
+
+    def close(self):
+        '''Drops all the instances and closes their sessions'''
+        with self._lock:
+            self._entries.clear()
+            evicted = self._takeEvicted()
+        self._close(evicted)
+
+    def _entry(self, signatureKey, baseUrl, signatureVersion):
+        '''Returns the entry of an instance, built if needed, with the lock held'''
+        signatureVersion = signatureVersion or 'v1'
+        key = (signatureKey, baseUrl, str(signatureVersion).lower())
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = _Entry(SignatureClient(signatureKey, baseUrl=baseUrl, signatureVersion=signatureVersion,
+                                           cacheSize=self._cacheSize, instrumentation=self._instrumentation))
+            self._entries.set(key, entry)
+        return entry
+
+    def _buildSession(self, client, baseUrl):
+        import requests
+        from .adapters import SignatureAdapter
+        session = requests.Session()
+        session.mount(baseUrl, SignatureAdapter(None, signatureVersion=client._signProtocol, **self._adapterKwargs))
+        return session
+
+    def _evict(self, key, entry):
+        # called by the cache with the lock held, closing the session would block the other instances
+        self._evicted.append(entry)
+
+    def _takeEvicted(self):
+        evicted, self._evicted = self._evicted, []
+        return evicted
+
+    @staticmethod
+    def _close(evicted):
+        for entry in evicted:
+            if entry.session is not None:
+                entry.session.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
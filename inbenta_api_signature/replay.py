@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Replay protection of the received requests.
+
+A request is accepted once, and only while its timestamp is within a window
+around the local clock. The signatures seen are remembered until their
+timestamp leaves the window, in a `MemoryReplayStore` or a shared store.
+"""
+import threading
+import time
+
+from . import instrumentation as metrics
+
+
+__all__ = ['ReplayGuard', 'MemoryReplayStore', 'RedisReplayStore']
+
+
+class ReplayGuard(object):
+    '''Rejects the requests with a timestamp out of the window or a signature already seen
+
+    Call `check` after the signature of the request has been verified, so the
+    forged requests don't fill the store.
+
+    Args:
+        window (int, optional): seconds a timestamp can differ from the local clock (default: 300)
+        store (optional): store of the signatures seen, shared by the processes that
+            verify the same requests (default: a `MemoryReplayStore`)
+        instrumentation (Instrumentation, optional): counters of the rejected requests (default: disabled)
+
+    Example:
+        guard = ReplayGuard(window=60)
+        if not protocol.verifyRequest(url, method, body, headers) or \\
+                not guard.check(headers['x-inbenta-signature'], headers['x-inbenta-timestamp']):
+            reject()
+    '''
+    WINDOW = 300
+
+    def __init__(self, window=None, store=None, instrumentation=None):
+        self.window = self.WINDOW if window is None else window
+        self.store = MemoryReplayStore() if store is None else store
+        self.instrumentation = instrumentation
+
+    def fresh(self, timestamp, now=None):
+        '''Whether the timestamp is within the window, without remembering anything'''
+        try:
+            timestamp = int(timestamp)
+        except (TypeError, ValueError):
+            return False
+        now = int(time.time()) if now is None else now
+        return abs(timestamp - now) <= self.window
+
+    def check(self, signature, timestamp, now=None):
+        '''Accepts a request the first time it is seen within the window
+
+        Args:
+            signature (str): The signature header of the request
+            timestamp (str): The timestamp header of the request
+            now (int, optional): current time (default: the local clock)
+
+        Return:
+            bool: True if the request is fresh and was not seen before
+        '''
+        now = int(time.time()) if now is None else now
+        if not self.fresh(timestamp, now):
+            self._count(metrics.STALE_REQUESTS)
+            return False
+        # remembered until the timestamp leaves the window
+        if not self.store.add(signature, int(timestamp) + self.window, now):
+            self._count(metrics.REPLAYED_REQUESTS)
+            return False
+        return True
+
+    def _count(self, name):
+        if self.instrumentation is not None:
+            self.instrumentation.count(name)
+
+
+class MemoryReplayStore(object):
+    '''Signatures seen by this process, bucketed by the second they expire
+
+    Expiring drops whole buckets, so its cost doesn't depend on the number of
+    signatures. With a `maxsize` the oldest buckets are dropped when it is
+    exceeded, and the signatures that would have been in them are rejected
+    from then on: the memory is bounded without letting replays in.
+
+    Args:
+        maxsize (int, optional): maximum number of signatures kept (default: unbounded)
+    '''
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._buckets = {}
+        # first second with a bucket, None when empty
+        self._oldest = None
+        # signatures expiring before this second are taken as seen
+        self._floor = None
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def add(self, signature, expires, now):
+        '''Remembers a signature until the `expires` second
+
+        Return:
+            bool: False if the signature was already seen
+        '''
+        with self._lock:
+            self._expire(now)
+            if self._floor is not None and expires < self._floor:
+                return False
+            bucket = self._buckets.get(expires)
+            if bucket is None:
+                bucket = self._buckets[expires] = set()
+                if self._oldest is None or expires < self._oldest:
+                    self._oldest = expires
+            elif signature in bucket:
+                return False
+            bucket.add(signature)
+            self._size += 1
+            while self._maxsize and self._size > self._maxsize:
+                self._floor = self._dropOldest() + 1
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+            self._oldest = self._floor = None
+            self._size = 0
+
+    def _expire(self, now):
+        while self._oldest is not None and self._oldest < now:
+            self._dropOldest()
+
+    def _dropOldest(self):
+        '''Drops the oldest bucket, returns its second'''
+        second = self._oldest
+        self._size -= len(self._buckets.pop(second))
+        if not self._buckets:
+            self._oldest = None
+        else:
+            # the buckets are within the window, there are few seconds to walk
+            self._oldest = second + 1
+            while self._oldest not in self._buckets:
+                self._oldest += 1
+        return second
+
+    def __len__(self):
+        return self._size
+
+
+class RedisReplayStore(object):
+    '''Signatures seen by all the processes that share a Redis server
+
+    Every signature is a key set with `NX` and an expiry, so the check and the
+    insertion are a single atomic command.
+
+    Args:
+        redis: `redis.Redis` client, or any client with the same `set`
+        prefix (str, optional): prefix of the keys (default: inbenta-signature:)
+    '''
+    def __init__(self, redis, prefix='inbenta-signature:'):
+        self._redis = redis
+        self._prefix = prefix
+
+    def add(self, signature, expires, now):
+        '''Remembers a signature until the `expires` second
+
+        Return:
+            bool: False if the signature was already seen
+        '''
+        return bool(self._redis.set(self._prefix + signature, 1, nx=True, ex=max(expires - now, 1)))
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""Caches of the responses whose signature has been validated.
+
+The entries are keyed by `V1.requestDigest`, with the `vary` headers of the
+request, and hold the status, headers and content of a response, as a dict. The caches only store, they don't validate.
+"""
+import abc
+import base64
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import namedtuple
+
+from .cache import LRUCache
+
+
+__all__ = ['ResponseCache', 'MemoryResponseCache', 'DiskResponseCache', 'ResponseCacheInfo']
+
+
+class ResponseCacheInfo(namedtuple('ResponseCacheInfo', ['hits', 'misses', 'evictions', 'maxsize', 'currsize'])):
+    '''Statistics of a response cache'''
+    __slots__ = ()
+
+    @property
+    def hitRatio(self):
+        '''Share of the lookups served by the cache'''
+        lookups = self.hits + self.misses
+        return float(self.hits) / lookups if lookups else 0.0
+
+
+# `abc.ABC` of Python 3, also valid in Python 2
+_ABC = abc.ABCMeta('_ABC', (object,), {})
+
+
+class ResponseCache(_ABC):
+    '''Base class of the response caches, the backends implement the abstract methods
+
+    The requests with different values of the `vary` headers, like the
+    credentials of different users, don't share their responses.
+
+    Args:
+        maxsize (int, optional): Maximum number of responses kept (default: 256)
+        ttl (float, optional): Seconds a response is served from the cache (default: 60)
+        methods (iterable, optional): HTTP methods of the requests cached (default: GET)
+        vary (iterable, optional): request headers that select the response (default: VARY)
+    '''
+    MAXSIZE = 256
+    TTL = 60
+    VARY = ('Authorization', 'Cookie', 'x-inbenta-key', 'x-inbenta-env', 'x-inbenta-user-type',
+            'x-inbenta-session')
+
+    def __init__(self, maxsize=None, ttl=None, methods=('GET',), vary=None):
+        self.maxsize = maxsize or self.MAXSIZE
+        self.ttl = self.TTL if ttl is None else ttl
+        self.methods = frozenset(method.upper() for method in methods)
+        self.vary = frozenset(name.lower() for name in (self.VARY if vary is None else vary))
+        self._lock = threading.Lock()
+        self._hits = self._misses = self._evictions = 0
+
+    def get(self, key):
+        '''Returns the response stored with the key, None if missing or expired'''
+        entry = self._load(key)
+        if entry is not None and entry['expires'] < time.time():
+            self._delete(key)
+            self._count(evictions=1)
+            entry = None
+        if entry is None:
+            self._count(misses=1)
+        else:
+            self._count(hits=1)
+        return entry
+
+    def set(self, key, entry):
+        '''Stores a response for `ttl` seconds'''
+        entry = dict(entry, expires=time.time() + self.ttl)
+        self._count(evictions=self._store(key, entry))
+
+    def info(self):
+        '''Returns the hits, misses, evictions and size of the cache'''
+        with self._lock:
+            return ResponseCacheInfo(self._hits, self._misses, self._evictions, self.maxsize, len(self))
+
+    @abc.abstractmethod
+    def clear(self):
+        '''Removes all the responses'''
+
+    def _count(self, hits=0, misses=0, evictions=0):
+        with self._lock:
+            self._hits += hits
+            self._misses += misses
+            self._evictions += evictions
+
+    @abc.abstractmethod
+    def _load(self, key):
+        '''Returns the entry stored with the key, None if missing'''
+
+    @abc.abstractmethod
+    def _store(self, key, entry):
+        '''Stores the entry, returns the number of entries evicted'''
+
+    @abc.abstractmethod
+    def _delete(self, key):
+        '''Removes the entry of the key, if any'''
+
+    @abc.abstractmethod
+    def __len__(self):
+        '''Number of responses stored'''
+
+
+class MemoryResponseCache(ResponseCache):
+    '''Response cache in the memory of the process, the least recently used responses are evicted'''
+    def __init__(self, maxsize=None, ttl=None, methods=('GET',), vary=None):
+        super(MemoryResponseCache, self).__init__(maxsize=maxsize, ttl=ttl, methods=methods, vary=vary)
+        self._entries = LRUCache(self.maxsize)
+
+    def clear(self):
+        self._entries.clear()
+
+    def _load(self, key):
+        return self._entries.get(key)
+
+    def _store(self, key, entry):
+        with self._lock:
+            evictions = self._entries.info().evictions
+            self._entries.set(key, entry)
+            return self._entries.info().evictions - evictions
+
+    def _delete(self, key):
+        self._entries.pop(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskResponseCache(ResponseCache):
+    '''Response cache in a directory, shared by the processes that use it
+
+    Every response is a JSON file, the oldest ones are removed when there are more than `maxsize`.
+
+    Args:
+        directory (str): directory of the cache, created if missing
+    '''
+    SUFFIX = '.response.json'
+
+    def __init__(self, directory, maxsize=None, ttl=None, methods=('GET',), vary=None):
+        super(DiskResponseCache, self).__init__(maxsize=maxsize, ttl=ttl, methods=methods, vary=vary)
+        self._directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def clear(self):
+        for name in self._names():
+            self._remove(os.path.join(self._directory, name))
+
+    def _path(self, key):
+        return os.path.join(self._directory, key + self.SUFFIX)
+
+    def _names(self):
+        return [name for name in os.listdir(self._directory) if name.endswith(self.SUFFIX)]
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), 'rb') as f:
+                entry = json.loads(f.read().decode('utf8'))
+        except (IOError, OSError, ValueError):
+            return None
+        entry['content'] = base64.b64decode(entry['content'])
+        return entry
+
+    def _store(self, key, entry):
+        entry = dict(entry, content=base64.b64encode(entry['content']).decode('ascii'))
+        fd, path = tempfile.mkstemp(dir=self._directory, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(json.dumps(entry).encode('utf8'))
+        # atomic, the readers get the old or the new response
+        getattr(os, 'replace', os.rename)(path, self._path(key))
+        names = self._names()
+        if len(names) <= self.maxsize:
+            return 0
+        paths = sorted((os.path.join(self._directory, name) for name in names), key=self._mtime)
+        evicted = 0
+        for path in paths[:len(names) - self.maxsize]:
+            evicted += self._remove(path)
+        return evicted
+
+    def _delete(self, key):
+        self._remove(self._path(key))
+
+    @staticmethod
+    def _mtime(path):
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+            return 1
+        except OSError:
+            return 0
+
+    def __len__(self):
+        return len(self._names())
@@ -31,9 +31,12 @@ class PyTest(TestCommand):
 
 packages = ['inbenta_api_signature']
 
-requires = [
-    'six>=1.12.0'
-]
+requires = []
+
+extras = {
+    'httpx': ['httpx>=0.18'],
+    'aiohttp': ['aiohttp>=3.12'],
+}
 
 test_requirements = [
     'pytest>=2.8.0',
@@ -63,6 +66,10 @@ setup(
     license=about['__license__'],
     python_requires=">=2.7, !=3.0.*, !=3.1.*, !=3.2.*, !=3.3.*",
     install_requires=requires,
+    extras_require=extras,
+    entry_points={
+        'console_scripts': ['inbenta-api-signature=inbenta_api_signature.cli:main'],
+    },
     classifiers=[
         'Development Status :: 5 - Production/Stable',
         'Intended Audience :: Developers',
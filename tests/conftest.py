@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures of the test suite."""
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+import inbenta_api_signature
+from inbenta_api_signature import changeBaseHTTPAdapter
+from localServer import LocalServer
+
+SIGNATURE_KEY = 'my-signature-key'
+
+
+@pytest.fixture(autouse=True)
+def adapter():
+    # other tests change the base class of the adapter
+    changeBaseHTTPAdapter(HTTPAdapter)
+    yield
+    changeBaseHTTPAdapter(HTTPAdapter)
+
+
+@pytest.fixture
+def server(request):
+    '''`LocalServer` signing with `SIGNATURE_KEY`
+
+    Parametrize it indirectly with a dict to set its attributes:
+        @pytest.mark.parametrize('server', [{'clockOffset': 120}], indirect=True)
+    '''
+    with LocalServer(SIGNATURE_KEY) as server:
+        for name, value in getattr(request, 'param', {}).items():
+            setattr(server, name, value)
+        yield server
+
+
+@pytest.fixture
+def session(server):
+    '''Factory of sessions with an adapter mounted on the server
+
+    `session(factory=SignatureAdapter, **kwargs)` builds the adapter with
+    `factory(SIGNATURE_KEY, server.url, **kwargs)`, `getHTTPAdapter` for example.
+    '''
+    def build(factory=None, **kwargs):
+        # looked up when it is built, the base class of the adapter changes between the tests
+        factory = factory or inbenta_api_signature.SignatureAdapter
+        s = requests.Session()
+        s.mount(server.url, factory(SIGNATURE_KEY, server.url, **kwargs))
+        return s
+    return build
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Local HTTP server that stands in for the Inbenta APIs."""
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    # Python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from inbenta_api_signature.protocol import V1
+
+
+class LocalServer(ThreadingMixIn, HTTPServer):
+    '''Threaded server on a random local port that checks the request signatures
+
+    The response body is the request body (or `{}`), signed like the Inbenta APIs.
+    The requests with a wrong signature get a 403.
+
+    `failures` is a list of what to do with the next requests before answering them:
+    an int status code to reply, or 'drop' to close the connection without replying.
+    Every request is recorded in `requests` as (method, path, timestamp, valid signature).
+
+    The server clock is `clockOffset` seconds ahead of the local one, and with a
+    `tolerance` the timestamps further than that from the server clock are rejected.
+
+    With `signed` False it neither checks the requests nor signs the responses,
+    the baseline of the unsigned traffic.
+
+    Example:
+        with LocalServer('my-signature-key') as server:
+            requests.get(server.url + '/v1/foo')
+    '''
+    daemon_threads = True
+    allow_reuse_address = True
+    # the load test clients connect at the same time
+    request_queue_size = 128
+
+    def __init__(self, signatureKey, baseUrl=None):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.url = 'http://127.0.0.1:{}'.format(self.server_address[1])
+        self.protocol = V1(signatureKey, baseUrl=baseUrl)
+        self.failures = []
+        self.requests = []
+        self.connections = 0
+        self.clockOffset = 0
+        self.tolerance = None
+        self.signed = True
+        self.lock = threading.Lock()
+        self._thread = None
+
+    def get_request(self):
+        connection = HTTPServer.get_request(self)
+        with self.lock:
+            self.connections += 1
+        return connection
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self.serve_forever, args=(0.05,))
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the headers and the body are written separately
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def date_time_string(self, timestamp=None):
+        return BaseHTTPRequestHandler.date_time_string(self, time.time() + self.server.clockOffset)
+
+    def _body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0], 16)
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                if not size:
+                    return b''.join(chunks) or None
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else None
+
+    def _handle(self):
+        server = self.server
+        body = self._body()
+        timestamp = self.headers.get(V1.TIMESTAMP_HEADER)
+        signature = self.headers.get(V1.SIGNATURE_HEADER)
+        if not server.signed:
+            valid = None
+        else:
+            valid = bool(timestamp and signature) and signature == server.protocol.sign(
+                server.url + self.path, self.command, body=body, timestamp=timestamp).signature
+        if valid and server.tolerance is not None:
+            valid = abs(int(timestamp) - time.time() - server.clockOffset) <= server.tolerance
+        with server.lock:
+            server.requests.append((self.command, self.path, timestamp, valid))
+            failure = server.failures.pop(0) if server.failures else None
+        if failure == 'drop':
+            self.close_connection = True
+            return
+        status = failure or (200 if valid or not server.signed else 403)
+        content = body or b'{}'
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(content)))
+        if status == 200 and server.signed:
+            responseSignature = server.protocol._sign(server.protocol._responseBaseString(content.decode('utf8'), timestamp))
+            for name, value in server.protocol.getHeaders(responseSignature, timestamp).items():
+                self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _handle
@@ -13,11 +13,13 @@ import pytest
 class MockServer(HTTPAdapter):
     '''This is only a mock for testing.
 
-    This is not making any requests, only validate the signature'''
-    def __init__(self, signatureKey, baseUrl=None, signatureProto=None, *args, **kwargs):
+    This is not making any requests, only validate the signature.
+    The response body is the request body unless a `responder(request)` is given'''
+    def __init__(self, signatureKey, baseUrl=None, signatureProto=None, responder=None, *args, **kwargs):
         super(MockServer, self).__init__(*args, **kwargs)
         protoClass = signatureProto or V1
         self._protocol = protoClass(signatureKey, baseUrl=baseUrl)
+        self._responder = responder
 
     def __checkHeaders(self, headers):
         return all([h in headers.keys() for h in self._protocol.HEADERS])
@@ -26,13 +28,12 @@ class MockServer(HTTPAdapter):
         self.add_headers(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
         # Default returns 200 and the same body message
         status = 200
-        body = request.body or "No Body"
+        body = self._responder(request) if self._responder else request.body or "No Body"
         # check headers are present
         if self.__checkHeaders(request.headers):
             # Check signature is valid
             timestamp = request.headers[self._protocol.TIMESTAMP_HEADER]
-            signature = self._protocol.signRequest(request.url, request.method, params=None, body=request.body, timestamp=timestamp)
-            signatureHeaders = self._protocol.getHeaders(signature)
+            signatureHeaders = self._protocol.sign(request.url, request.method, params=None, body=request.body, timestamp=timestamp).headers
             for name, value in signatureHeaders.items():
                 _v = request.headers.get(name)
                 if not _v or _v != value:
@@ -47,14 +48,15 @@ class MockServer(HTTPAdapter):
         if hasattr(body, 'read'):
             body.seek(0)
         else:
-            body = BytesIO(body.encode('utf8'))
+            body = BytesIO(body if isinstance(body, (bytes, memoryview)) else body.encode('utf8'))
         response = urllib3.HTTPResponse(body, headers, status, preload_content=False)
         return self.build_response(request, response)
 
     def build_response(self, req, resp):
         response = super(MockServer, self).build_response(req, resp)
         if response.status_code // 100 == 2 and self.__checkHeaders(req.headers):
-            signature = self._protocol._responseBaseString(response.text)
+            timestamp = req.headers[self._protocol.TIMESTAMP_HEADER]
+            signature = self._protocol._responseBaseString(response.text, timestamp)
             signature = self._protocol._sign(signature)
-            response.headers.update(self._protocol.getHeaders(signature))
+            response.headers.update(self._protocol.getHeaders(signature, timestamp))
         return response
\ No newline at end of file
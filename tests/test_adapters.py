@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""Test `getHTTPAdapter` against a local server."""
+import functools
+import itertools
+import os
+import pickle
+import socket
+import time
+from io import BytesIO
+
+import pytest
+import requests
+from urllib3.util.retry import Retry
+
+from inbenta_api_signature import getHTTPAdapter
+from inbenta_api_signature.protocol import V1
+
+
+@pytest.fixture
+def timestamps(monkeypatch):
+    # a new second for every signature
+    counter = itertools.count(1552647740)
+    monkeypatch.setattr(V1, 'genTimestamp', lambda self: str(next(counter)))
+
+
+@pytest.fixture
+def retrying(session):
+    '''Sessions of `getHTTPAdapter` without waits between the retries'''
+    return functools.partial(session, getHTTPAdapter, backoffFactor=0)
+
+
+def test_get_http_adapter(server):
+    adapter = getHTTPAdapter('my-signature-key', server.url, poolConnections=3, poolMaxsize=7)
+    assert adapter._pool_connections == 3
+    assert adapter._pool_maxsize == 7
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in adapter.poolmanager.connection_pool_kw['socket_options']
+    assert 'socket_options' not in getHTTPAdapter('my-signature-key', keepAlive=False).poolmanager.connection_pool_kw
+
+    s = requests.Session()
+    s.mount(server.url, adapter)
+    response = s.get(server.url + '/v1/foo', params={'a': 1})
+    assert response.status_code == 200
+    assert response.validSignature is True
+
+
+@pytest.mark.parametrize("failures", [[503, 503], [429], ['drop'], ['drop', 502]])
+def test_retries_sign_every_attempt(server, timestamps, failures, retrying):
+    server.failures = list(failures)
+    response = retrying().get(server.url + '/v1/foo')
+    assert response.status_code == 200
+    assert response.validSignature is True
+    assert len(server.requests) == len(failures) + 1
+    # every attempt has a valid signature with its own timestamp
+    assert all(valid for _, _, _, valid in server.requests)
+    assert len(set(timestamp for _, _, timestamp, _ in server.requests)) == len(server.requests)
+
+
+def test_retries_rewind_the_body(server, timestamps, retrying):
+    retries = Retry(total=2, backoff_factor=0, status_forcelist=[503], allowed_methods=['POST'])
+    server.failures = [503]
+    response = retrying(retries=retries).post(server.url + '/v1/foo', data=BytesIO(b'{"a": 1}'))
+    assert response.status_code == 200
+    assert response.content == b'{"a": 1}'
+    assert response.validSignature is True
+
+    server.failures = [503]
+    response = retrying(retries=retries).post(server.url + '/v1/foo', data=(c for c in [b'{"a": ', b'2}']))
+    assert response.content == b'{"a": 2}'
+    assert response.validSignature is True
+
+    # a pipe can't be rewound, it is spooled like the generators
+    read, write = os.pipe()
+    os.write(write, b'{"a": 3}')
+    os.close(write)
+    server.failures = [503]
+    with os.fdopen(read, 'rb') as pipe:
+        response = retrying(retries=retries).post(server.url + '/v1/foo', data=pipe)
+    assert response.content == b'{"a": 3}'
+    assert response.validSignature is True
+
+
+def test_retries_exhausted(server, retrying):
+    server.failures = [503] * 3
+    response = retrying(retries=2).get(server.url + '/v1/foo')
+    assert response.status_code == 503
+    assert response.validSignature is None
+    assert len(server.requests) == 3
+
+    server.failures = ['drop'] * 3
+    with pytest.raises(requests.ConnectionError):
+        retrying(retries=2).get(server.url + '/v1/foo')
+
+    # POST is not idempotent, it is not retried
+    server.failures = [503]
+    assert retrying().post(server.url + '/v1/foo', data='{}').status_code == 503
+
+
+def test_prewarm(server, retrying):
+    s = retrying(prewarm=3, poolMaxsize=2)
+    deadline = time.time() + 5
+    while server.connections < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    # limited by the size of the pool
+    assert server.connections == 2
+    for _ in range(3):
+        assert s.get(server.url + '/v1/foo').validSignature is True
+    assert server.connections == 2
+
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    url = 'http://127.0.0.1:{}'.format(closed.getsockname()[1])
+    closed.close()
+    assert getHTTPAdapter('my-signature-key', url).prewarm(url, 2) == 0
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_responses_are_picklable(server, stream, retrying):
+    response = retrying().post(server.url + '/v1/foo', data=b'{"a": 1}', stream=stream)
+    unpickled = pickle.loads(pickle.dumps(response))
+    assert isinstance(unpickled, requests.Response)
+    assert unpickled.status_code == 200
+    assert unpickled.json() == {'a': 1}
+    # validated when pickled
+    assert unpickled.validSignature is True
+    assert response.validSignature is True
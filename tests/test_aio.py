@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""Test the asyncio integrations."""
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+
+from inbenta_api_signature.aio import AsyncSignatureClient
+from inbenta_api_signature.protocol import V1
+
+SIGNATURE_KEY = 'my-signature-key'
+BASE_URL = 'http://foo.bar/v1'
+RESPONSE_BODY = u'{"total_count":1,"results":[{"user_question":"pregunta en català"}]}'
+
+
+def serverResponse(method, url, body, headers):
+    '''Verify the request signature and return the signed (status, headers, body)'''
+    proto = V1(SIGNATURE_KEY, baseUrl=BASE_URL)
+    timestamp = headers.get(V1.TIMESTAMP_HEADER)
+    expected = proto.sign(url, method, body=body, timestamp=timestamp)
+    if not timestamp or headers.get(V1.SIGNATURE_HEADER) != expected.signature:
+        return 403, {}, json.dumps({"error": {"code": 403}})
+    signature = proto._sign(proto._responseBaseString(RESPONSE_BODY, timestamp))
+    return 200, proto.getHeaders(signature, timestamp), RESPONSE_BODY
+
+
+@pytest.mark.parametrize("offloadSize", [0, None])
+def test_async_client(offloadSize):
+    client = AsyncSignatureClient(SIGNATURE_KEY, BASE_URL, offloadSize=offloadSize)
+
+    async def run():
+        headers = await client.signRequest(BASE_URL + '/foo?a=1', body='{"a": 1}', method='POST')
+        status, responseHeaders, body = serverResponse('POST', BASE_URL + '/foo?a=1', '{"a": 1}', headers)
+        assert status == 200
+        timestamp = headers[client.TIMESTAMP_HEADER]
+        assert await client.validateResponse(responseHeaders[client.SIGNATURE_HEADER], body, timestamp)
+        assert not await client.validateResponse('wrong', body, timestamp)
+
+    asyncio.run(run())
+
+
+@pytest.mark.parametrize("body", [
+    pytest.param(lambda: BytesIO(b'{"a": 1}'), id="file"),
+    pytest.param(lambda: (c for c in [b'{"a": ', b'1}']), id="generator"),
+])
+def test_async_client_offloads_unsized_bodies(body):
+    threads = []
+
+    async def run(client):
+        return await client.signRequest(BASE_URL + '/foo', body=body(), method='POST')
+
+    with ThreadPoolExecutor(1) as executor:
+        client = AsyncSignatureClient(SIGNATURE_KEY, BASE_URL, executor=executor)
+        sign = client.client.sign
+
+        def recordThread(*args, **kwargs):
+            threads.append(threading.current_thread())
+            return sign(*args, **kwargs)
+        client.client.sign = recordThread
+        headers = asyncio.run(run(client))
+    # not read in the event loop
+    assert threads and threads[0] is not threading.main_thread()
+    status, _, _ = serverResponse('POST', BASE_URL + '/foo', '{"a": 1}', headers)
+    assert status == 200
+
+
+def test_httpx_auth():
+    httpx = pytest.importorskip('httpx')
+    from inbenta_api_signature.aio import SignatureAuth
+
+    def handler(request):
+        status, headers, body = serverResponse(request.method, str(request.url), request.content.decode('utf8'), request.headers)
+        return httpx.Response(status, headers=headers, content=body.encode('utf8'))
+
+    auth = SignatureAuth(AsyncSignatureClient(SIGNATURE_KEY, BASE_URL))
+    with httpx.Client(auth=auth, transport=httpx.MockTransport(handler)) as c:
+        r = c.post(BASE_URL + '/foo', params={'q': 'flight offer'}, content='{"a": 1}')
+        assert r.status_code == 200
+        assert r.validSignature is True
+
+    async def run():
+        async with httpx.AsyncClient(auth=auth, transport=httpx.MockTransport(handler)) as c:
+            responses = await asyncio.gather(*[c.get(BASE_URL + '/foo/{}'.format(i)) for i in range(50)])
+        assert all(r.validSignature for r in responses)
+
+    asyncio.run(run())
+
+
+def test_aiohttp_middleware():
+    pytest.importorskip('aiohttp')
+    from aiohttp import web, ClientSession
+    from aiohttp.test_utils import TestServer
+    from inbenta_api_signature.aio import signatureMiddleware
+
+    async def handle(request):
+        body = (await request.read()).decode('utf8')
+        url = BASE_URL + request.path_qs[len('/v1'):]
+        status, headers, body = serverResponse(request.method, url, body, request.headers)
+        return web.Response(status=status, headers=headers, text=body, content_type='application/json')
+
+    async def run():
+        app = web.Application()
+        app.router.add_route('*', '/v1/{tail:.*}', handle)
+        async with TestServer(app) as server:
+            client = AsyncSignatureClient(SIGNATURE_KEY, str(server.make_url('/v1')))
+            async with ClientSession(middlewares=[signatureMiddleware(client)]) as s:
+                async with s.post(server.make_url('/v1/foo'), data='{"a": 1}') as r:
+                    assert r.status == 200
+                    assert r.validSignature is True
+                async with s.get(server.make_url('/v1/foo?date_from=2019-01-01')) as r:
+                    assert r.status == 200
+                    assert r.validSignature is True
+
+    asyncio.run(run())
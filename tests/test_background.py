@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Test the validation of the responses in an executor."""
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+import pytest
+import requests
+
+from inbenta_api_signature import waitAll
+from inbenta_api_signature.protocol import V1
+from inbenta_api_signature.policy import NeverValidate
+
+
+@pytest.fixture
+def executor():
+    with ThreadPoolExecutor(2) as executor:
+        yield executor
+
+
+def test_background_validation(server, executor, session):
+    s = session(validationExecutor=executor)
+    responses = [s.post(server.url + '/v1/foo', data='{"page": %d}' % i) for i in range(10)]
+    assert all(r.signatureFuture is not None for r in responses)
+    assert [r.json()['page'] for r in responses] == list(range(10))
+    assert waitAll(responses) == [True] * 10
+    assert all(r.signatureFuture.result() is True for r in responses)
+
+
+def test_background_validation_failure(server, executor, monkeypatch, session):
+    monkeypatch.setattr(V1, 'validateResponseContent', lambda self, *args, **kwargs: False)
+    response = session(validationExecutor=executor).get(server.url + '/v1/foo')
+    assert response.validSignature is False
+
+
+def test_validsignature_waits(server, session):
+    release = threading.Event()
+    with ThreadPoolExecutor(1) as executor:
+        # the only worker is busy until released
+        executor.submit(release.wait)
+        response = session(validationExecutor=executor).get(server.url + '/v1/foo')
+        assert not response.signatureFuture.done()
+        with pytest.raises(TimeoutError):
+            waitAll([response], timeout=0.05)
+        release.set()
+        assert response.validSignature is True
+        assert response.signatureFuture.done()
+
+
+def test_streams_are_not_submitted(server, executor, session):
+    response = session(validationExecutor=executor).get(server.url + '/v1/foo', stream=True)
+    assert response.signatureFuture is None
+    # validated while the stream is consumed
+    assert waitAll([response]) == [None]
+    response.content
+    assert waitAll([response]) == [True]
+
+
+def test_skipped_responses_are_not_submitted(server, executor, session):
+    response = session(validationExecutor=executor, validationPolicy=NeverValidate()).get(server.url + '/v1/foo')
+    assert response.signatureFuture is None
+    assert waitAll([response]) == [None]
+
+
+def test_wait_all_without_executor(server, session):
+    s = session()
+    responses = [s.get(server.url + '/v1/foo'), requests.get(server.url + '/v1/foo')]
+    assert waitAll(responses) == [True, None]
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""Test the command line interface."""
+import io
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from inbenta_api_signature.cli import main
+from inbenta_api_signature.protocol import V1
+
+
+BASE_URL = 'https://foo.bar/v1'
+
+
+def requests(count):
+    return [{
+        'url': BASE_URL + '/events/user_questions',
+        'method': 'GET',
+        'params': {'date_from': '2019-01-01', 'offset': i},
+        'body': u'{"q": "pregunta %d en català"}' % i if i % 2 else None,
+        'timestamp': 1552647740 + i,
+    } for i in range(count)]
+
+
+def run(argv, lines):
+    stdout = io.StringIO()
+    status = main(argv, stdin=io.StringIO(u''.join(lines)), stdout=stdout)
+    return status, [json.loads(line) for line in stdout.getvalue().splitlines()]
+
+
+@pytest.mark.parametrize("processes", ['1', '2'])
+def test_cli_sign(processes):
+    proto = V1('my-signature-key', baseUrl=BASE_URL)
+    records = requests(50)
+    status, results = run(['sign', '--key', 'my-signature-key', '--base-url', BASE_URL, '--processes', processes, '--chunksize', '7'],
+                          [json.dumps(r) + '\n' for r in records])
+    assert status == 0
+    assert results == [
+        proto.sign(r['url'], r['method'], params=r['params'], body=r['body'], timestamp=r['timestamp'])._asdict()
+        for r in records
+    ]
+
+
+@pytest.mark.parametrize("processes", ['1', '2'])
+def test_cli_verify(processes):
+    proto = V1('my-signature-key')
+    records = []
+    for i in range(50):
+        body = u'{"total_count": %d, "q": "català"}' % i
+        signature = proto._sign(proto._responseBaseString(body, 1552647740))
+        records.append({'body': body, 'signature': signature if i != 10 else 'wrong', 'timestamp': '1552647740'})
+    lines = [json.dumps(r) + '\n' for r in records]
+    lines.insert(20, '\n')
+    lines.insert(30, '{"body": "missing signature"}\n')
+
+    status, results = run(['verify', '--key', 'my-signature-key', '--processes', processes, '--chunksize', '4'], lines)
+    assert status == 1
+    assert results[10] == {'valid': False}
+    assert results[29] == {'error': "KeyError: 'signature'"}
+    del results[29]
+    assert results == [{'valid': i != 10} for i in range(50)]
+
+
+def test_cli_files(tmpdir):
+    path = tmpdir.join('requests.jsonl')
+    path.write_text(u''.join(json.dumps(r) + '\n' for r in requests(3)), encoding='utf-8')
+    status, results = run(['sign', '--key', 'my-signature-key', '--processes', '1', str(path), str(path)], [])
+    assert status == 0
+    assert len(results) == 6
+    assert results[:3] == results[3:]
+
+
+def test_cli_module():
+    env = dict(os.environ, INBENTA_API_SIGNATURE_KEY='my-signature-key')
+    record = json.dumps({'url': 'v1/foo', 'method': 'GET', 'timestamp': 1552647740})
+    output = subprocess.check_output([sys.executable, '-m', 'inbenta_api_signature', 'sign', '--processes', '1'],
+                                     input=record.encode('utf8'), env=env)
+    assert json.loads(output)['signature'] == V1('my-signature-key').sign('v1/foo', 'GET', timestamp=1552647740).signature
+
+    env.pop('INBENTA_API_SIGNATURE_KEY')
+    process = subprocess.Popen([sys.executable, '-m', 'inbenta_api_signature', 'verify'],
+                               stdin=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    _, error = process.communicate(b'')
+    assert process.returncode == 2
+    assert b'the signature key is required' in error
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Test the clock skew estimation."""
+from email.utils import formatdate
+
+import pytest
+
+from inbenta_api_signature import getHTTPAdapter
+from inbenta_api_signature.clock import ClockSkew
+from inbenta_api_signature.instrumentation import StatsInstrumentation, CLOCK_OFFSET
+from inbenta_api_signature.protocol import V1
+
+
+# the server clock is 2 minutes ahead and rejects the timestamps 30 seconds away from it
+skewedServer = pytest.mark.parametrize('server', [{'clockOffset': 120, 'tolerance': 30}], indirect=True,
+                                       ids=['skewed'])
+
+
+def test_clock_skew_sample():
+    now = 1552647740
+    assert ClockSkew.sample(formatdate(now + 60, usegmt=True), now - 0.2, now + 0.2) == 60.5
+    assert ClockSkew.sample('not a date', now, now) is None
+    assert ClockSkew.sample(None, now, now) is None
+
+
+def test_clock_skew_smoothing():
+    now = 1552647740
+    clock = ClockSkew(smoothing=0.5)
+    assert clock.update(formatdate(now + 10, usegmt=True), now, now) == 10.5
+    assert clock.update(formatdate(now + 20, usegmt=True), now, now) == 15.5
+    assert clock.update('not a date', now, now) == 15.5
+    assert clock.update(formatdate(now - 30, usegmt=True), now, now, reset=True) == -29.5
+    assert clock.samples == 3
+
+
+def test_protocol_clock_offset():
+    proto = V1('my-signature-key')
+    timestamp = int(proto.genTimestamp())
+    proto.clockOffset = 3600
+    assert abs(int(proto.genTimestamp()) - timestamp - 3600) <= 1
+
+
+@skewedServer
+def test_adapter_corrects_the_clock(server, session):
+    stats = StatsInstrumentation()
+    s = session(getHTTPAdapter, instrumentation=stats)
+    adapter = s.get_adapter(server.url)
+
+    # rejected, signed again with the server clock
+    response = s.get(server.url + '/v1/foo')
+    assert response.status_code == 200
+    assert response.validSignature is True
+    assert [valid for _, _, _, valid in server.requests] == [False, True]
+    assert abs(adapter.clockOffset - 120) <= 1
+    assert stats.gauges[CLOCK_OFFSET] == adapter.clockOffset
+
+    for _ in range(5):
+        assert s.get(server.url + '/v1/foo').status_code == 200
+    assert len(server.requests) == 7
+    assert abs(adapter.clockOffset - 120) <= 1
+
+
+@skewedServer
+def test_adapter_without_clock_skew(server, session):
+    s = session()
+    assert s.get(server.url + '/v1/foo').status_code == 403
+    assert s.get(server.url + '/v1/foo').status_code == 403
+
+    # a rejection that is not caused by the clock is not signed again
+    s.mount(server.url, getHTTPAdapter('wrong-signature-key', server.url))
+    server.clockOffset = 0
+    assert s.get(server.url + '/v1/foo').status_code == 403
+    assert len(server.requests) == 3
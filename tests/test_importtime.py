@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""Test the import cost of the package."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Budget in microseconds of `from inbenta_api_signature import SignatureClient`
+IMPORT_TIME_BUDGET = 30000
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run(code, *options):
+    return subprocess.run([sys.executable] + list(options) + ['-c', code], cwd=ROOT,
+                          stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+
+
+def importTime():
+    '''Cumulative import time (us) of the package reported by `python -X importtime`'''
+    stderr = run('from inbenta_api_signature import SignatureClient', '-X', 'importtime').stderr
+    for line in stderr.splitlines():
+        if line.rstrip().endswith('| inbenta_api_signature'):
+            return int(line.split('|')[1])
+    raise AssertionError('inbenta_api_signature not found in:\n' + stderr)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="-X importtime and module __getattr__ need python 3.7")
+def test_import_time_budget():
+    assert min(importTime() for _ in range(3)) < IMPORT_TIME_BUDGET
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason="module __getattr__ needs python 3.7")
+def test_adapter_is_loaded_lazily():
+    run('import sys\n'
+        'from inbenta_api_signature import SignatureClient\n'
+        'SignatureClient("key").signRequest("v1/foo", method="GET")\n'
+        'assert "requests" not in sys.modules, "requests was imported"\n'
+        'from inbenta_api_signature import SignatureAdapter\n'
+        'assert "requests" in sys.modules\n')
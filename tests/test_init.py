@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 from copy import deepcopy
+from io import BytesIO
 import json
 import requests
 import pytest
@@ -122,6 +123,18 @@ def test_signatureclient_class():
         SignatureClient('examplekey', signatureVersion="v2")
 
 
+def test_signatureclient_prepare():
+    BASE_URL = 'https://foo.bar/v1'
+    client = SignatureClient('my-signature-key', BASE_URL)
+    prepared = client.prepare(BASE_URL + '/foo', params={'date_from': '2019-01-01'}, method='GET')
+    session = mockRequest('my-signature-key', BASE_URL)
+    for _ in range(2):
+        response = session.get(BASE_URL + '/foo', params={'date_from': '2019-01-01'}, headers=prepared.signRequest())
+        assert response.status_code == 200
+        assert client.validateResponse(response.headers[client.SIGNATURE_HEADER], response.text,
+                                       timestamp=response.headers[client.TIMESTAMP_HEADER])
+
+
 def test_changebasehttpadapter():
     class T1(requests.adapters.HTTPAdapter):
         pass
@@ -134,3 +147,118 @@ def test_changebasehttpadapter():
         changeBaseHTTPAdapter(t)
     with pytest.raises(TypeError):
         changeBaseHTTPAdapter(T2)
+
+
+@pytest.mark.parametrize("test_input,expected", TEST_INPUT)
+def test_httpadapter_stream(test_input, expected):
+    INBENTA_API_SIGNATURE_KEY = test_input['signatureKey']
+    BASE_URL = test_input.get('baseUrl')
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+
+    mRequest = requests.Session()
+    mRequest.mount('https://', AdapterWithMockServer(INBENTA_API_SIGNATURE_KEY, BASE_URL, None, INBENTA_API_SIGNATURE_KEY, BASE_URL))
+
+    test_request = test_input['request']
+    url = os.path.join(BASE_URL, test_request['url'])
+    response = mRequest.post(url, params=test_request['params'], data=u'{"q": "pregunta en català"}', stream=True)
+
+    assert response.status_code == expected['status_code']
+    assert response.validSignature is None
+    chunks = list(response.iter_content(chunk_size=5))
+    assert b''.join(chunks) == u'{"q": "pregunta en català"}'.encode('utf8')
+    assert response.validSignature == expected['validSignature']
+
+
+def test_httpadapter_shared_between_threads():
+    from concurrent.futures import ThreadPoolExecutor
+    BASE_URL = 'https://foo.bar/v1'
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+    adapter = AdapterWithMockServer('my-signature-key', BASE_URL, None, 'my-signature-key', BASE_URL, pool_maxsize=64)
+    mRequest = requests.Session()
+    mRequest.mount('https://', adapter)
+
+    def send(i):
+        return mRequest.post(BASE_URL + '/foo/{}'.format(i), data='{{"page": {}}}'.format(i))
+
+    with ThreadPoolExecutor(max_workers=64) as executor:
+        responses = list(executor.map(send, range(256)))
+    assert all(r.status_code == 200 for r in responses)
+    assert all(r.validSignature for r in responses)
+
+
+def _pipe(content):
+    # a file that can't be rewound, `tell` raises
+    read, write = os.pipe()
+    os.write(write, content)
+    os.close(write)
+    return os.fdopen(read, 'rb')
+
+
+@pytest.mark.parametrize("body", [
+    pytest.param(lambda: BytesIO(b'{"q": "flight offer"}'), id="file"),
+    pytest.param(lambda: (c for c in [b'{"q": ', b'"flight offer"}']), id="generator"),
+    pytest.param(lambda: b'{"q": "flight offer"}', id="bytes"),
+    pytest.param(lambda: memoryview(b'{"q": "flight offer"}'), id="memoryview"),
+    pytest.param(lambda: _pipe(b'{"q": "flight offer"}'), id="pipe"),
+])
+def test_httpadapter_body_types(body):
+    BASE_URL = 'https://foo.bar/v1'
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+    mRequest = requests.Session()
+    mRequest.mount('https://', AdapterWithMockServer('my-signature-key', BASE_URL, None, 'my-signature-key', BASE_URL))
+
+    response = mRequest.post(BASE_URL + '/foo', data=body())
+    assert response.status_code == 200
+    assert response.content == b'{"q": "flight offer"}'
+    assert response.validSignature is True
+
+
+@pytest.mark.parametrize("contentType,encoding", [
+    (None, 'utf-8'),
+    ('application/json; charset=utf-8', 'utf-8'),
+    ('application/json; charset=latin-1', 'latin-1'),
+])
+def test_httpadapter_validates_content(contentType, encoding):
+    BASE_URL = 'https://foo.bar/v1'
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+    mRequest = requests.Session()
+    mRequest.mount('https://', AdapterWithMockServer('my-signature-key', BASE_URL, None, 'my-signature-key', BASE_URL))
+
+    headers = {'Content-Type': contentType} if contentType else {}
+    response = mRequest.post(BASE_URL + '/foo', data=u'{"q": "pregunta en català"}'.encode(encoding), headers=headers)
+    assert response.validSignature is True
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_httpadapter_unknown_charset(stream):
+    BASE_URL = 'https://foo.bar/v1'
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+    mRequest = requests.Session()
+    mRequest.mount('https://', AdapterWithMockServer('my-signature-key', BASE_URL, None, 'my-signature-key', BASE_URL))
+
+    headers = {'Content-Type': 'application/json; charset=no-such-charset'}
+    response = mRequest.post(BASE_URL + '/foo', data=u'{"q": "pregunta en català"}'.encode('utf-8'), headers=headers,
+                             stream=stream)
+    b''.join(response.iter_content(chunk_size=5))
+    assert response.validSignature is True
+
+
+def test_httpadapter_lazy_validation():
+    from inbenta_api_signature.instrumentation import StatsInstrumentation, RESPONSE_DECODE
+    BASE_URL = 'https://foo.bar/v1'
+    stats = StatsInstrumentation()
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+    mRequest = requests.Session()
+    mRequest.mount('https://', AdapterWithMockServer('my-signature-key', BASE_URL, None, 'my-signature-key', BASE_URL, instrumentation=stats))
+
+    response = mRequest.post(BASE_URL + '/foo', data='{"a": 1}')
+    assert isinstance(response, requests.Response)
+    assert RESPONSE_DECODE not in stats.timings
+    assert response.validSignature is True
+    assert response.validSignature is True
+    assert stats.timings[RESPONSE_DECODE][0] == 1
+
+    response = mRequest.post(BASE_URL + '/foo', data='{"a": 1}')
+    response.validSignature = False
+    assert response.validSignature is False
+    assert stats.timings[RESPONSE_DECODE][0] == 1
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""Test the instrumentation hooks."""
+import requests
+
+from inbenta_api_signature import changeBaseHTTPAdapter
+from inbenta_api_signature.protocol import V1
+from inbenta_api_signature.instrumentation import Instrumentation, StatsInstrumentation, OpenTelemetryInstrumentation
+from inbenta_api_signature import instrumentation as metrics
+from mockServer import MockServer
+
+
+def test_protocol_phases():
+    stats = StatsInstrumentation()
+    proto = V1('examplekey', instrumentation=stats)
+    signed = proto.sign('v1/foo?a=1', 'POST', body=u'{"q": "català"}', timestamp=1552647740)
+    assert signed.signature == V1('examplekey').sign('v1/foo?a=1', 'POST', body=u'{"q": "català"}', timestamp=1552647740).signature
+    assert set(stats.timings) == set([metrics.CANONICALIZE, metrics.BODY_ENCODING, metrics.HMAC])
+    assert all(calls == 1 and seconds >= 0 for calls, seconds in stats.timings.values())
+    assert stats.counters == {metrics.BODY_BYTES: len(u'{"q": "català"}'.encode('utf8'))}
+
+    body = '{"a": 1}'
+    signature = proto._sign(proto._responseBaseString(body, 1552647740))
+    assert proto.validateResponse(signature, body, 1552647740)
+    assert not proto.validateResponse('wrong', body, 1552647740)
+    assert stats.timings[metrics.RESPONSE_BASE_STRING][0] == 2
+    assert stats.counters[metrics.SIGNATURE_FAILURES] == 1
+
+
+def test_adapter_counters():
+    stats = StatsInstrumentation()
+    AdapterWithMockServer = changeBaseHTTPAdapter(MockServer)
+    session = requests.Session()
+    session.mount('https://', AdapterWithMockServer('my-signature-key', 'https://foo.bar', None, 'my-signature-key', 'https://foo.bar', instrumentation=stats))
+    assert session.post('https://foo.bar/v1/foo', data='{"a": 1}').validSignature
+    assert stats.timings[metrics.RESPONSE_DECODE][0] == 1
+    assert metrics.MISSING_SIGNATURES not in stats.counters
+
+    class NoSignatureServer(MockServer):
+        def build_response(self, req, resp):
+            response = super(NoSignatureServer, self).build_response(req, resp)
+            del response.headers[V1.SIGNATURE_HEADER]
+            return response
+    AdapterWithMockServer = changeBaseHTTPAdapter(NoSignatureServer)
+    session.mount('https://', AdapterWithMockServer('my-signature-key', 'https://foo.bar', None, 'my-signature-key', 'https://foo.bar', instrumentation=stats))
+    assert session.post('https://foo.bar/v1/foo', data='{"a": 1}').validSignature is None
+    assert stats.counters[metrics.MISSING_SIGNATURES] == 1
+
+
+def test_base_instrumentation_is_a_noop():
+    proto = V1('examplekey', instrumentation=Instrumentation())
+    assert proto.signRequest('v1/foo', 'GET', timestamp=1552647740) == V1('examplekey').signRequest('v1/foo', 'GET', timestamp=1552647740)
+
+
+def test_opentelemetry_instrumentation():
+    records = []
+
+    class Instrument(object):
+        def __init__(self, name):
+            self.name = name
+
+        def record(self, value, attributes=None):
+            records.append((self.name, value, attributes))
+
+        def add(self, value, attributes=None):
+            records.append((self.name, value, attributes))
+
+    class Meter(object):
+        def create_histogram(self, name, unit='', description=''):
+            return Instrument(name)
+
+        def create_counter(self, name, unit='', description=''):
+            return Instrument(name)
+
+    proto = V1('examplekey', instrumentation=OpenTelemetryInstrumentation(Meter()))
+    proto.sign('v1/foo', 'POST', body='abc', timestamp=1552647740)
+    assert [(name, attributes) for name, _, attributes in records if name == 'inbenta.signature.duration'] == [
+        ('inbenta.signature.duration', {'phase': phase}) for phase in [metrics.CANONICALIZE, metrics.BODY_ENCODING, metrics.HMAC]
+    ]
+    assert ('inbenta.signature.body_bytes', 3, None) in records
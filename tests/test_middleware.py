@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""Test the WSGI and ASGI middleware with the signing clients."""
+import asyncio
+import json
+import threading
+from io import BytesIO
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import httpx
+import pytest
+import requests
+
+from inbenta_api_signature import SignatureAdapter
+from inbenta_api_signature.aio import AsyncSignatureClient, SignatureAuth
+from inbenta_api_signature import instrumentation as metrics
+from inbenta_api_signature.asgi import ASGISignatureMiddleware
+from inbenta_api_signature.instrumentation import StatsInstrumentation
+from inbenta_api_signature.middleware import SignatureMiddleware
+from inbenta_api_signature.protocol import V1
+
+SIGNATURE_KEY = 'my-signature-key'
+RESPONSE_BODY = u'{"results":[{"user_question":"pregunta en català"}]}'.encode('utf8')
+
+
+def echo(environ, start_response):
+    '''WSGI application that answers the request body, or RESPONSE_BODY'''
+    length = int(environ.get('CONTENT_LENGTH') or 0)
+    body = environ['wsgi.input'].read(length) if length else RESPONSE_BODY
+    start_response('200 OK', [('Content-Type', 'application/json; charset=utf-8'),
+                              ('Content-Length', str(len(body)))])
+    return [body]
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def wsgiServer():
+    server = make_server('127.0.0.1', 0, SignatureMiddleware(echo, SIGNATURE_KEY, '/v1'), handler_class=_QuietHandler)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,))
+    thread.daemon = True
+    thread.start()
+    yield 'http://127.0.0.1:{}'.format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("method, kwargs", [
+    ('GET', {'params': {'date_from': '2019-01-01', 'q': u'català'}}),
+    ('POST', {'data': b'{"q": "flight + offer"}'}),
+    ('PUT', {'data': b'x' * (200 * 1024)}),
+])
+def test_wsgi_middleware(wsgiServer, method, kwargs):
+    s = requests.Session()
+    s.mount(wsgiServer, SignatureAdapter(SIGNATURE_KEY, wsgiServer + '/v1'))
+    response = s.request(method, wsgiServer + '/v1/foo', **kwargs)
+    assert response.status_code == 200
+    assert response.content == kwargs.get('data', RESPONSE_BODY)
+    assert response.validSignature is True
+
+
+def test_wsgi_middleware_rejects(wsgiServer):
+    response = requests.get(wsgiServer + '/v1/foo')
+    assert response.status_code == 403
+    assert response.json()['error']['message'] == 'The signature headers are missing'
+
+    headers = V1(SIGNATURE_KEY).sign(wsgiServer + '/v1/bar', 'GET').headers
+    response = requests.get(wsgiServer + '/v1/foo', headers=headers)
+    assert response.status_code == 403
+    assert response.json()['error']['message'] == 'The signature is not valid'
+
+
+def test_wsgi_middleware_non_ascii_signature():
+    headers = V1(SIGNATURE_KEY).sign('http://foo.bar/v1/foo', 'GET').headers
+    environ = dict(('HTTP_' + name.upper().replace('-', '_'), value) for name, value in headers.items())
+    # WSGI servers decode the headers as latin-1
+    environ.update({'HTTP_X_INBENTA_SIGNATURE': u'caf\xe9', 'REQUEST_METHOD': 'GET', 'PATH_INFO': '/v1/foo',
+                    'SERVER_NAME': 'foo.bar', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO()})
+    calls = []
+    result = SignatureMiddleware(echo, SIGNATURE_KEY)(environ, lambda status, headers: calls.append(status))
+    assert calls == ['403 Forbidden']
+    assert json.loads(b''.join(result))['error']['message'] == 'The signature is not valid'
+
+
+def test_wsgi_middleware_missing_headers_skip_the_body():
+    class Unreadable(object):
+        def read(self, *args):
+            raise AssertionError('the body should not be read')
+
+    calls = []
+    environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/v1/foo', 'SERVER_NAME': 'foo.bar', 'SERVER_PORT': '80',
+               'wsgi.url_scheme': 'http', 'CONTENT_LENGTH': '10', 'wsgi.input': Unreadable()}
+    result = SignatureMiddleware(echo, SIGNATURE_KEY)(environ, lambda status, headers: calls.append(status))
+    assert calls == ['403 Forbidden']
+    assert json.loads(b''.join(result))['error']['code'] == 403
+
+
+def test_wsgi_middleware_raw_uri():
+    proto = V1(SIGNATURE_KEY)
+    body = b'{"a": 1}'
+    headers = proto.sign('http://foo.bar/v1/foo%2Fbar?a=%7E', 'POST', body=body, timestamp=1552647740).headers
+    environ = dict(('HTTP_' + name.upper().replace('-', '_'), value) for name, value in headers.items())
+    environ.update({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/v1/foo/bar', 'QUERY_STRING': 'a=%7E',
+                    'RAW_URI': '/v1/foo%2Fbar?a=%7E', 'HTTP_HOST': 'foo.bar', 'wsgi.url_scheme': 'http',
+                    'CONTENT_LENGTH': str(len(body)), 'wsgi.input': BytesIO(body)})
+    started = []
+    result = SignatureMiddleware(echo, SIGNATURE_KEY)(environ, lambda status, headers, exc_info=None:
+                                                       started.append(dict(headers)))
+    assert b''.join(result) == body
+    assert proto.validateResponseContent(started[0][V1.SIGNATURE_HEADER], body, timestamp=1552647740)
+
+
+async def asgiEcho(scope, receive, send):
+    '''ASGI application that answers the request body, or RESPONSE_BODY'''
+    body = b''
+    while True:
+        message = await receive()
+        body += message.get('body', b'')
+        if not message.get('more_body'):
+            break
+    body = body or RESPONSE_BODY
+    await send({'type': 'http.response.start', 'status': 200,
+                'headers': [(b'content-type', b'application/json'), (b'content-length', str(len(body)).encode())]})
+    # the body in two messages
+    await send({'type': 'http.response.body', 'body': body[:3], 'more_body': True})
+    await send({'type': 'http.response.body', 'body': body[3:]})
+
+
+@pytest.mark.parametrize("method, kwargs", [
+    ('GET', {'params': {'date_from': '2019-01-01'}}),
+    ('POST', {'content': b'{"q": "flight + offer"}'}),
+])
+def test_asgi_middleware(method, kwargs):
+    app = ASGISignatureMiddleware(asgiEcho, SIGNATURE_KEY, 'http://foo.bar/v1')
+    auth = SignatureAuth(AsyncSignatureClient(SIGNATURE_KEY, 'http://foo.bar/v1'))
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), auth=auth) as c:
+            response = await c.request(method, 'http://foo.bar/v1/foo', **kwargs)
+            assert response.status_code == 200
+            assert response.content == kwargs.get('content', RESPONSE_BODY)
+            assert response.validSignature is True
+
+            response = await c.request(method, 'http://foo.bar/v1/foo', auth=None, **kwargs)
+            assert response.status_code == 403
+            assert response.json()['error']['message'] == 'The signature headers are missing'
+
+    asyncio.run(run())
+
+
+def test_asgi_middleware_rejects_before_the_body():
+    app = ASGISignatureMiddleware(asgiEcho, SIGNATURE_KEY)
+    sent = []
+
+    async def receive():
+        raise AssertionError('the body should not be received')
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {'type': 'http', 'method': 'POST', 'path': '/v1/foo', 'query_string': b'',
+             'headers': [(b'host', b'foo.bar'), (b'x-inbenta-signature', b'wrong')]}
+    asyncio.run(app(scope, receive, send))
+    assert sent[0]['status'] == 403
+
+
+def _verifyWithProtocol(stats, headers):
+    V1(SIGNATURE_KEY, instrumentation=stats).verifyRequest('http://foo.bar/v1/foo', 'GET', headers=headers)
+
+
+def _verifyWithWSGI(stats, headers):
+    environ = dict(('HTTP_' + name.upper().replace('-', '_'), value) for name, value in headers.items())
+    environ.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/v1/foo', 'HTTP_HOST': 'foo.bar', 'wsgi.url_scheme': 'http',
+                    'wsgi.input': BytesIO()})
+    SignatureMiddleware(echo, SIGNATURE_KEY, instrumentation=stats)(environ, lambda status, headers: None)
+
+
+def _verifyWithASGI(stats, headers):
+    async def receive():
+        return {'type': 'http.request', 'body': b''}
+
+    async def send(message):
+        pass
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/v1/foo', 'query_string': b'',
+             'headers': [(b'host', b'foo.bar')] + [(n.encode(), v.encode()) for n, v in headers.items()]}
+    asyncio.run(ASGISignatureMiddleware(asgiEcho, SIGNATURE_KEY, instrumentation=stats)(scope, receive, send))
+
+
+@pytest.mark.parametrize("verify", [_verifyWithProtocol, _verifyWithWSGI, _verifyWithASGI],
+                         ids=['verifyRequest', 'wsgi', 'asgi'])
+@pytest.mark.parametrize("headers, counter", [
+    ({}, metrics.MISSING_SIGNATURES),
+    ({V1.SIGNATURE_HEADER: 'wrong', V1.TIMESTAMP_HEADER: '1552647740'}, metrics.MISSING_SIGNATURES),
+    ({V1.SIGNATURE_HEADER: 'wrong', V1.TIMESTAMP_HEADER: '1552647740', V1.SIGNATURE_VERSION_HEADER: 'v1'},
+     metrics.SIGNATURE_FAILURES),
+], ids=['missing', 'no-version', 'wrong'])
+def test_rejection_counters(verify, headers, counter):
+    stats = StatsInstrumentation()
+    verify(stats, headers)
+    assert stats.counters == {counter: 1}
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Test the concurrent pagination."""
+import json
+
+import pytest
+import requests
+
+from inbenta_api_signature import SignatureClient, InvalidSignatureError, changeBaseHTTPAdapter
+from inbenta_api_signature.url import urlparse, parse_queryparams
+from mockServer import MockServer
+
+SIGNATURE_KEY = 'my-signature-key'
+BASE_URL = 'https://foo.bar/prod/reporting'
+TOTAL_COUNT = 2345
+
+
+def reportingPage(request):
+    query = parse_queryparams(urlparse(request.url).query)
+    offset, length = int(query['offset']), int(query.get('length', 1000))
+    results = [{"event_id": i} for i in range(offset, min(offset + length, TOTAL_COUNT))]
+    return json.dumps({"total_count": TOTAL_COUNT, "offset": offset, "length": length, "results": results})
+
+
+class TamperingServer(MockServer):
+    def build_response(self, req, resp):
+        response = super(TamperingServer, self).build_response(req, resp)
+        response.headers['x-inbenta-signature'] = 'tampered'
+        return response
+
+
+def mockSession(signatureKey=SIGNATURE_KEY, server=MockServer):
+    AdapterWithMockServer = changeBaseHTTPAdapter(server)
+    session = requests.Session()
+    session.mount('https://', AdapterWithMockServer(signatureKey, BASE_URL, None, SIGNATURE_KEY, BASE_URL, responder=reportingPage))
+    return session
+
+
+@pytest.mark.parametrize("length,maxWorkers", [(None, 4), (100, 1), (100, 8), (3000, 2)])
+def test_iterresults(length, maxWorkers):
+    client = SignatureClient(SIGNATURE_KEY, BASE_URL)
+    params = {"date_from": "2019-01-01", "date_to": "2019-01-31"}
+    items = client.iterResults(BASE_URL + '/v1/events/user_questions', params=params, session=mockSession(), length=length, maxWorkers=maxWorkers)
+    assert [item['event_id'] for item in items] == list(range(TOTAL_COUNT))
+
+
+def test_iterresults_invalid_signature():
+    client = SignatureClient(SIGNATURE_KEY, BASE_URL)
+    items = client.iterResults(BASE_URL + '/v1/events/user_questions', session=mockSession(server=TamperingServer), length=100)
+    with pytest.raises(InvalidSignatureError):
+        list(items)
+    items = client.iterResults(BASE_URL + '/v1/events/user_questions', session=mockSession(server=TamperingServer), length=100, validate=False)
+    assert len(list(items)) == TOTAL_COUNT
+    items = client.iterResults(BASE_URL + '/v1/events/user_questions', session=mockSession('wrong-signature-key'), length=100)
+    with pytest.raises(requests.HTTPError):
+        list(items)
+
+
+def test_iterresults_stop_early():
+    client = SignatureClient(SIGNATURE_KEY, BASE_URL)
+    items = client.iterResults(BASE_URL + '/v1/events/user_questions', session=mockSession(), length=10, maxWorkers=2)
+    assert [next(items)['event_id'] for _ in range(25)] == list(range(25))
+    items.close()
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Test the validation policies of `SignatureAdapter` against a local server."""
+import pytest
+import requests
+
+from inbenta_api_signature.instrumentation import StatsInstrumentation
+from inbenta_api_signature.policy import (AlwaysValidate, NeverValidate, PrefixPolicy, SampledValidation,
+                                          SizePolicy, ValidationPolicy)
+
+
+@pytest.mark.parametrize("stream", [False, True])
+@pytest.mark.parametrize("policy, validated", [
+    (None, True), (ValidationPolicy(), True), (AlwaysValidate(), True), (NeverValidate(), False),
+])
+def test_policy_decision(server, session, policy, validated, stream):
+    stats = StatsInstrumentation()
+    response = session(validationPolicy=policy, instrumentation=stats).get(server.url + '/v1/foo', stream=stream)
+    assert response.content == b'{}'
+    assert response.validationSkipped is not validated
+    assert response.validSignature is (True if validated else None)
+    if validated:
+        assert stats.counters == {'validated_responses': 1}
+    else:
+        assert stats.counters == {'skipped_validations': 1}
+
+
+def test_sampled_validation(server, session):
+    stats = StatsInstrumentation()
+    s = session(validationPolicy=SampledValidation(0.25, seed=7), instrumentation=stats)
+    responses = [s.get(server.url + '/v1/foo') for _ in range(40)]
+    validated = [r for r in responses if r.validSignature]
+    assert 0 < len(validated) < 40
+    assert stats.counters == {'validated_responses': len(validated), 'skipped_validations': 40 - len(validated)}
+    assert all(r.validationSkipped for r in responses if r not in validated)
+
+
+@pytest.mark.parametrize("rate", [-0.1, 1.5])
+def test_sampled_validation_rate(rate):
+    with pytest.raises(ValueError):
+        SampledValidation(rate)
+
+
+def test_prefix_policy(server, session):
+    policy = PrefixPolicy({'/v1/exports/': NeverValidate(), server.url + '/v1/exports/keep': AlwaysValidate()})
+    s = session(validationPolicy=policy)
+    assert s.get(server.url + '/v1/exports/page').validationSkipped
+    assert s.get(server.url + '/v1/exports/keep/page').validSignature is True
+    assert s.get(server.url + '/v1/events').validSignature is True
+
+
+@pytest.mark.parametrize("size, validated", [(10, True), (100, True), (101, False)])
+def test_size_policy(server, session, size, validated):
+    response = session(validationPolicy=SizePolicy(100)).post(server.url + '/v1/foo', data=b'x' * size)
+    assert response.validSignature is (True if validated else None)
+    assert response.validationSkipped is not validated
+
+
+@pytest.mark.parametrize("unknownSize", [True, False])
+def test_size_policy_unknown_size(unknownSize):
+    response = requests.Response()
+    assert SizePolicy(100, unknownSize=unknownSize).shouldValidate(None, response) is unknownSize
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""Test the urllib3 signature pool manager against a local server."""
+import itertools
+import json
+import os
+from io import BytesIO
+
+import pytest
+from urllib3.response import HTTPResponse
+from urllib3.util.retry import Retry
+
+from inbenta_api_signature.instrumentation import StatsInstrumentation, MISSING_SIGNATURES
+from inbenta_api_signature.pool import SignaturePoolManager
+from inbenta_api_signature.protocol import V1
+
+
+def test_pool_manager(server):
+    http = SignaturePoolManager('my-signature-key', server.url, maxsize=2)
+    response = http.request('GET', server.url + '/v1/foo', fields={'date_from': '2019-01-01', 'q': u'català'})
+    assert isinstance(response, HTTPResponse)
+    assert response.status == 200
+    assert response.validSignature is True
+    assert server.requests[-1][3] is True
+
+    response = http.request('POST', server.url + '/v1/foo', body=json.dumps({'q': u'pregunta en català'}),
+                            headers={'Content-Type': 'application/json; charset=utf-8'})
+    assert response.validSignature is True
+    assert json.loads(response.data.decode('utf8')) == {'q': u'pregunta en català'}
+
+    response = http.request('POST', server.url + '/v1/foo', body=BytesIO(b'{"a": 1}'))
+    assert response.data == b'{"a": 1}'
+    assert response.validSignature is True
+
+    # the signature is validated from the stream when it is read
+    response = http.request('GET', server.url + '/v1/foo', preload_content=False)
+    assert response.validSignature is True
+    assert response.data == b'{}'
+
+
+def test_pool_manager_invalid_signature(server):
+    stats = StatsInstrumentation()
+    http = SignaturePoolManager('wrong-signature-key', server.url, instrumentation=stats)
+    response = http.request('GET', server.url + '/v1/foo')
+    assert response.status == 403
+    assert response.validSignature is None
+    assert stats.counters[MISSING_SIGNATURES] == 1
+
+    server.protocol = V1('another-signature-key')
+    http = SignaturePoolManager('another-signature-key', server.url)
+    response = http.request('GET', server.url + '/v1/foo')
+    response._body = b'{"tampered": true}'
+    assert response.validSignature is False
+
+
+def test_pool_manager_retries_sign_every_attempt(server, monkeypatch):
+    counter = itertools.count(1552647740)
+    monkeypatch.setattr(V1, 'genTimestamp', lambda self: str(next(counter)))
+    server.failures = [503, 'drop']
+    http = SignaturePoolManager('my-signature-key', server.url,
+                                retries=Retry(total=3, backoff_factor=0, status_forcelist=[503]))
+    response = http.request('GET', server.url + '/v1/foo')
+    assert response.status == 200
+    assert response.validSignature is True
+    assert [valid for _, _, _, valid in server.requests] == [True, True, True]
+    assert len(set(timestamp for _, _, timestamp, _ in server.requests)) == 3
+
+
+@pytest.mark.parametrize("read", [
+    pytest.param(lambda response: response.read(), id="read"),
+    pytest.param(lambda response: b''.join(response.stream(3)), id="stream"),
+    pytest.param(lambda response: response.read(5) + response.read(), id="partial-read"),
+    pytest.param(lambda response: response.read(5), id="unfinished-read"),
+])
+def test_pool_manager_validates_streams(server, read):
+    http = SignaturePoolManager('my-signature-key', server.url)
+    response = http.request('POST', server.url + '/v1/foo', body=b'{"q": "pregunta"}', preload_content=False)
+    assert b'{"q": "pregunta"}'.startswith(read(response))
+    # the rest of the body is read to validate it
+    assert response.validSignature is True
+
+
+def test_pool_manager_pipe_body(server):
+    read, write = os.pipe()
+    os.write(write, b'{"a": 1}')
+    os.close(write)
+    http = SignaturePoolManager('my-signature-key', server.url,
+                                retries=Retry(total=1, backoff_factor=0, status_forcelist=[503], allowed_methods=['POST']))
+    server.failures = [503]
+    with os.fdopen(read, 'rb') as pipe:
+        response = http.request('POST', server.url + '/v1/foo', body=pipe)
+    assert response.data == b'{"a": 1}'
+    assert response.validSignature is True
+    assert [valid for _, _, _, valid in server.requests] == [True, True]
+
+
+def test_pool_manager_iterable_body(server):
+    http = SignaturePoolManager('my-signature-key', server.url)
+    with pytest.raises(TypeError):
+        http.request('POST', server.url + '/v1/foo', body=(c for c in [b'{"a": ', b'1}']))
+    assert server.requests == []
@@ -3,7 +3,9 @@
 
 from collections import OrderedDict
 from copy import deepcopy
+from io import BytesIO
 
+from inbenta_api_signature.instrumentation import StatsInstrumentation
 from inbenta_api_signature.protocol import V1
 
 import pytest
@@ -267,3 +269,332 @@ def test_protocol_v1(test_input, expected):
     if test_input.get('timestamp'):
         response['timestamp'] = test_input['timestamp']
     assert proto.validateResponse(**response)
+
+
+@pytest.mark.parametrize("body,chunkSize", [
+    ('{"total_count":1,"results":[{"user_question":"How can I book a flight?"}]}', 7),
+    (u'{"user_question":"pregunta en català \U0001F600","quote":"\\"\\n"}', 1),
+    (u'{"user_question":"pregunta en català \U0001F600","quote":"\\"\\n"}', 3),
+    ('', 10),
+])
+def test_protocol_v1_response_validator(body, chunkSize):
+    proto = V1('examplekey')
+    signature = proto._sign(proto._responseBaseString(body, timestamp=1552647740))
+    content = body.encode('utf8')
+    validator = proto.responseValidator(signature, timestamp=1552647740)
+    for i in range(0, len(content), chunkSize):
+        validator.update(content[i:i + chunkSize])
+    assert validator.finish()
+
+    validator = proto.responseValidator('wrong-signature', timestamp=1552647740)
+    validator.update(content)
+    assert validator.finish() is False
+
+
+@pytest.mark.parametrize("body,encoding,chunkSize", [
+    ('{"total_count":1,"results":[{"user_question":"How can I book a flight?"}]}', None, 16),
+    (u'{"user_question":"pregunta en català \U0001F600","quote":"\\"\\n%+ ~<>"}', 'utf-8', 1),
+    (u'{"user_question":"pregunta en català \U0001F600","quote":"\\"\\n%+ ~<>"}', None, 5),
+    (u'{"user_question":"pregunta en català"}', 'latin-1', 4),
+    (u'\x00\x1f\x7f' + ''.join(chr(c) for c in range(32, 127)), None, 3),
+    ('', None, 10),
+])
+def test_protocol_v1_validate_response_content(body, encoding, chunkSize):
+    proto = V1('examplekey')
+    proto.CHUNK_SIZE = chunkSize
+    signature = proto._sign(proto._responseBaseString(body, timestamp=1552647740))
+    content = body.encode(encoding or 'utf-8')
+    assert proto.validateResponseContent(signature, content, encoding=encoding, timestamp=1552647740)
+    assert proto.validateResponseContent(signature, bytearray(content), encoding=encoding, timestamp=1552647740)
+    assert not proto.validateResponseContent('wrong-signature', content, encoding=encoding, timestamp=1552647740)
+
+
+def test_protocol_v1_validate_response_content_unknown_charset():
+    proto = V1('examplekey')
+    content = u'{"q": "pregunta en catal\xe0"}'.encode('utf-8')
+    signature = proto._sign(proto._responseBaseString(content.decode('utf-8'), timestamp=1552647740))
+    assert proto.validateResponseContent(signature, content, encoding='no-such-charset', timestamp=1552647740)
+
+
+def test_protocol_v1_validate_response_content_invalid_bytes():
+    proto = V1('examplekey')
+    proto.CHUNK_SIZE = 2
+    content = b'{"q": "caf\xe9 \xf0\x9f"}'
+    # same replacement characters as the text decoded by requests
+    signature = proto._sign(proto._responseBaseString(content.decode('utf-8', 'replace'), timestamp=1552647740))
+    assert proto.validateResponseContent(signature, content, timestamp=1552647740)
+
+
+def test_protocol_v1_quote_plus_json():
+    from inbenta_api_signature.protocol import _quotePlusJSON
+    from inbenta_api_signature.url import quote_plus
+    text = ''.join(chr(c) for c in range(128))
+    assert _quotePlusJSON(text) == quote_plus(text).encode('ascii')
+    assert _quotePlusJSON('%2B+ %') == b'%252B%2B+%25'
+
+
+def test_protocol_v1_sign_is_stateless():
+    proto = V1('examplekey')
+    signed = proto.sign('v1/foo/bar', 'GET', timestamp=1552647740)
+    assert proto.timestamp is None
+    assert signed.timestamp == '1552647740'
+    assert signed.signature == proto.signRequest('v1/foo/bar', 'GET', timestamp=1552647740)
+    assert signed.headers == {
+        V1.SIGNATURE_HEADER: signed.signature,
+        V1.TIMESTAMP_HEADER: '1552647740',
+        V1.SIGNATURE_VERSION_HEADER: 'v1',
+    }
+
+
+def test_protocol_v1_sign_concurrently():
+    from concurrent.futures import ThreadPoolExecutor
+    proto = V1('examplekey')
+    timestamps = list(range(1552647740, 1552647740 + 500))
+
+    def sign(timestamp):
+        return proto.sign('v1/foo/bar', 'POST', body=str(timestamp), timestamp=timestamp)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(sign, timestamps))
+    for timestamp, signed in zip(timestamps, results):
+        assert signed.headers[V1.TIMESTAMP_HEADER] == str(timestamp)
+        assert signed.signature == V1('examplekey').signRequest('v1/foo/bar', 'POST', body=str(timestamp), timestamp=timestamp)
+
+
+def test_protocol_v1_sign_requests():
+    import hmac
+    from hashlib import sha256
+    proto = V1('examplekey')
+    assert proto._sign(b'v1&1552647740') == hmac.new(b'examplekey', b'v1&1552647740', sha256).hexdigest()
+    batch = [
+        ('v1/foo/bar', 'GET', None, None),
+        ('v1/foo/bar', 'GET', {'date_from': '2019-01-01'}, None),
+        {'url': 'v1/foo/bar?a=1', 'method': 'POST', 'body': '{"a": 1}'},
+    ]
+    headers = proto.signRequests(batch, timestamp=1552647740)
+    assert len(headers) == 3
+    assert headers[0] == proto.sign('v1/foo/bar', 'GET', timestamp=1552647740).headers
+    assert headers[1] == proto.sign('v1/foo/bar', 'GET', params={'date_from': '2019-01-01'}, timestamp=1552647740).headers
+    assert headers[2] == proto.sign('v1/foo/bar?a=1', 'POST', body='{"a": 1}', timestamp=1552647740).headers
+    assert all(h[V1.TIMESTAMP_HEADER] == '1552647740' for h in headers)
+
+
+@pytest.mark.parametrize("kwargs", [
+    pytest.param(lambda: {}, id="default"),
+    pytest.param(lambda: {'cacheSize': 2}, id="url-cache"),
+    pytest.param(lambda: {'instrumentation': StatsInstrumentation()}, id="instrumentation"),
+])
+def test_protocol_v1_sign_requests_batch_paths(kwargs):
+    proto = V1('examplekey', baseUrl='https://foo.bar/v1', **kwargs())
+    reference = V1('examplekey', baseUrl='https://foo.bar/v1')
+    body = u'{"q": "català"}'.encode('utf8')
+    batch = [
+        ('https://foo.bar/v1/foo?a=1', 'get'),
+        ('https://foo.bar/v1/foo?a=1', 'GET', {'a': 2}),
+        ('https://foo.bar/v1/foo?a=1', 'GET', {'b': [1, 2]}, None),
+        ('https://foo.bar/v1/bar', 'POST', None, BytesIO(body)),
+        ('https://foo.bar/v1/foo?a=1', 'POST', None, ''),
+    ]
+    headers = proto.signRequests(batch, timestamp=1552647740)
+    assert headers == [
+        reference.sign('https://foo.bar/v1/foo?a=1', 'GET', timestamp=1552647740).headers,
+        reference.sign('https://foo.bar/v1/foo?a=1', 'GET', params={'a': 2}, timestamp=1552647740).headers,
+        reference.sign('https://foo.bar/v1/foo?a=1', 'GET', params={'b': [1, 2]}, timestamp=1552647740).headers,
+        reference.sign('https://foo.bar/v1/bar', 'POST', body=body, timestamp=1552647740).headers,
+        reference.sign('https://foo.bar/v1/foo?a=1', 'POST', body='', timestamp=1552647740).headers,
+    ]
+
+
+def test_protocol_v1_url_cache():
+    cached = V1('examplekey', baseUrl='https://foo.bar/v1', cacheSize=2)
+    proto = V1('examplekey', baseUrl='https://foo.bar/v1')
+    requests = [
+        ('https://foo.bar/v1/foo?date_from=2019-01-01', {'offset': 0}),
+        ('https://foo.bar/v1/foo?date_from=2019-01-01', {'offset': 0}),
+        ('https://foo.bar/v1/foo?date_from=2019-01-01', {'offset': True}),
+        ('https://foo.bar/v1/foo?date_from=2019-01-01', {'offset': 1.0}),
+        ('https://foo.bar/v1/foo?date_from=2019-01-01', {'offset': 1.0}),
+        ('https://foo.bar/v1/foo', {'ids': [1, 2]}),
+        ('https://foo.bar/v1/foo', {'filter': {'a': 1}}),
+    ]
+    for url, params in requests:
+        for timestamp in (1552647740, 1552647741):
+            for body in (None, '{"a": 1}'):
+                assert cached.signRequest(url, 'POST', params=params, body=body, timestamp=timestamp) == \
+                    proto.signRequest(url, 'POST', params=params, body=body, timestamp=timestamp)
+    info = cached.cacheInfo()
+    assert (info.hits, info.misses, info.evictions) == (20, 4, 2)
+    assert (info.maxsize, info.currsize) == (2, 2)
+    assert proto.cacheInfo() is None
+
+
+
+@pytest.mark.parametrize("first, second", [
+    (0.0, -0.0), ([0.0], [-0.0]), (1, 1.0), (1, True), (float('nan'), float('nan')),
+], ids=['zero', 'zero-list', 'int-float', 'int-bool', 'nan'])
+def test_protocol_v1_url_cache_equal_values(first, second):
+    cached = V1('examplekey', baseUrl='https://foo.bar/v1', cacheSize=2)
+    proto = V1('examplekey', baseUrl='https://foo.bar/v1')
+    for value in (first, second):
+        assert cached.signRequest('https://foo.bar/v1/foo', 'GET', params={'a': value}, timestamp=1552647740) == \
+            proto.signRequest('https://foo.bar/v1/foo', 'GET', params={'a': value}, timestamp=1552647740)
+
+def test_protocol_v1_sign_body_types():
+    from io import BytesIO, StringIO
+    proto = V1('examplekey')
+    proto.CHUNK_SIZE = 7
+    text = u'{"user_question": "pregunta en català", "q": "a+b c&d"}'
+    content = text.encode('utf8')
+    expected = proto.sign('v1/foo', 'POST', body=text, timestamp=1552647740).signature
+    bodies = [
+        content,
+        bytearray(content),
+        memoryview(content),
+        BytesIO(content),
+        StringIO(text),
+        (content[i:i + 5] for i in range(0, len(content), 5)),
+        [text[:10], content[len(text[:10].encode('utf8')):]].__iter__(),
+    ]
+    for body in bodies:
+        assert proto.sign('v1/foo', 'POST', body=body, timestamp=1552647740).signature == expected
+    assert proto._requestBaseString('v1/foo', 'POST', body=BytesIO(content), timestamp=1552647740) == \
+        proto._requestBaseString('v1/foo', 'POST', body=text, timestamp=1552647740)
+    # empty bodies are not part of the base string
+    emptySignature = proto.sign('v1/foo', 'POST', timestamp=1552647740).signature
+    for body in ['', b'', BytesIO(b''), iter([])]:
+        assert proto.sign('v1/foo', 'POST', body=body, timestamp=1552647740).signature == emptySignature
+    # other objects are signed as json
+    assert proto.sign('v1/foo', 'POST', body={"a": 1}, timestamp=1552647740).signature == \
+        proto.sign('v1/foo', 'POST', body='{"a": 1}', timestamp=1552647740).signature
+
+
+def referenceQueryString(queryString):
+    '''The original multi-pass implementation of `V1._buildQueryString`'''
+    import json
+    from inbenta_api_signature.url import quote, unquote_plus
+    query = {k: unquote_plus(json.dumps(v)) for k, v in queryString.items()}
+    query = ["{}={}".format(k, query[k]) for k in sorted(query)]
+    return quote("&".join(query), safe='')
+
+
+QUERY_CHARS = u'abcXYZ0129fF +%&=?/"\\\n\t\x00\x1f\x7f~_.-àç€\U0001F600\ud800'
+
+
+def randomQueryValue(rand, depth=0):
+    kind = rand.randint(0, 9 if depth < 2 else 6)
+    if kind <= 2:
+        return u''.join(rand.choice(QUERY_CHARS) for _ in range(rand.randint(0, 12)))
+    if kind == 3:
+        return u''.join(rand.choice([u'%', u'C3', u'A0', u'%2', u'2B', u'ff', u'+', u'a', u'%FF', u'%e2%82%ac']) for _ in range(rand.randint(1, 6)))
+    if kind == 4:
+        return rand.choice([True, False, None, 0, -12, 2 ** 70])
+    if kind == 5:
+        return rand.choice([0.5, -1.25, 1e+20, 1e-07, float('inf'), float('nan')])
+    if kind == 6:
+        return rand.choice([u'2019-01-01', u'flight offer', u'pregunta en catal%C3%A0'])
+    if kind <= 8:
+        return [randomQueryValue(rand, depth + 1) for _ in range(rand.randint(0, 4))]
+    return {u'k' + str(i): randomQueryValue(rand, depth + 1) for i in range(rand.randint(0, 3))}
+
+
+def test_protocol_v1_querystring_differential():
+    import random
+    rand = random.Random(1552647740)
+    proto = V1('examplekey')
+    for _ in range(3000):
+        query = {}
+        for _ in range(rand.randint(0, 6)):
+            key = rand.choice([u'date_from', u'env', u'a+b', u'k=v&', u'català', u'q'])
+            query[key] = randomQueryValue(rand)
+        assert proto._buildQueryString(query) == referenceQueryString(query), query
+    ids = {'id_content[]': [str(i) for i in range(500)], 'ids': list(range(500))}
+    assert proto._buildQueryString(ids) == referenceQueryString(ids)
+
+
+@pytest.mark.parametrize("url,method,params,body", [
+    ('https://foo.bar/v1/foo?b=2', 'GET', {'a': [1, 2], 'q': u'català'}, None),
+    ('v1/foo', 'POST', None, u'{"q": "flight offer"}'),
+    ('v1/foo', 'POST', None, (c for c in [b'{"q": ', b'"flight offer"}'])),
+])
+def test_protocol_v1_prepare(url, method, params, body):
+    proto = V1('examplekey', baseUrl='https://foo.bar')
+    prepared = proto.prepare(url, method, params=params, body=body)
+    if not isinstance(body, (str, type(u''), type(None))):
+        body = b'{"q": "flight offer"}'
+    for timestamp in [1552647740, '1552647741']:
+        expected = proto.sign(url, method, params=params, body=body, timestamp=timestamp)
+        assert prepared.sign(timestamp) == expected
+        assert prepared.signRequest(timestamp) == expected.headers
+
+
+def test_protocol_v1_prepare_reuses_the_second():
+    proto = V1('examplekey')
+    prepared = proto.prepare('v1/foo', 'GET', params={'a': 1})
+    with freeze_time("2019-03-15 10:42:20.100"):
+        signed = prepared.sign()
+        assert prepared.sign() is signed
+        headers = prepared.signRequest()
+        headers['foo'] = 'bar'
+        assert prepared.signRequest() == signed.headers
+    with freeze_time("2019-03-15 10:42:21"):
+        assert prepared.sign() is not signed
+        assert prepared.sign().timestamp == str(int(signed.timestamp) + 1)
+    assert proto.timestamp is None
+
+
+def test_protocol_v1_prepare_concurrency():
+    from concurrent.futures import ThreadPoolExecutor
+    proto = V1('examplekey')
+    prepared = proto.prepare('v1/foo', 'GET', params={'a': 1})
+    timestamps = [1552647740 + i % 7 for i in range(500)]
+    with ThreadPoolExecutor(8) as executor:
+        signatures = list(executor.map(lambda t: prepared.sign(t).signature, timestamps))
+    assert signatures == [proto.sign('v1/foo', 'GET', params={'a': 1}, timestamp=t).signature for t in timestamps]
+
+
+@pytest.mark.parametrize("url,method,body,chunkSize", [
+    ('http://foo.bar/v1/foo?a=1&b=%5B1%2C2%5D', 'GET', None, 4),
+    ('http://foo.bar/v1/foo', 'POST', b'{"q": "flight + offer"}', 3),
+    ('http://foo.bar/v1/foo', 'POST', u'{"q": "pregunta en català"}', 1),
+    ('http://foo.bar/v1/foo', 'PUT', BytesIO(b'x' * 100), 7),
+])
+def test_protocol_v1_verify_request(url, method, body, chunkSize):
+    proto = V1('examplekey', baseUrl='http://foo.bar/v1')
+    proto.CHUNK_SIZE = chunkSize
+    headers = proto.sign(url, method, body=body, timestamp=1552647740).headers
+    if hasattr(body, 'seek'):
+        body.seek(0)
+    assert proto.verifyRequest(url, method, body=body, headers=dict((k.upper(), v) for k, v in headers.items()))
+
+    wrong = dict(headers, **{V1.SIGNATURE_HEADER: 'wrong-signature'})
+    if hasattr(body, 'seek'):
+        body.seek(0)
+    assert not proto.verifyRequest(url, method, body=body, headers=wrong)
+
+
+@pytest.mark.parametrize("signature", [u'caf\xe9', u'\u20ac' * 64, b'caf\xc3\xa9'])
+def test_protocol_v1_verify_request_non_ascii_signature(signature):
+    proto = V1('examplekey')
+    headers = dict(proto.sign('v1/foo', 'GET', timestamp=1552647740).headers, **{V1.SIGNATURE_HEADER: signature})
+    assert proto.verifyRequest('v1/foo', 'GET', headers=headers) is False
+
+
+@pytest.mark.parametrize("missing", V1.HEADERS)
+def test_protocol_v1_verify_request_missing_headers(missing):
+    proto = V1('examplekey')
+    headers = proto.sign('v1/foo', 'GET', timestamp=1552647740).headers
+    del headers[missing]
+    assert proto.requestVerifier('v1/foo', 'GET', headers) is None
+    assert not proto.verifyRequest('v1/foo', 'GET', headers=headers)
+
+
+@pytest.mark.parametrize("body,encoding", [
+    (u'{"user_question":"pregunta en català \U0001F600"}', None),
+    (u'{"user_question":"pregunta en català"}', 'latin-1'),
+    (u'', None),
+])
+def test_protocol_v1_sign_response_content(body, encoding):
+    proto = V1('examplekey')
+    headers = proto.signResponseContent(body.encode(encoding or 'utf-8'), 1552647740, encoding=encoding)
+    assert headers[V1.TIMESTAMP_HEADER] == '1552647740'
+    assert proto.validateResponse(headers[V1.SIGNATURE_HEADER], body, timestamp=1552647740)
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""Test the client registry and the LRU cache it is built on."""
+import sys
+import threading
+
+import pytest
+
+from inbenta_api_signature import SignatureClient, changeBaseHTTPAdapter
+from inbenta_api_signature import cache
+from inbenta_api_signature.cache import LRUCache
+from inbenta_api_signature.registry import ClientRegistry
+from mockServer import MockServer
+
+
+BASE_URL = 'https://foo.bar/v1'
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache, 'timer', clock)
+    return clock
+
+
+def test_lru_cache_ttl(clock):
+    evicted = []
+    lru = LRUCache(2, ttl=10, onEvict=lambda key, value: evicted.append(key))
+    lru.set('a', 1)
+    clock.now += 5
+    lru.set('b', 2)
+    clock.now += 6
+    # `a` has been unused for 11 seconds
+    assert lru.get('a') is None
+    assert evicted == ['a']
+    assert lru.get('b') == 2
+    clock.now += 9
+    lru.set('c', 3)
+    lru.set('d', 4)
+    assert evicted == ['a', 'b']
+    clock.now += 11
+    lru.expire()
+    assert evicted == ['a', 'b', 'c', 'd']
+    assert len(lru) == 0
+    assert lru.info() == cache.CacheInfo(1, 1, 4, 2, 0)
+
+
+def test_lru_cache_on_evict():
+    evicted = []
+    lru = LRUCache(2, onEvict=lambda key, value: evicted.append((key, value)))
+    lru.set('a', 1)
+    lru.set('b', 2)
+    lru.set('a', 3)
+    lru.set('c', 4)
+    assert evicted == [('a', 1), ('b', 2)]
+    lru.clear()
+    assert evicted == [('a', 1), ('b', 2), ('a', 3), ('c', 4)]
+
+
+def test_registry_shares_clients():
+    registry = ClientRegistry()
+    client = registry.client('key-a', BASE_URL)
+    assert isinstance(client, SignatureClient)
+    assert registry.client('key-a', BASE_URL, 'V1') is client
+    assert registry.client('key-a', 'https://other.bar/v1') is not client
+    assert registry.client('key-b', BASE_URL) is not client
+    assert registry.info() == cache.CacheInfo(1, 3, 0, ClientRegistry.MAXSIZE, 3)
+
+
+def test_registry_is_thread_safe():
+    registry = ClientRegistry(maxsize=4)
+    clients = []
+
+    def worker(i):
+        clients.append(registry.client('key-{}'.format(i % 2), BASE_URL))
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(set(map(id, clients))) == 2
+
+
+def test_registry_closes_evicted_sessions(clock):
+    registry = ClientRegistry(maxsize=2, ttl=60)
+    closed = []
+
+    def session(key):
+        session = registry.session(key, BASE_URL)
+        session.close = lambda: closed.append(key)
+        return session
+
+    sessionA = session('key-a')
+    assert registry.session('key-a', BASE_URL) is sessionA
+    session('key-b')
+    session('key-c')
+    assert closed == ['key-a']
+    assert registry.info().evictions == 1
+
+    clock.now += 61
+    registry.expire()
+    assert closed == ['key-a', 'key-b', 'key-c']
+    assert len(registry) == 0
+
+    with registry:
+        session('key-d')
+    assert closed[-1] == 'key-d'
+
+
+def test_registry_closes_sessions_out_of_the_lock():
+    registry = ClientRegistry(maxsize=1)
+    locked = []
+
+    def close():
+        locked.append(registry._lock.locked())
+
+    registry.session('key-a', BASE_URL).close = close
+    registry.session('key-b', BASE_URL)
+    registry.client('key-c', BASE_URL)
+    assert locked == [False]
+
+
+def test_registry_eviction_races_with_session():
+    # switch threads as often as possible to interleave the evictions and the sessions
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    registry = ClientRegistry(maxsize=1)
+    built = []
+    buildSession = registry._buildSession
+
+    def recordSession(client, baseUrl):
+        session = buildSession(client, baseUrl)
+        session.closed = False
+        session.close = lambda: setattr(session, 'closed', True)
+        built.append(session)
+        return session
+    registry._buildSession = recordSession
+
+    def worker(i):
+        for j in range(200):
+            registry.session('key-{}'.format((i + j) % 3), BASE_URL)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(4)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    registry.close()
+    assert len(registry) == 0
+    # every session was attached to its entry before it could be evicted
+    assert built and all(session.closed for session in built)
+
+
+def test_registry_session_signs():
+    class TenantServer(MockServer):
+        def __init__(self, *args, **kwargs):
+            super(TenantServer, self).__init__('my-signature-key', BASE_URL, *args, **kwargs)
+
+    changeBaseHTTPAdapter(TenantServer)
+    with ClientRegistry(pool_maxsize=2) as registry:
+        session = registry.session('my-signature-key', BASE_URL)
+        response = session.post(BASE_URL + '/foo', data='{"a": 1}')
+        assert response.status_code == 200
+        assert response.validSignature is True
+        assert session.get_adapter(BASE_URL)._pool_maxsize == 2
+
+    with pytest.raises(ValueError):
+        ClientRegistry().session('my-signature-key', None)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Test the replay protection of the received requests."""
+from io import BytesIO
+
+import pytest
+
+from inbenta_api_signature.instrumentation import StatsInstrumentation
+from inbenta_api_signature.middleware import SignatureMiddleware
+from inbenta_api_signature.protocol import V1
+from inbenta_api_signature.replay import MemoryReplayStore, RedisReplayStore, ReplayGuard
+
+NOW = 1552647740
+
+
+class FakeRedis(object):
+    '''The `set` of redis-py, expiring with the `now` attribute'''
+    def __init__(self):
+        self.keys = {}
+        self.now = NOW
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self.keys.get(key, (None, 0))[1] > self.now:
+            return None
+        self.keys[key] = (value, self.now + ex)
+        return True
+
+
+@pytest.mark.parametrize("timestamp, fresh", [
+    (NOW, True), (NOW - 60, True), (NOW + 60, True), (NOW - 61, False), (NOW + 61, False),
+    (str(NOW), True), ('not-a-timestamp', False), (None, False),
+])
+def test_replay_guard_window(timestamp, fresh):
+    guard = ReplayGuard(window=60)
+    assert guard.fresh(timestamp, now=NOW) is fresh
+    assert guard.check('signature', timestamp, now=NOW) is fresh
+
+
+@pytest.mark.parametrize("store", [MemoryReplayStore(), RedisReplayStore(FakeRedis())])
+def test_replay_guard_rejects_replays(store):
+    instrumentation = StatsInstrumentation()
+    guard = ReplayGuard(window=60, store=store, instrumentation=instrumentation)
+    assert guard.check('signature', NOW, now=NOW)
+    assert not guard.check('signature', NOW, now=NOW + 30)
+    assert guard.check('other-signature', NOW, now=NOW + 30)
+    assert not guard.check('signature', NOW, now=NOW + 61)
+    assert instrumentation.counters == {'replayed_requests': 1, 'stale_requests': 1}
+
+
+def test_memory_store_drops_whole_buckets():
+    store = MemoryReplayStore()
+    for second in range(10):
+        for i in range(5):
+            assert store.add('{}-{}'.format(second, i), NOW + second, NOW)
+    assert len(store) == 50
+    assert not store.add('3-0', NOW + 3, NOW + 3)
+    assert len(store) == 35
+    assert store.add('3-0', NOW + 4, NOW + 4)
+    assert len(store) == 31
+    assert store.add('new', NOW + 100, NOW + 100)
+    assert len(store) == 1
+
+
+def test_memory_store_maxsize_rejects_what_it_dropped():
+    store = MemoryReplayStore(maxsize=4)
+    for second in range(4):
+        assert store.add(str(second), NOW + second, NOW)
+    assert store.add('4', NOW + 4, NOW)
+    assert len(store) == 4
+    # the bucket dropped to make room can't be replayed
+    assert not store.add('0', NOW, NOW)
+    assert not store.add('other', NOW, NOW)
+    assert store.add('other', NOW + 1, NOW)
+    store.clear()
+    assert store.add('0', NOW, NOW)
+
+
+def test_middleware_replay_guard():
+    proto = V1('my-signature-key')
+    headers = proto.sign('http://foo.bar/v1/foo', 'GET').headers
+    environ = dict(('HTTP_' + name.upper().replace('-', '_'), value) for name, value in headers.items())
+    environ.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': '/v1/foo', 'HTTP_HOST': 'foo.bar',
+                    'SERVER_NAME': 'foo.bar', 'SERVER_PORT': '80', 'wsgi.url_scheme': 'http',
+                    'wsgi.input': BytesIO()})
+
+    def app(environ, start_response):
+        start_response('200 OK', [('Content-Type', 'application/json')])
+        return [b'{}']
+
+    middleware = SignatureMiddleware(app, 'my-signature-key', replayGuard=ReplayGuard())
+    statuses = []
+    for _ in range(2):
+        middleware(dict(environ), lambda status, headers, exc_info=None: statuses.append(status))
+    assert statuses == ['200 OK', '403 Forbidden']
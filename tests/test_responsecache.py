@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""Test the response caches of `SignatureAdapter` against a local server."""
+import time
+
+import pytest
+
+from inbenta_api_signature import getHTTPAdapter
+from inbenta_api_signature.protocol import V1
+from inbenta_api_signature.responsecache import DiskResponseCache, MemoryResponseCache, ResponseCache
+
+
+@pytest.fixture(params=['memory', 'disk'])
+def cache(request, tmpdir):
+    if request.param == 'memory':
+        return MemoryResponseCache(maxsize=2)
+    return DiskResponseCache(str(tmpdir.join('responses')), maxsize=2)
+
+
+def test_hits_are_served_without_network(server, cache, session):
+    s = session(getHTTPAdapter, responseCache=cache)
+    first = s.get(server.url + '/v1/foo', params={'date_from': '2019-01-01', 'date_to': '2019-01-31'})
+    assert first.validSignature is True
+    second = s.get(server.url + '/v1/foo', params={'date_to': '2019-01-31', 'date_from': '2019-01-01'})
+    assert len(server.requests) == 1
+    assert second.status_code == 200
+    assert second.validSignature is True
+    assert second.content == first.content
+    assert second.headers['Content-Type'] == 'application/json'
+    assert second.json() == {}
+    info = cache.info()
+    assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+    assert info.hitRatio == 0.5
+
+
+@pytest.mark.parametrize("method, path, kwargs", [
+    ('GET', '/v1/bar', {}),
+    ('GET', '/v1/foo', {'params': {'date_from': '2019-02-01'}}),
+    ('POST', '/v1/foo', {'data': b'{"a": 1}'}),
+])
+def test_different_requests_are_not_hits(server, cache, method, path, kwargs, session):
+    s = session(getHTTPAdapter, responseCache=cache)
+    s.get(server.url + '/v1/foo', params={'date_from': '2019-01-01'})
+    s.request(method, server.url + path, **kwargs)
+    assert len(server.requests) == 2
+    assert cache.info().hits == 0
+
+
+def test_credentials_are_not_shared(server, cache, session):
+    s = session(getHTTPAdapter, responseCache=cache)
+    s.get(server.url + '/v1/foo', headers={'Authorization': 'Bearer user-a', 'x-inbenta-env': 'production'})
+    s.get(server.url + '/v1/foo', headers={'Authorization': 'Bearer user-b', 'x-inbenta-env': 'production'})
+    assert len(server.requests) == 2
+    s.get(server.url + '/v1/foo', headers={'authorization': 'Bearer user-a', 'X-Inbenta-Env': 'production'})
+    assert len(server.requests) == 2
+    s.get(server.url + '/v1/foo', headers={'Authorization': 'Bearer user-a', 'x-inbenta-env': 'development'})
+    s.get(server.url + '/v1/foo')
+    assert len(server.requests) == 4
+    assert cache.info().hits == 1
+
+
+def test_vary_headers(server, session):
+    cache = MemoryResponseCache(vary=['x-tenant'])
+    s = session(getHTTPAdapter, responseCache=cache)
+    s.get(server.url + '/v1/foo', headers={'X-Tenant': 'a', 'Authorization': 'Bearer user-a'})
+    s.get(server.url + '/v1/foo', headers={'X-Tenant': 'a', 'Authorization': 'Bearer user-b'})
+    s.get(server.url + '/v1/foo', headers={'X-Tenant': 'b'})
+    assert len(server.requests) == 2
+
+
+def test_ttl(server, cache, monkeypatch, session):
+    cache.ttl = 60
+    s = session(getHTTPAdapter, responseCache=cache)
+    s.get(server.url + '/v1/foo')
+    now = time.time()
+    monkeypatch.setattr(time, 'time', lambda: now + 61)
+    s.get(server.url + '/v1/foo')
+    assert len(server.requests) == 2
+    assert cache.info().evictions == 1
+
+
+def test_size_eviction(server, cache, session):
+    s = session(getHTTPAdapter, responseCache=cache)
+    for path in ('/v1/a', '/v1/b', '/v1/c'):
+        s.get(server.url + path)
+    info = cache.info()
+    assert info.currsize == 2
+    assert info.evictions == 1
+
+
+@pytest.mark.parametrize("failures", [[500], [403]])
+def test_failures_are_not_cached(server, cache, failures, session):
+    server.failures = list(failures)
+    s = session(getHTTPAdapter, responseCache=cache)
+    s.get(server.url + '/v1/foo')
+    s.get(server.url + '/v1/foo')
+    assert len(server.requests) == 2
+    assert len(cache) == 1
+
+
+def test_invalid_signatures_are_not_cached(server, cache, monkeypatch, session):
+    monkeypatch.setattr(V1, 'validateResponseContent', lambda self, *args, **kwargs: False)
+    s = session(getHTTPAdapter, responseCache=cache)
+    assert s.get(server.url + '/v1/foo').validSignature is False
+    assert len(cache) == 0
+
+
+def test_streams_are_not_cached(server, cache, session):
+    s = session(getHTTPAdapter, responseCache=cache)
+    s.get(server.url + '/v1/foo', stream=True).content
+    assert len(cache) == 0
+    assert cache.info().misses == 0
+
+
+def test_disk_cache_is_shared(server, tmpdir, session):
+    directory = str(tmpdir.join('responses'))
+    session(getHTTPAdapter, responseCache=DiskResponseCache(directory)).get(server.url + '/v1/foo')
+    other = DiskResponseCache(directory)
+    response = session(getHTTPAdapter, responseCache=other).get(server.url + '/v1/foo')
+    assert len(server.requests) == 1
+    assert response.validSignature is True
+    assert other.info().hits == 1
+    other.clear()
+    assert len(other) == 0
+
+
+def test_backends_implement_the_abstract_methods():
+    class PartialCache(ResponseCache):
+        def _load(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialCache()